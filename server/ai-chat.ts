@@ -2,9 +2,44 @@
  * AI Chat Assistant for Hotel Database Queries
  * Ported from Python Flask implementation to Node.js/Express
  * Uses database context for RAG functionality
+ *
+ * The LLM backend (an Ollama-compatible server at OLLAMA_URL) is never touched
+ * at import or startup. The first status check or message starts a background
+ * health probe that records whether the model is available; until it says so,
+ * questions are answered directly from the database. Once it is available,
+ * answers are generated over a pooled keep-alive HTTP client (llm-client.ts),
+ * falling back to the direct answer if the backend errors or times out.
+ * The model's context is a handful of precomputed summaries chosen by the
+ * retrieval index (chat-retrieval.ts) rather than raw rows.
+ * Analytical questions (rankings, totals, growth, event impact, forecast
+ * accuracy) are answered first by aggregate queries in chat-intents.ts; with
+ * CHAT_PHRASE_INTENTS=true the model only rewords those answers.
+ * streamMessage relays the model's tokens as they are generated, for the
+ * Server-Sent Events endpoint.
  */
 
 import { storage } from './storage';
+import { LlmClient } from './llm-client';
+import { chatRetrieval } from './chat-retrieval';
+import { chatIntents, type IntentAnswer } from './chat-intents';
+
+const HEALTH_PROBE_INTERVAL_MS = 60 * 1000;
+const HEALTH_PROBE_TIMEOUT_MS = 2000;
+const PHRASE_INTENTS = process.env.CHAT_PHRASE_INTENTS === 'true';
+
+const SYSTEM_PROMPT = `You are an assistant for a hotel revenue management team.
+Answer using only the database context provided with each question. Be concise,
+quote figures exactly as given, and say so when the context does not contain the answer.`;
+
+export type ModelStatus = 'disabled' | 'unknown' | 'available' | 'missing' | 'unreachable';
+
+export interface AssistantStatus {
+  status: ModelStatus;
+  model: string | null;
+  checkedAt: string | null;
+  error?: string;
+  latency?: ReturnType<LlmClient['getStats']>;
+}
 
 export interface ChatMessage {
   id: string;
@@ -24,6 +59,68 @@ export interface DatabaseContext {
 }
 
 export class HotelChatAssistant {
+  private llmUrl = process.env.OLLAMA_URL?.replace(/\/$/, '') || null;
+  private model = process.env.OLLAMA_MODEL || 'llama3';
+  private client = this.llmUrl ? new LlmClient(this.llmUrl) : null;
+  private health: { status: ModelStatus; checkedAt: Date | null; error?: string } = {
+    status: this.llmUrl ? 'unknown' : 'disabled',
+    checkedAt: null,
+  };
+  private probeTimer: NodeJS.Timeout | null = null;
+
+  /**
+   * Model availability as last seen by the health probe. Never waits on the backend.
+   */
+  getStatus(): AssistantStatus {
+    this.ensureHealthProbe();
+    return {
+      status: this.health.status,
+      model: this.llmUrl ? this.model : null,
+      checkedAt: this.health.checkedAt?.toISOString() || null,
+      error: this.health.error,
+      latency: this.client?.getStats(),
+    };
+  }
+
+  get isModelAvailable(): boolean {
+    this.ensureHealthProbe();
+    return this.health.status === 'available';
+  }
+
+  /**
+   * Start the periodic health probe on first use
+   */
+  private ensureHealthProbe(): void {
+    if (this.probeTimer || !this.llmUrl) return;
+    const probe = () => {
+      this.probeHealth().catch(error => console.error('Error probing LLM backend:', error));
+    };
+    this.probeTimer = setInterval(probe, HEALTH_PROBE_INTERVAL_MS);
+    this.probeTimer.unref();
+    probe();
+  }
+
+  /**
+   * Ask the backend which models it has. Pulling a missing model is left to
+   * operations; it is reported as 'missing' rather than fetched here.
+   */
+  async probeHealth(): Promise<void> {
+    if (!this.client) return;
+    try {
+      const models = await this.client.listModels(HEALTH_PROBE_TIMEOUT_MS);
+      const present = models.some(name => name === this.model || name.split(':')[0] === this.model);
+      this.health = present
+        ? { status: 'available', checkedAt: new Date() }
+        : { status: 'missing', checkedAt: new Date(), error: `Model ${this.model} has not been pulled` };
+    } catch (error) {
+      this.health = {
+        status: 'unreachable',
+        checkedAt: new Date(),
+        error: error instanceof Error ? error.message : String(error),
+      };
+    }
+  }
+
   /**
    * Get relevant database context based on the query
    */
@@ -36,12 +133,11 @@ export class HotelChatAssistant {
     const needsEvents = this.containsWords(queryLower, ['event', 'conference', 'trade', 'sport', 'fair']);
     const needsForecasts = this.containsWords(queryLower, ['forecast', 'prediction', 'future', 'plan', 'budget']);
     const needsActuals = this.containsWords(queryLower, ['actual', 'performance', 'revenue', 'adr', 'occupancy', 'result']);
-    const needsRankings = this.containsWords(queryLower, ['rank', 'compare', 'best', 'worst', 'top', 'bottom']);
     const needsTasks = this.containsWords(queryLower, ['task', 'assignment', 'work', 'todo']);
     
     try {
       // Get hotels data
-      if (needsHotels || !this.hasAnyNeeds([needsEvents, needsForecasts, needsActuals, needsRankings, needsTasks])) {
+      if (needsHotels || !this.hasAnyNeeds([needsEvents, needsForecasts, needsActuals, needsTasks])) {
         const hotels = await storage.getAllHotels();
         contextData.hotels = hotels.slice(0, 50).map(h => ({
           id: h.id,
@@ -78,7 +174,7 @@ export class HotelChatAssistant {
       }
       
       // Get actuals data
-      if (needsActuals || needsRankings) {
+      if (needsActuals) {
         const actuals = await storage.getAllHotelActuals();
         contextData.actuals = actuals.slice(0, 100).map(a => ({
           hotelId: a.hotelId,
@@ -115,13 +211,29 @@ export class HotelChatAssistant {
    */
   async processMessage(messageText: string): Promise<string> {
     try {
+      // Kick off the health probe so the model can be used once it reports in
+      this.ensureHealthProbe();
+
+      const intentAnswer = await chatIntents.answer(messageText);
+      if (intentAnswer) {
+        return (await this.phraseIntentAnswer(messageText, intentAnswer)) || intentAnswer.text;
+      }
+
+      if (this.client && this.isModelAvailable) {
+        try {
+          const answer = await this.client.generate(this.model, await this.buildPrompt(messageText), {
+            system: SYSTEM_PROMPT,
+            temperature: 0.2,
+          });
+          if (answer.trim()) return answer.trim();
+        } catch (error) {
+          console.error('Error generating LLM answer, answering directly:', error);
+        }
+      }
+
       // Get relevant database context
       const contextData = await this.getDatabaseContext(messageText);
-      
-      // Since we don't have Ollama in this environment, use direct processing
-      const response = this.processQueryDirectly(messageText, contextData);
-      
-      return response;
+      return this.processQueryDirectly(messageText, contextData);
       
     } catch (error) {
       console.error('Error processing message:', error);
@@ -129,6 +241,83 @@ export class HotelChatAssistant {
     }
   }
   
+  /**
+   * Answer a message, handing each token to `onToken` as the model produces
+   * it. Direct answers arrive as a single chunk. A backend failure before the
+   * first token falls back to the direct answer; after it, the error is thrown
+   * because the partial answer has already been sent.
+   */
+  async streamMessage(
+    messageText: string,
+    onToken: (token: string) => void,
+    signal?: AbortSignal
+  ): Promise<{ response: string; answeredBy: string }> {
+    this.ensureHealthProbe();
+
+    const intentAnswer = await chatIntents.answer(messageText);
+    if (intentAnswer) {
+      const phrased = await this.phraseIntentAnswer(messageText, intentAnswer, signal);
+      const response = phrased || intentAnswer.text;
+      onToken(response);
+      return { response, answeredBy: phrased ? this.model : `intent:${intentAnswer.intent.kind}` };
+    }
+
+    if (this.client && this.isModelAvailable) {
+      let response = '';
+      try {
+        for await (const token of this.client.stream(this.model, await this.buildPrompt(messageText), {
+          system: SYSTEM_PROMPT,
+          temperature: 0.2,
+          signal,
+        })) {
+          response += token;
+          onToken(token);
+        }
+        if (response.trim()) return { response, answeredBy: this.model };
+      } catch (error) {
+        if (response || signal?.aborted) throw error;
+        console.error('Error streaming LLM answer, answering directly:', error);
+      }
+    }
+
+    const contextData = await this.getDatabaseContext(messageText);
+    const response = this.processQueryDirectly(messageText, contextData);
+    onToken(response);
+    return { response, answeredBy: 'direct' };
+  }
+
+  /**
+   * Reword a computed answer with the model, if enabled and available.
+   * Returns null to use the computed text as is.
+   */
+  private async phraseIntentAnswer(messageText: string, answer: IntentAnswer, signal?: AbortSignal): Promise<string | null> {
+    if (!PHRASE_INTENTS || !this.client || !this.isModelAvailable) return null;
+    try {
+      const phrased = await this.client.generate(
+        this.model,
+        `Question: ${messageText}\n\nComputed answer:\n${answer.text}\n\n` +
+          'Rewrite the computed answer as a short reply to the question. Keep every figure exactly as given and add no new ones.',
+        { system: SYSTEM_PROMPT, temperature: 0, signal }
+      );
+      return phrased.trim() || null;
+    } catch (error) {
+      if (signal?.aborted) throw error;
+      console.error('Error phrasing computed answer, returning it as is:', error);
+      return null;
+    }
+  }
+
+  /**
+   * Question plus the best matching summaries from the retrieval index
+   */
+  private async buildPrompt(messageText: string): Promise<string> {
+    const documents = await chatRetrieval.retrieve(messageText);
+    const context = documents.length
+      ? documents.map(doc => `[${doc.kind}] ${doc.text}`).join('\n')
+      : 'No matching records.';
+    return `Database context:\n${context}\n\nQuestion: ${messageText}`;
+  }
+
   /**
    * Process queries directly using database data
    */
@@ -176,18 +365,6 @@ export class HotelChatAssistant {
       });
     }
     
-    // Handle ranking queries
-    if (this.containsWords(promptLower, ['rank', 'best', 'top', 'compare']) && contextData.actuals) {
-      // Simple ranking by revenue
-      const actuals = [...contextData.actuals]
-        .sort((a, b) => b.revenue - a.revenue)
-        .slice(0, 5);
-      responseParts.push('\n**Top Hotels by Revenue:**');
-      actuals.forEach((actual, i) => {
-        responseParts.push(`${i + 1}. Hotel ${actual.hotelId}: $${actual.revenue.toLocaleString()}`);
-      });
-    }
-    
     // Handle task queries
     if (contextData.tasks && this.containsWords(promptLower, ['task', 'assignment', 'work'])) {
       const tasks = contextData.tasks.slice(0, 10);
@@ -0,0 +1,101 @@
+/**
+ * Backtest Worker - rolling-origin fold evaluation
+ * Pure computation over shared actuals matrices so folds can run either in
+ * worker threads or in-process. Each fold refits the baseline on the history
+ * before its origin and scores the next `horizon` days against actuals.
+ */
+
+import { isMainThread, parentPort, workerData } from 'worker_threads';
+import { forecastMetric, HISTORY_DAYS } from './baseline-model';
+import { addDays } from './date-utils';
+
+export const BACKTEST_METRICS = ['occupancyRate', 'averageDailyRate', 'revenue'] as const;
+export type BacktestMetric = typeof BACKTEST_METRICS[number];
+
+// Days-ahead buckets (inclusive, 1 = the day after the origin)
+export const HORIZON_BUCKETS: Array<{ from: number; to: number; label: string }> = [
+  { from: 1, to: 7, label: '1-7' },
+  { from: 8, to: 14, label: '8-14' },
+  { from: 15, to: 28, label: '15-28' },
+  { from: 29, to: 60, label: '29-60' },
+  { from: 61, to: 90, label: '61-90' },
+  { from: 91, to: 180, label: '91-180' },
+  { from: 181, to: 365, label: '181-365' },
+];
+
+// Accumulator layout: [metric x bucket x stat]
+export const STATS = 6; // count, absError, error, actualSum, apeSum, apeCount
+export const ACCUMULATOR_SIZE = BACKTEST_METRICS.length * HORIZON_BUCKETS.length * STATS;
+
+export interface FoldJob {
+  hotels: number;
+  days: number;
+  startDate: string; // date of matrix column 0
+  horizon: number;
+  origins: number[]; // matrix column index of each fold origin
+  values: Float64Array[]; // one [hotel x day] matrix per metric, in BACKTEST_METRICS order
+}
+
+const bucketOfHorizon = new Int8Array(366).fill(-1);
+HORIZON_BUCKETS.forEach((bucket, b) => {
+  for (let d = bucket.from; d <= bucket.to; d++) bucketOfHorizon[d] = b;
+});
+
+/**
+ * Add one forecast/actual pair to an accumulator
+ */
+export function accumulate(acc: Float64Array, metric: number, daysAhead: number, actual: number, forecast: number): void {
+  // Leads beyond the last bucket are not scored rather than lumped into it
+  if (Number.isNaN(actual) || Number.isNaN(forecast) || daysAhead > 365) return;
+  const bucket = bucketOfHorizon[daysAhead];
+  if (bucket === undefined || bucket < 0) return;
+
+  const k = (metric * HORIZON_BUCKETS.length + bucket) * STATS;
+  acc[k] += 1;
+  acc[k + 1] += Math.abs(forecast - actual);
+  acc[k + 2] += forecast - actual;
+  acc[k + 3] += Math.abs(actual);
+  if (actual !== 0) {
+    acc[k + 4] += Math.abs((forecast - actual) / actual);
+    acc[k + 5] += 1;
+  }
+}
+
+/**
+ * Score the baseline for each fold origin and return the summed accumulator
+ */
+export function evaluateFolds(job: FoldJob): Float64Array {
+  const acc = new Float64Array(ACCUMULATOR_SIZE);
+  const { hotels: H, days: D } = job;
+  const history = new Float64Array(H * HISTORY_DAYS);
+
+  for (const origin of job.origins) {
+    const horizon = Math.min(job.horizon, D - origin);
+    if (horizon <= 0) continue;
+    const historyStart = origin - HISTORY_DAYS;
+
+    job.values.forEach((values, m) => {
+      // Copy the history window of every hotel, padding before column 0
+      history.fill(NaN);
+      for (let h = 0; h < H; h++) {
+        const from = Math.max(0, historyStart);
+        history.set(values.subarray(h * D + from, h * D + origin), h * HISTORY_DAYS + (from - historyStart));
+      }
+
+      const predicted = forecastMetric(history, H, HISTORY_DAYS, addDays(job.startDate, historyStart), horizon);
+      for (let h = 0; h < H; h++) {
+        for (let f = 0; f < horizon; f++) {
+          accumulate(acc, m, f + 1, values[h * D + origin + f], predicted[h * horizon + f]);
+        }
+      }
+    });
+  }
+
+  return acc;
+}
+
+// Worker thread entry point
+if (!isMainThread && workerData?.foldJob) {
+  const acc = evaluateFolds(workerData.foldJob as FoldJob);
+  parentPort!.postMessage(acc, [acc.buffer]);
+}
@@ -0,0 +1,193 @@
+/**
+ * Backtest Service - rolling-origin evaluation of forecasts against actuals
+ * Loads actuals once into shared [hotel x day] matrices, splits the fold
+ * origins across a pool of worker threads (see backtest-worker.ts) and records
+ * MAPE/WAPE/bias per metric and days-ahead bucket. Stored user forecasts are
+ * scored by lead time (forecast date minus the day they were last updated).
+ */
+
+import { Worker } from 'worker_threads';
+import { existsSync } from 'fs';
+import { fileURLToPath } from 'url';
+import os from 'os';
+import { storage } from './storage';
+import type { BacktestParams, BacktestRun, InsertBacktestResult } from '@shared/schema';
+import { buildActualsMatrix, HISTORY_DAYS } from './baseline-model';
+import {
+  ACCUMULATOR_SIZE,
+  BACKTEST_METRICS,
+  HORIZON_BUCKETS,
+  STATS,
+  accumulate,
+  evaluateFolds,
+  type FoldJob,
+} from './backtest-worker';
+import { addDays, daysBetween, toISODate } from './date-utils';
+import { latestUserForecastByDate } from './forecast-accuracy';
+
+// The production build emits the worker next to dist/index.js as its own
+// entry point; in development it runs from source
+const WORKER_PATH = ['./backtest-worker.js', './backtest-worker.ts']
+  .map(file => fileURLToPath(new URL(file, import.meta.url)))
+  .find(path => existsSync(path));
+
+export class BacktestService {
+  /**
+   * Create a run record and execute it in the background
+   */
+  async start(params: BacktestParams, userId?: string): Promise<BacktestRun> {
+    const run = await storage.createBacktestRun({ params, createdBy: userId });
+    this.execute(run.id, params).catch(error => console.error(`Backtest ${run.id} failed:`, error));
+    return run;
+  }
+
+  /**
+   * Execute a run to completion and persist its results
+   */
+  async execute(runId: string, params: BacktestParams): Promise<void> {
+    const started = Date.now();
+
+    try {
+      const hotelList = params.hotelIds?.length
+        ? await storage.getHotelsByIds(params.hotelIds)
+        : await storage.getAllHotels();
+      const hotelIds = hotelList.map(h => h.id);
+
+      // The matrix starts early enough that the first fold has full history
+      const matrixStart = addDays(params.startDate, -HISTORY_DAYS);
+      const matrixEnd = addDays(params.endDate, params.horizonDays);
+      const days = daysBetween(matrixStart, matrixEnd) + 1;
+
+      const actuals = await storage.getHotelActualsForHotels(hotelIds, matrixStart, matrixEnd);
+      const matrix = buildActualsMatrix(hotelIds, actuals, matrixStart, days, true);
+      const values = [matrix.occupancy, matrix.adr, matrix.revenue];
+
+      const origins: number[] = [];
+      for (let day = params.startDate; day <= params.endDate; day = addDays(day, params.stepDays)) {
+        origins.push(daysBetween(matrixStart, day));
+      }
+
+      const baseline = await this.runFolds({
+        hotels: hotelIds.length,
+        days,
+        startDate: matrixStart,
+        horizon: params.horizonDays,
+        origins,
+        values,
+      }, params.workers);
+
+      // Stored user forecasts, scored by how far ahead their current values
+      // were entered (forecasts are edited in place, so from updatedAt)
+      const user = new Float64Array(ACCUMULATOR_SIZE);
+      const userForecasts = await storage.getForecastsForHotelsInRange(hotelIds, params.startDate, matrixEnd);
+      const hotelRow = new Map(hotelIds.map((id, i) => [id, i]));
+      const forecastsByHotel = new Map<string, typeof userForecasts>();
+      for (const forecast of userForecasts) {
+        const list = forecastsByHotel.get(forecast.hotelId) || [];
+        list.push(forecast);
+        forecastsByHotel.set(forecast.hotelId, list);
+      }
+      forecastsByHotel.forEach((list, hotelId) => {
+        const h = hotelRow.get(hotelId)!;
+        latestUserForecastByDate(list).forEach((forecast, date) => {
+          const enteredAt = forecast.updatedAt || forecast.createdAt;
+          if (!enteredAt) return;
+          const d = daysBetween(matrixStart, date);
+          const daysAhead = daysBetween(toISODate(enteredAt), date);
+          if (d < 0 || d >= days || daysAhead < 1) return;
+
+          const forecastValues = [forecast.occupancyRate, forecast.averageDailyRate, forecast.revenue];
+          forecastValues.forEach((value, m) => {
+            if (value === null) return;
+            accumulate(user, m, daysAhead, values[m][h * days + d], parseFloat(value.toString()));
+          });
+        });
+      });
+
+      const results = [
+        ...this.toResults(runId, 'baseline', baseline),
+        ...this.toResults(runId, 'user', user),
+      ];
+
+      await storage.completeBacktestRun(runId, {
+        status: 'completed',
+        folds: origins.length,
+        durationMs: Date.now() - started,
+      }, results);
+    } catch (error) {
+      await storage.completeBacktestRun(runId, {
+        status: 'failed',
+        error: error instanceof Error ? error.message : 'Unknown error',
+        durationMs: Date.now() - started,
+      }, []);
+      throw error;
+    }
+  }
+
+  /**
+   * Split fold origins across worker threads and merge their accumulators.
+   * Falls back to in-process evaluation for a single worker, or when the
+   * worker module cannot be found.
+   */
+  private async runFolds(job: FoldJob, requestedWorkers?: number): Promise<Float64Array> {
+    const workers = Math.min(
+      requestedWorkers || Math.max(1, os.availableParallelism() - 1),
+      job.origins.length
+    );
+
+    if (workers <= 1 || !WORKER_PATH) {
+      return evaluateFolds(job);
+    }
+
+    // Round-robin so every worker gets a similar mix of early and late origins
+    const chunks: number[][] = Array.from({ length: workers }, () => []);
+    job.origins.forEach((origin, i) => chunks[i % workers].push(origin));
+
+    const partials = await Promise.all(chunks.map(origins => new Promise<Float64Array>((resolve, reject) => {
+      const worker = new Worker(WORKER_PATH, { workerData: { foldJob: { ...job, origins } } });
+      worker.once('message', (acc: Float64Array) => {
+        resolve(acc);
+        worker.terminate();
+      });
+      worker.once('error', reject);
+      worker.once('exit', (code) => {
+        if (code !== 0) reject(new Error(`Backtest worker exited with code ${code}`));
+      });
+    })));
+
+    const total = new Float64Array(ACCUMULATOR_SIZE);
+    for (const partial of partials) {
+      for (let i = 0; i < ACCUMULATOR_SIZE; i++) total[i] += partial[i];
+    }
+    return total;
+  }
+
+  private toResults(runId: string, method: string, acc: Float64Array): InsertBacktestResult[] {
+    const results: InsertBacktestResult[] = [];
+
+    BACKTEST_METRICS.forEach((metric, m) => {
+      HORIZON_BUCKETS.forEach((bucket, b) => {
+        const k = (m * HORIZON_BUCKETS.length + b) * STATS;
+        const [count, absError, error, actualSum, apeSum, apeCount] = acc.subarray(k, k + STATS);
+        if (count === 0) return;
+
+        results.push({
+          runId,
+          method,
+          metric,
+          horizon: bucket.label,
+          count,
+          mape: apeCount > 0 ? ((apeSum / apeCount) * 100).toFixed(4) : null,
+          wape: actualSum > 0 ? ((absError / actualSum) * 100).toFixed(4) : null,
+          bias: actualSum > 0 ? ((error / actualSum) * 100).toFixed(4) : null,
+        });
+      });
+    });
+
+    return results;
+  }
+}
+
+// Export singleton instance
+export const backtestService = new BacktestService();
+
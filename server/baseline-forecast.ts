@@ -0,0 +1,128 @@
+/**
+ * Baseline Forecast Engine - automatic hotel-day forecasts from actuals
+ * Actuals are loaded once into dense [hotel x day] matrices and every hotel is
+ * fitted in the same pass (see baseline-model.ts), so a 400 hotel x 365 day
+ * refresh is dominated by the bulk write.
+ */
+
+import { storage } from './storage';
+import type { Forecast, InsertSystemForecast, SystemForecast } from '@shared/schema';
+import { addDays, toISODate } from './date-utils';
+import { buildActualsMatrix, forecastMetric, HISTORY_DAYS, type ActualsMatrix } from './baseline-model';
+
+// Each date's first-issued baseline, never overwritten. The rolling 'baseline'
+// rows are rewritten every night, so by the time a date has actuals its row is
+// a same-day forecast; accuracy is measured on these instead.
+export const FIRST_ISSUED_BASELINE = 'baseline-first';
+
+export type BaselineValues = Pick<SystemForecast, 'occupancyRate' | 'averageDailyRate' | 'revenue' | 'roomNights'>;
+
+export class BaselineForecastEngine {
+  private refreshing = false;
+
+  /**
+   * Whether a portfolio refresh is currently running
+   */
+  get isRefreshing(): boolean {
+    return this.refreshing;
+  }
+
+  /**
+   * Recompute baselines for every hotel from `origin` (default today) forward.
+   * Only one refresh runs at a time; callers check isRefreshing first.
+   */
+  async refresh(options: { horizonDays?: number; origin?: string } = {}): Promise<{ hotels: number; rows: number; durationMs: number }> {
+    if (this.refreshing) throw new Error('A baseline refresh is already running');
+    this.refreshing = true;
+    try {
+      return await this.runRefresh(options);
+    } finally {
+      this.refreshing = false;
+    }
+  }
+
+  /**
+   * Attach the baseline for the same hotel and day to each user forecast
+   */
+  async withBaselines(list: Forecast[]): Promise<Array<Forecast & { baseline: BaselineValues | null }>> {
+    if (list.length === 0) return [];
+
+    const hotelIds = Array.from(new Set(list.map(f => f.hotelId)));
+    let startDate = list[0].forecastDate;
+    let endDate = list[0].forecastDate;
+    for (const forecast of list) {
+      if (forecast.forecastDate < startDate) startDate = forecast.forecastDate;
+      if (forecast.forecastDate > endDate) endDate = forecast.forecastDate;
+    }
+
+    const baselines = await storage.getSystemForecastsForHotels(hotelIds, startDate, endDate, 'baseline');
+    const byKey = new Map<string, BaselineValues>(baselines.map(b => [`${b.hotelId}|${b.forecastDate}`, {
+      occupancyRate: b.occupancyRate,
+      averageDailyRate: b.averageDailyRate,
+      revenue: b.revenue,
+      roomNights: b.roomNights,
+    }]));
+
+    return list.map(forecast => ({ ...forecast, baseline: byKey.get(`${forecast.hotelId}|${forecast.forecastDate}`) || null }));
+  }
+
+  private async runRefresh(options: { horizonDays?: number; origin?: string }): Promise<{ hotels: number; rows: number; durationMs: number }> {
+    const started = Date.now();
+    const horizon = options.horizonDays || 365;
+    const origin = options.origin || toISODate(new Date());
+    const historyStart = addDays(origin, -HISTORY_DAYS);
+
+    const hotelList = await storage.getAllHotels();
+    const hotelIds = hotelList.map(h => h.id);
+    const actuals = await storage.getHotelActualsForHotels(hotelIds, historyStart, addDays(origin, -1));
+
+    const matrix = buildActualsMatrix(hotelIds, actuals, historyStart, HISTORY_DAYS);
+    const rows = this.toRows(matrix, hotelList.map(h => h.totalRooms || 0), origin, horizon);
+
+    await storage.replaceSystemForecasts('baseline', origin, rows);
+    await storage.insertSystemForecastsIfAbsent(rows.map(row => ({ ...row, method: FIRST_ISSUED_BASELINE })));
+
+    return { hotels: hotelIds.length, rows: rows.length, durationMs: Date.now() - started };
+  }
+
+  /**
+   * Run the model over a matrix and turn the output into system forecast rows
+   */
+  toRows(matrix: ActualsMatrix, rooms: number[], origin: string, horizon: number): InsertSystemForecast[] {
+    const H = matrix.hotelIds.length;
+    const occupancy = forecastMetric(matrix.occupancy, H, matrix.days, matrix.startDate, horizon);
+    const adr = forecastMetric(matrix.adr, H, matrix.days, matrix.startDate, horizon);
+
+    const dates = Array.from({ length: horizon }, (_, f) => addDays(origin, f));
+    const generatedAt = new Date();
+    const rows: InsertSystemForecast[] = [];
+
+    for (let h = 0; h < H; h++) {
+      for (let f = 0; f < horizon; f++) {
+        const i = h * horizon + f;
+        if (Number.isNaN(occupancy[i]) && Number.isNaN(adr[i])) continue;
+
+        const occ = Number.isNaN(occupancy[i]) ? null : Math.min(100, Math.max(0, occupancy[i]));
+        const rate = Number.isNaN(adr[i]) ? null : Math.max(0, adr[i]);
+        const roomNights = occ !== null && rooms[h] > 0 ? Math.round((occ / 100) * rooms[h]) : null;
+
+        rows.push({
+          hotelId: matrix.hotelIds[h],
+          forecastDate: dates[f],
+          method: 'baseline',
+          occupancyRate: occ !== null ? occ.toFixed(2) : null,
+          averageDailyRate: rate !== null ? rate.toFixed(2) : null,
+          revenue: roomNights !== null && rate !== null ? (roomNights * rate).toFixed(2) : null,
+          roomNights,
+          generatedAt,
+        });
+      }
+    }
+
+    return rows;
+  }
+}
+
+// Export singleton instance
+export const baselineForecastEngine = new BaselineForecastEngine();
+
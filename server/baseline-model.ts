@@ -0,0 +1,125 @@
+/**
+ * Baseline Model - pure forecasting math shared by the engine and backtests
+ * Model per hotel and metric: seasonal naive (the same week last year, lagged
+ * 364 days so weekdays line up) x day-of-week factor (last 8 weeks) x trend
+ * (last 28 days versus the same 28 days a year earlier). No database access,
+ * so it can be loaded in worker threads.
+ */
+
+import type { HotelActual } from '@shared/schema';
+import { dayOfWeek, daysBetween } from './date-utils';
+
+const SEASON = 364;
+export const HISTORY_DAYS = SEASON * 2;
+const RECENT_DAYS = 28;
+const DOW_WINDOW_DAYS = 56;
+const TREND_MIN = 0.7;
+const TREND_MAX = 1.5;
+
+export interface ActualsMatrix {
+  hotelIds: string[];
+  startDate: string; // date of column 0
+  days: number;
+  occupancy: Float64Array; // [hotel x day], NaN where no actual exists
+  adr: Float64Array;       // [hotel x day], NaN where no actual exists
+  revenue: Float64Array;   // [hotel x day], NaN where no actual exists
+}
+
+/**
+ * Pivot actual rows into dense matrices covering [startDate, startDate + days).
+ * Expects one row per hotel and day, as getHotelActualsForHotels returns.
+ * With `shared` the matrices are backed by SharedArrayBuffers for worker threads.
+ */
+export function buildActualsMatrix(hotelIds: string[], actuals: HotelActual[], startDate: string, days: number, shared = false): ActualsMatrix {
+  const H = hotelIds.length;
+  const row = new Map(hotelIds.map((id, i) => [id, i]));
+  const allocate = () => (shared
+    ? new Float64Array(new SharedArrayBuffer(H * days * Float64Array.BYTES_PER_ELEMENT))
+    : new Float64Array(H * days)
+  ).fill(NaN);
+  const occupancy = allocate();
+  const adr = allocate();
+  const revenue = allocate();
+
+  for (const actual of actuals) {
+    const h = row.get(actual.hotelId);
+    if (h === undefined) continue;
+    const d = daysBetween(startDate, actual.actualDate);
+    if (d < 0 || d >= days) continue;
+
+    if (actual.occupancyRate !== null) occupancy[h * days + d] = parseFloat(actual.occupancyRate.toString());
+    if (actual.averageDailyRate !== null) adr[h * days + d] = parseFloat(actual.averageDailyRate.toString());
+    if (actual.revenue !== null) revenue[h * days + d] = parseFloat(actual.revenue.toString());
+  }
+
+  return { hotelIds, startDate, days, occupancy, adr, revenue };
+}
+
+/**
+ * Forecast one metric for every hotel for `horizon` days after the matrix ends.
+ * Returns a [hotel x horizon] matrix with NaN for hotels without any history.
+ */
+export function forecastMetric(values: Float64Array, hotels: number, days: number, startDate: string, horizon: number): Float64Array {
+  const out = new Float64Array(hotels * horizon).fill(NaN);
+  const sums = new Float64Array(days + 1);
+  const counts = new Float64Array(days + 1);
+  const startDow = dayOfWeek(startDate);
+
+  const windowMean = (from: number, to: number): number => {
+    const a = Math.max(0, from);
+    const b = Math.min(days, to);
+    if (b <= a) return NaN;
+    const n = counts[b] - counts[a];
+    return n > 0 ? (sums[b] - sums[a]) / n : NaN;
+  };
+
+  for (let h = 0; h < hotels; h++) {
+    const base = h * days;
+
+    // Prefix sums make every window mean O(1)
+    for (let d = 0; d < days; d++) {
+      const v = values[base + d];
+      const present = Number.isNaN(v) ? 0 : 1;
+      sums[d + 1] = sums[d] + (present ? v : 0);
+      counts[d + 1] = counts[d] + present;
+    }
+    if (counts[days] === 0) continue;
+
+    const recent = windowMean(days - RECENT_DAYS, days);
+    const recentLastYear = windowMean(days - RECENT_DAYS - SEASON, days - SEASON);
+    let trend = recent > 0 && recentLastYear > 0 ? recent / recentLastYear : 1;
+    trend = Math.min(TREND_MAX, Math.max(TREND_MIN, trend));
+
+    // Day-of-week factors relative to the recent mean
+    const dowSum = new Float64Array(7);
+    const dowCount = new Float64Array(7);
+    for (let d = Math.max(0, days - DOW_WINDOW_DAYS); d < days; d++) {
+      const v = values[base + d];
+      if (Number.isNaN(v)) continue;
+      const w = (startDow + d) % 7;
+      dowSum[w] += v;
+      dowCount[w] += 1;
+    }
+    const dowMean = windowMean(days - DOW_WINDOW_DAYS, days);
+    const dowFactor = new Float64Array(7).fill(1);
+    for (let w = 0; w < 7; w++) {
+      if (dowCount[w] > 0 && dowMean > 0) dowFactor[w] = (dowSum[w] / dowCount[w]) / dowMean;
+    }
+
+    const fallback = Number.isNaN(recent) ? windowMean(0, days) : recent;
+
+    for (let f = 0; f < horizon; f++) {
+      // Smallest whole-season lag that lands inside the history
+      const seasons = Math.floor(f / SEASON) + 1;
+      const idx = days + f - SEASON * seasons;
+      const seasonal = idx >= 0 ? windowMean(idx - 3, idx + 4) : NaN;
+      const w = (startDow + days + f) % 7;
+
+      out[h * horizon + f] = Number.isNaN(seasonal)
+        ? fallback * dowFactor[w]
+        : seasonal * Math.pow(trend, seasons) * dowFactor[w];
+    }
+  }
+
+  return out;
+}
@@ -0,0 +1,103 @@
+/**
+ * Change Tracker - version counters for conditional GET support
+ * Every write through storage bumps a per-table counter (and a per-hotel
+ * counter when the row belongs to a hotel). Read endpoints derive their ETag
+ * from these counters, so a poll can be answered with 304 before any heavy
+ * query runs. Counters live in the database so every server instance agrees.
+ */
+
+import type { Request, Response, NextFunction } from "express";
+import { changeCounters } from "@shared/schema";
+import { db } from "./db";
+import { inArray, sql } from "drizzle-orm";
+
+export type TrackedTable = 'hotels' | 'events' | 'forecasts' | 'hotelActuals' | 'systemForecasts' | 'externalEvents';
+
+export interface VersionScope {
+  tables: TrackedTable[];
+  hotelId?: string;
+}
+
+export class ChangeTracker {
+  /**
+   * Record a write to a table, optionally scoped to one or more hotels
+   */
+  async bump(table: TrackedTable, hotelIds: Array<string | null | undefined> = []): Promise<void> {
+    const scopes = new Set<string>([table]);
+    for (const hotelId of hotelIds) {
+      if (hotelId) scopes.add(`${table}:${hotelId}`);
+    }
+
+    try {
+      await db
+        .insert(changeCounters)
+        .values(Array.from(scopes).map(scope => ({ scope, version: 1 })))
+        .onConflictDoUpdate({
+          target: changeCounters.scope,
+          set: {
+            version: sql`${changeCounters.version} + 1`,
+            updatedAt: new Date(),
+          },
+        });
+    } catch (error) {
+      // A missed bump only costs a stale 304 window, never a failed write
+      console.error(`Error bumping change counter for ${table}:`, error);
+    }
+  }
+
+  /**
+   * Build a version string for a set of tables, narrowed to one hotel when given
+   */
+  async getVersion(scope: VersionScope): Promise<string> {
+    const keys = scope.tables.map(table => scope.hotelId ? `${table}:${scope.hotelId}` : table);
+    const rows = await db
+      .select({ scope: changeCounters.scope, version: changeCounters.version })
+      .from(changeCounters)
+      .where(inArray(changeCounters.scope, keys));
+
+    const versions = new Map(rows.map(row => [row.scope, row.version]));
+    return keys.map(key => `${versions.get(key) || 0}`).join('.');
+  }
+}
+
+export const changeTracker = new ChangeTracker();
+
+/**
+ * Express middleware answering If-None-Match with 304 before the handler runs.
+ * The resolver receives the request so scopes can depend on params or query.
+ */
+export function conditionalGet(resolveScope: (req: Request) => VersionScope) {
+  return async (req: Request, res: Response, next: NextFunction) => {
+    try {
+      const version = await changeTracker.getVersion(resolveScope(req));
+      // The URL is part of the tag so different filters never share a 304
+      const etag = `W/"${version}-${hashString(req.originalUrl)}"`;
+
+      // Clients must revalidate on every use; revalidation is cheap thanks to the ETag
+      res.setHeader('Cache-Control', 'private, no-cache');
+      res.setHeader('ETag', etag);
+
+      const ifNoneMatch = req.headers['if-none-match'];
+      if (ifNoneMatch && ifNoneMatch.split(',').some(tag => tag.trim() === etag)) {
+        return res.status(304).end();
+      }
+    } catch (error) {
+      // Fall through to a full response if counters are unavailable
+      console.error("Error resolving ETag version:", error);
+    }
+
+    next();
+  };
+}
+
+/**
+ * Short, stable, non-cryptographic hash (FNV-1a) used to fold URLs into ETags
+ */
+function hashString(value: string): string {
+  let hash = 0x811c9dc5;
+  for (let i = 0; i < value.length; i++) {
+    hash ^= value.charCodeAt(i);
+    hash = Math.imul(hash, 0x01000193);
+  }
+  return (hash >>> 0).toString(36);
+}
@@ -0,0 +1,485 @@
+/**
+ * Chat Intents - analytical questions answered from aggregate queries
+ * Common questions (rankings, totals, growth versus same time last year,
+ * event impact and forecast accuracy) are recognized from their wording,
+ * together with a metric, a period ("last quarter", "March 2025", "ytd") and
+ * an optional hotel or city. Each is answered with one parameterized
+ * aggregate query, so the numbers are exact and arrive in milliseconds; a
+ * language model, when used at all, only rephrases the computed answer.
+ */
+
+import { storage, type HotelPeriodTotals } from './storage';
+import { accuracyFromSums } from './forecast-accuracy';
+import { addDays, addMonths, monthBounds, toISODate } from './date-utils';
+import type { Event, Hotel } from '@shared/schema';
+
+const STLY_DAYS = 364; // same weekday last year
+const DEFAULT_LIMIT = 5;
+const MAX_LIMIT = 50;
+
+export type IntentKind = 'ranking' | 'total' | 'growth' | 'eventImpact' | 'forecastAccuracy';
+export type IntentMetric = 'revenue' | 'occupancyRate' | 'averageDailyRate' | 'roomNights';
+
+export interface Period {
+  startDate: string;
+  endDate: string;
+  label: string;
+}
+
+export interface ChatIntent {
+  kind: IntentKind;
+  metric: IntentMetric;
+  period: Period;
+  limit: number;
+  ascending: boolean;
+  hotels: Hotel[] | null; // null means the whole portfolio
+  scopeLabel: string;
+}
+
+export interface IntentAnswer {
+  intent: ChatIntent;
+  text: string;
+}
+
+const MONTHS = ['january', 'february', 'march', 'april', 'may', 'june', 'july', 'august',
+  'september', 'october', 'november', 'december'];
+
+const METRIC_LABELS: Record<IntentMetric, string> = {
+  revenue: 'revenue',
+  occupancyRate: 'occupancy',
+  averageDailyRate: 'ADR',
+  roomNights: 'room nights',
+};
+
+// Hotel attributes and metrics no aggregate query here can answer; a question
+// about them ("which hotel has the most rooms?") must not be answered with revenue
+const UNANSWERABLE = /\b(?:rooms?|suites?|beds?|floors?|capacity|size|stars?|ratings?|reviews?|amenit(?:y|ies)|staff|employees?|address(?:es)?|distance|revpar|goppar|profits?|costs?|expenses?|margins?)\b/;
+
+// Phrases naming the comparison period; removed before the period is parsed
+const COMPARISON = /\b(?:versus|vs\.?|compared (?:to|with)|against)\s+(?:the\s+)?(?:same (?:time|period|month|quarter)\s+)?last year\b|\bsame (?:time|period) last year\b|\byear over year\b|\byoy\b|\bstly\b/g;
+
+function escapeRegExp(value: string): string {
+  return value.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+}
+
+function mentions(text: string, name: string): boolean {
+  return new RegExp(`\\b${escapeRegExp(name.toLowerCase())}\\b`).test(text);
+}
+
+function quarterOf(month: string): { year: number; quarter: number } {
+  const [year, monthIndex] = month.split('-').map(Number);
+  return { year, quarter: Math.ceil(monthIndex / 3) };
+}
+
+function quarterPeriod(year: number, quarter: number): Period {
+  const first = `${year}-${String((quarter - 1) * 3 + 1).padStart(2, '0')}`;
+  return {
+    startDate: `${first}-01`,
+    endDate: monthBounds(addMonths(first, 2)).endDate,
+    label: `Q${quarter} ${year}`,
+  };
+}
+
+function monthPeriod(month: string): Period {
+  const { startDate, endDate } = monthBounds(month);
+  const [year, monthIndex] = month.split('-').map(Number);
+  const name = MONTHS[monthIndex - 1];
+  return { startDate, endDate, label: `${name[0].toUpperCase()}${name.slice(1)} ${year}` };
+}
+
+/**
+ * Period named in a question, relative to `today`; null when none is named
+ */
+export function parsePeriod(text: string, today: string): Period | null {
+  const currentMonth = today.substring(0, 7);
+  const { year, quarter } = quarterOf(currentMonth);
+  let match: RegExpMatchArray | null;
+
+  if (/\b(?:last|previous|prior) quarter\b/.test(text)) {
+    return quarter === 1 ? quarterPeriod(year - 1, 4) : quarterPeriod(year, quarter - 1);
+  }
+  if (/\b(?:this|current) quarter\b|\bquarter to date\b|\bqtd\b/.test(text)) {
+    return { ...quarterPeriod(year, quarter), endDate: today, label: `Q${quarter} ${year} to date` };
+  }
+  if (/\b(?:last|previous|prior) month\b/.test(text)) {
+    return monthPeriod(addMonths(currentMonth, -1));
+  }
+  if (/\b(?:this|current) month\b|\bmonth to date\b|\bmtd\b/.test(text)) {
+    return { startDate: `${currentMonth}-01`, endDate: today, label: `${monthPeriod(currentMonth).label} to date` };
+  }
+  if (/\b(?:this|current) year\b|\byear to date\b|\bytd\b/.test(text)) {
+    return { startDate: `${year}-01-01`, endDate: today, label: `${year} to date` };
+  }
+  if (/\b(?:last|previous|prior) year\b/.test(text)) {
+    return { startDate: `${year - 1}-01-01`, endDate: `${year - 1}-12-31`, label: `${year - 1}` };
+  }
+  if ((match = text.match(/\b(?:last|past|previous) (\d{1,3}) (day|week|month)s?\b/))) {
+    const count = parseInt(match[1]);
+    if (match[2] === 'month') {
+      // Whole months, ending with the last complete one
+      const first = addMonths(currentMonth, -count);
+      return {
+        startDate: `${first}-01`,
+        endDate: monthBounds(addMonths(currentMonth, -1)).endDate,
+        label: `the last ${count} months`,
+      };
+    }
+    const days = count * (match[2] === 'week' ? 7 : 1);
+    return { startDate: addDays(today, -(days - 1)), endDate: today, label: `the last ${count} ${match[2]}s` };
+  }
+  if ((match = text.match(/\bq([1-4])(?:\s+(?:of\s+)?(\d{4}))?\b/))) {
+    const q = parseInt(match[1]);
+    // Without a year, the most recent such quarter that has started
+    const y = match[2] ? parseInt(match[2]) : (q > quarter ? year - 1 : year);
+    return quarterPeriod(y, q);
+  }
+  // Full month names only, so "may I ..." needs a year to count as May
+  if ((match = text.match(/\b(january|february|march|april|may|june|july|august|september|october|november|december)(?:\s+(?:of\s+)?(\d{4}))?\b/))
+    && (match[1] !== 'may' || match[2])) {
+    const monthNumber = String(MONTHS.indexOf(match[1]) + 1).padStart(2, '0');
+    const y = match[2] ? parseInt(match[2]) : (`${year}-${monthNumber}` > currentMonth ? year - 1 : year);
+    return monthPeriod(`${y}-${monthNumber}`);
+  }
+  if ((match = text.match(/\b(20\d{2})\b/))) {
+    return { startDate: `${match[1]}-01-01`, endDate: `${match[1]}-12-31`, label: match[1] };
+  }
+  return null;
+}
+
+/**
+ * Occupancy and ADR of several hotels combined, weighted by their days
+ */
+function combine(rows: HotelPeriodTotals[]) {
+  let revenue = 0;
+  let roomNights = 0;
+  let days = 0;
+  let occupancyWeighted = 0;
+  let occupancyDays = 0;
+  let adrWeighted = 0;
+  let adrDays = 0;
+  for (const row of rows) {
+    revenue += row.revenue;
+    roomNights += row.roomNights;
+    days += row.days;
+    if (row.occupancyRate != null) {
+      occupancyWeighted += row.occupancyRate * row.days;
+      occupancyDays += row.days;
+    }
+    if (row.averageDailyRate != null) {
+      adrWeighted += row.averageDailyRate * row.days;
+      adrDays += row.days;
+    }
+  }
+  return {
+    revenue,
+    roomNights,
+    days,
+    occupancyRate: occupancyDays > 0 ? occupancyWeighted / occupancyDays : null,
+    // Room-night weighted when room nights are known
+    averageDailyRate: roomNights > 0 ? revenue / roomNights : adrDays > 0 ? adrWeighted / adrDays : null,
+  };
+}
+
+function formatMetric(metric: IntentMetric, value: number | null): string {
+  if (value == null) return 'n/a';
+  switch (metric) {
+    case 'revenue':
+      return `$${Math.round(value).toLocaleString('en-US')}`;
+    case 'averageDailyRate':
+      return `$${value.toFixed(2)}`;
+    case 'occupancyRate':
+      return `${value.toFixed(1)}%`;
+    case 'roomNights':
+      return Math.round(value).toLocaleString('en-US');
+  }
+}
+
+function formatChange(metric: IntentMetric, current: number | null, previous: number | null): string {
+  if (current == null || previous == null) return 'no comparison available';
+  if (metric === 'occupancyRate') {
+    const points = current - previous;
+    return `${points >= 0 ? '+' : ''}${points.toFixed(1)} pts`;
+  }
+  if (previous === 0) return 'no comparison available';
+  const percent = ((current - previous) / previous) * 100;
+  return `${percent >= 0 ? '+' : ''}${percent.toFixed(1)}%`;
+}
+
+function percent(value: number | null): string {
+  return value == null ? 'n/a' : `${value.toFixed(1)}%`;
+}
+
+export class ChatIntentService {
+  /**
+   * Recognize an analytical question; null when it is not one
+   */
+  async recognize(messageText: string, today: string = toISODate(new Date())): Promise<ChatIntent | null> {
+    const text = messageText.toLowerCase();
+
+    const aboutEvents = /\b(?:events?|conferences?|festivals?|concerts?|shows?|games?)\b/.test(text);
+    // Rankings, totals and growth are about hotel performance, not events or tasks
+    const aboutPerformance = /\b(?:revenue|occupancy|adr|room ?nights?|hotels?|propert(?:y|ies)|portfolio|sales|perform(?:ance|ed|ing)?)\b/.test(text)
+      && !aboutEvents
+      && !/\btasks?\b/.test(text);
+
+    let kind: IntentKind | null = null;
+    if (/\b(?:accuracy|accurate|mape|wape|forecast error|forecast bias)\b/.test(text)) {
+      kind = 'forecastAccuracy';
+    } else if (aboutEvents && /\b(?:impact|uplift|lift|effect|boost)\b/.test(text)) {
+      kind = 'eventImpact';
+    } else if (!aboutPerformance) {
+      return null;
+    } else if (/\b(?:growth|grow|grew|growing|change|changed)\b/.test(text) || text.match(COMPARISON)) {
+      kind = 'growth';
+    } else if (/\b(?:top|bottom|best|worst|rank|ranking|ranked|highest|lowest|leading)\b/.test(text)) {
+      kind = 'ranking';
+    } else if (/\b(?:total|sum|overall|combined|how much)\b/.test(text)) {
+      kind = 'total';
+    } else {
+      return null;
+    }
+
+    let metric: IntentMetric = 'revenue';
+    if (/\boccupancy\b|\bocc\b/.test(text)) metric = 'occupancyRate';
+    else if (/\badr\b|\baverage daily rate\b|\broom rate\b/.test(text)) metric = 'averageDailyRate';
+    else if (/\broom ?nights?\b/.test(text)) metric = 'roomNights';
+
+    const limitMatch = text.match(/\b(?:top|bottom|best|worst)\s+(\d{1,3})\b/) || text.match(/\b(\d{1,3})\s+(?:best|worst|top|bottom|highest|lowest)\b/);
+    const limit = Math.min(MAX_LIMIT, Math.max(1, limitMatch ? parseInt(limitMatch[1]) : DEFAULT_LIMIT));
+    // Low values first; for accuracy the value is the error, so "best" means lowest
+    const ascending = kind === 'forecastAccuracy'
+      ? /\b(?:best|most accurate|lowest)\b/.test(text)
+      : /\b(?:bottom|worst|lowest|weakest)\b/.test(text);
+
+    // "vs last year" names the comparison, not the period asked about
+    const period = parsePeriod(text.replace(COMPARISON, ' '), today) || {
+      startDate: addDays(today, -364),
+      endDate: today,
+      label: 'the last 12 months',
+    };
+
+    // Longest names first so "Grand Plaza Miami" wins over "Grand Plaza"
+    const hotelList = await storage.getAllHotels();
+    const named = hotelList
+      .filter(hotel => hotel.name && mentions(text, hotel.name))
+      .sort((a, b) => b.name.length - a.name.length);
+    let hotels: Hotel[] | null = null;
+    let scopeLabel = 'the portfolio';
+    if (named.length > 0) {
+      hotels = named.filter(hotel => !named.some(other => other !== hotel && other.name.length > hotel.name.length && other.name.toLowerCase().includes(hotel.name.toLowerCase())));
+      scopeLabel = hotels.map(hotel => hotel.name).join(', ');
+    } else {
+      const city = Array.from(new Set(hotelList.map(hotel => hotel.city).filter((c): c is string => !!c)))
+        .sort((a, b) => b.length - a.length)
+        .find(c => mentions(text, c));
+      if (city) {
+        hotels = hotelList.filter(hotel => hotel.city === city);
+        scopeLabel = city;
+      }
+    }
+
+    // Room nights and room rate are metrics, and hotel names ("... Suites")
+    // are not attributes; anything else unanswerable falls through
+    const asked = named.reduce(
+      (rest, hotel) => rest.split(hotel.name.toLowerCase()).join(' '),
+      text.replace(/\broom ?nights?\b|\broom rates?\b/g, ' ')
+    );
+    if (UNANSWERABLE.test(asked)) return null;
+
+    return { kind, metric, period, limit, ascending, hotels, scopeLabel };
+  }
+
+  /**
+   * Answer an analytical question, or null when the message is not one
+   */
+  async answer(messageText: string, today: string = toISODate(new Date())): Promise<IntentAnswer | null> {
+    const intent = await this.recognize(messageText, today);
+    if (!intent) return null;
+
+    let text: string;
+    switch (intent.kind) {
+      case 'ranking':
+        text = await this.ranking(intent);
+        break;
+      case 'total':
+        text = await this.total(intent);
+        break;
+      case 'growth':
+        text = await this.growth(intent);
+        break;
+      case 'eventImpact':
+        text = await this.eventImpact(intent, messageText.toLowerCase());
+        break;
+      case 'forecastAccuracy':
+        text = await this.forecastAccuracy(intent);
+        break;
+    }
+    return { intent, text };
+  }
+
+  private describe(intent: ChatIntent): string {
+    const { label, startDate, endDate } = intent.period;
+    return `${label} (${startDate} to ${endDate})`;
+  }
+
+  private async totals(intent: ChatIntent, startDate: string, endDate: string): Promise<HotelPeriodTotals[]> {
+    return storage.getHotelPeriodTotals(startDate, endDate, intent.hotels?.map(hotel => hotel.id));
+  }
+
+  private async hotelNames(): Promise<Map<string, Hotel>> {
+    return new Map((await storage.getAllHotels()).map(hotel => [hotel.id, hotel]));
+  }
+
+  private async ranking(intent: ChatIntent): Promise<string> {
+    const { metric, limit, ascending } = intent;
+    const rows = (await this.totals(intent, intent.period.startDate, intent.period.endDate))
+      .filter(row => row[metric] != null);
+    if (rows.length === 0) return `No actuals were found for ${intent.scopeLabel} in ${this.describe(intent)}.`;
+
+    rows.sort((a, b) => (ascending ? a[metric]! - b[metric]! : b[metric]! - a[metric]!));
+    const hotelsById = await this.hotelNames();
+    const lines = [`**${ascending ? 'Bottom' : 'Top'} ${Math.min(limit, rows.length)} hotels by ${METRIC_LABELS[metric]}, ${this.describe(intent)}:**`];
+    rows.slice(0, limit).forEach((row, i) => {
+      const hotel = hotelsById.get(row.hotelId);
+      lines.push(`${i + 1}. ${hotel?.name || row.hotelId}${hotel?.city ? ` (${hotel.city})` : ''}: ${formatMetric(metric, row[metric])}`);
+    });
+    return lines.join('\n');
+  }
+
+  private async total(intent: ChatIntent): Promise<string> {
+    const rows = await this.totals(intent, intent.period.startDate, intent.period.endDate);
+    if (rows.length === 0) return `No actuals were found for ${intent.scopeLabel} in ${this.describe(intent)}.`;
+
+    const combined = combine(rows);
+    return [
+      `**${intent.scopeLabel[0].toUpperCase()}${intent.scopeLabel.slice(1)}, ${this.describe(intent)}** (${rows.length} hotels):`,
+      `• Revenue: ${formatMetric('revenue', combined.revenue)}`,
+      `• Room nights: ${formatMetric('roomNights', combined.roomNights)}`,
+      `• Average occupancy: ${formatMetric('occupancyRate', combined.occupancyRate)}`,
+      `• ADR: ${formatMetric('averageDailyRate', combined.averageDailyRate)}`,
+    ].join('\n');
+  }
+
+  private async growth(intent: ChatIntent): Promise<string> {
+    const { metric, period } = intent;
+    const stlyStart = addDays(period.startDate, -STLY_DAYS);
+    const stlyEnd = addDays(period.endDate, -STLY_DAYS);
+    const [current, previous] = await Promise.all([
+      this.totals(intent, period.startDate, period.endDate),
+      this.totals(intent, stlyStart, stlyEnd),
+    ]);
+    if (current.length === 0) return `No actuals were found for ${intent.scopeLabel} in ${this.describe(intent)}.`;
+
+    const now = combine(current)[metric];
+    const before = previous.length ? combine(previous)[metric] : null;
+    const lines = [
+      `**${METRIC_LABELS[metric][0].toUpperCase()}${METRIC_LABELS[metric].slice(1)} for ${intent.scopeLabel}, ${this.describe(intent)}:** ` +
+        `${formatMetric(metric, now)} vs ${formatMetric(metric, before)} same time last year (${stlyStart} to ${stlyEnd}), ` +
+        `${formatChange(metric, now, before)}.`,
+    ];
+
+    // Biggest movers among hotels present in both periods
+    const previousById = new Map(previous.map(row => [row.hotelId, row]));
+    const movers = current
+      .filter(row => previousById.has(row.hotelId) && row[metric] != null && previousById.get(row.hotelId)![metric] != null)
+      .map(row => {
+        const last = previousById.get(row.hotelId)![metric]!;
+        const change = metric === 'occupancyRate' ? row[metric]! - last : last !== 0 ? (row[metric]! - last) / last : null;
+        return { row, last, change };
+      })
+      .filter((mover): mover is { row: HotelPeriodTotals; last: number; change: number } => mover.change != null)
+      .sort((a, b) => b.change - a.change);
+
+    if (movers.length > 1) {
+      const hotelsById = await this.hotelNames();
+      const show = (list: typeof movers) => list.map(({ row, last }) =>
+        `• ${hotelsById.get(row.hotelId)?.name || row.hotelId}: ${formatMetric(metric, row[metric])} (${formatChange(metric, row[metric], last)})`);
+      const gains = movers.filter(mover => mover.change > 0).slice(0, intent.limit);
+      const declines = movers.filter(mover => mover.change < 0).reverse().slice(0, intent.limit);
+      if (gains.length) lines.push('\n**Biggest gains:**', ...show(gains));
+      if (declines.length) lines.push('\n**Biggest declines:**', ...show(declines));
+    }
+    return lines.join('\n');
+  }
+
+  private async eventImpact(intent: ChatIntent, text: string): Promise<string> {
+    const allEvents = await storage.getEvents();
+    // Events named in the question, else those in the period (and city, if one was named)
+    let selected = allEvents.filter(event => event.name && mentions(text, event.name));
+    if (selected.length === 0) {
+      const cities = intent.hotels ? new Set(intent.hotels.map(hotel => hotel.city)) : null;
+      selected = allEvents.filter(event =>
+        event.startDate <= intent.period.endDate &&
+        event.endDate >= intent.period.startDate &&
+        (!cities || cities.has(event.city))
+      );
+    }
+    if (selected.length === 0) return `No events were found for ${intent.scopeLabel} in ${this.describe(intent)}.`;
+
+    const summaries = await storage.getEventImpactSummaries(selected.map(event => event.id));
+    if (summaries.length === 0) {
+      return `None of the ${selected.length} matching events have event-day actuals with a same-time-last-year comparison yet.`;
+    }
+
+    const eventsById = new Map<string, Event>(selected.map(event => [event.id, event]));
+    const ranked = summaries
+      .map(summary => ({ summary, uplift: (summary.revenue - summary.stlyRevenue) / summary.stlyRevenue }))
+      .sort((a, b) => (intent.ascending ? a.uplift - b.uplift : b.uplift - a.uplift));
+
+    const lines = [`**Event impact on hotel revenue vs same weekday last year${summaries.length > 1 ? `, ${this.describe(intent)}` : ''}:**`];
+    for (const { summary } of ranked.slice(0, intent.limit)) {
+      const event = eventsById.get(summary.eventId);
+      lines.push(
+        `• ${event?.name || summary.eventId}${event?.city ? ` (${event.city}, ${event.startDate})` : ''}: ` +
+          `revenue ${formatChange('revenue', summary.revenue, summary.stlyRevenue)}, ` +
+          `occupancy ${formatChange('occupancyRate', summary.occupancyRate, summary.stlyOccupancyRate)}, ` +
+          `ADR ${formatChange('averageDailyRate', summary.averageDailyRate, summary.stlyAverageDailyRate)} ` +
+          `across ${summary.hotels} hotels and ${summary.days} days`
+      );
+    }
+    if (ranked.length > intent.limit) lines.push(`…and ${ranked.length - intent.limit} more events.`);
+    return lines.join('\n');
+  }
+
+  private async forecastAccuracy(intent: ChatIntent): Promise<string> {
+    const rows = await storage.getForecastErrorSums(
+      intent.period.startDate,
+      intent.period.endDate,
+      intent.hotels?.map(hotel => hotel.id)
+    );
+    if (rows.length === 0) {
+      return `No days with both a revenue forecast and actuals were found for ${intent.scopeLabel} in ${this.describe(intent)}.`;
+    }
+
+    const sum = (key: 'count' | 'apeSum' | 'apeCount' | 'absErrorSum' | 'errorSum' | 'actualSum') =>
+      rows.reduce((total, row) => total + row[key], 0);
+    const overall = accuracyFromSums({
+      count: sum('count'),
+      apeSum: sum('apeSum'),
+      apeCount: sum('apeCount'),
+      absErrorSum: sum('absErrorSum'),
+      errorSum: sum('errorSum'),
+      actualSum: sum('actualSum'),
+    });
+    const lines = [
+      `**Revenue forecast accuracy for ${intent.scopeLabel}, ${this.describe(intent)}** (${overall.count} hotel days):`,
+      `• WAPE ${percent(overall.wape)}, MAPE ${percent(overall.mape)}, bias ${overall.bias != null && overall.bias >= 0 ? '+' : ''}${percent(overall.bias)}`,
+    ];
+
+    if (rows.length > 1) {
+      const hotelsById = await this.hotelNames();
+      const perHotel = rows
+        .map(row => ({ row, metrics: accuracyFromSums(row) }))
+        .filter(({ metrics }) => metrics.wape != null)
+        .sort((a, b) => (intent.ascending ? a.metrics.wape! - b.metrics.wape! : b.metrics.wape! - a.metrics.wape!));
+      lines.push(`\n**${intent.ascending ? 'Most' : 'Least'} accurate hotels (WAPE):**`);
+      perHotel.slice(0, intent.limit).forEach(({ row, metrics }) => {
+        lines.push(`• ${hotelsById.get(row.hotelId)?.name || row.hotelId}: ${percent(metrics.wape)} over ${row.count} days`);
+      });
+    }
+    return lines.join('\n');
+  }
+}
+
+// Export singleton instance
+export const chatIntents = new ChatIntentService();
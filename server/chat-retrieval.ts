@@ -0,0 +1,398 @@
+/**
+ * Chat Retrieval - compact documents and a BM25 index for the chat assistant
+ * Instead of pasting raw rows into the prompt, the assistant retrieves a few
+ * short textual summaries: one per hotel, city, event and month, written from
+ * the monthly aggregates. Documents are ranked with BM25 and taken best-first
+ * until a token budget is spent. When the change counters move, only the
+ * document families built from the changed tables are regenerated, and only
+ * documents whose text actually changed are re-indexed.
+ */
+
+import { storage, type HotelMonthSummary } from './storage';
+import { changeTracker, type TrackedTable } from './change-tracker';
+import { addMonths, monthBounds, previousYearMonth, toISODate } from './date-utils';
+import type { Event, Hotel } from '@shared/schema';
+
+const VERSION_CHECK_MS = 5000;
+const BM25_K1 = 1.2;
+const BM25_B = 0.75;
+const DEFAULT_TOP_K = 8;
+const LIST_LIMIT = 5;
+
+// Prompt budget for retrieved documents, in approximate tokens
+export const CONTEXT_TOKEN_BUDGET = parseInt(process.env.CHAT_CONTEXT_TOKEN_BUDGET || '1500');
+
+export type DocumentKind = 'hotel' | 'city' | 'event' | 'month';
+
+export interface RetrievalDocument {
+  id: string; // kind:key
+  kind: DocumentKind;
+  title: string;
+  text: string;
+  tokens: number;
+}
+
+export interface RetrievedDocument extends RetrievalDocument {
+  score: number;
+}
+
+const TRACKED_TABLES: TrackedTable[] = ['hotels', 'events', 'forecasts', 'hotelActuals'];
+
+// Tables each document family is written from
+const FAMILY_SOURCES: Record<DocumentKind, TrackedTable[]> = {
+  hotel: ['hotels', 'hotelActuals', 'forecasts'],
+  city: ['hotels', 'events', 'hotelActuals'],
+  event: ['events', 'hotels'],
+  month: ['hotels', 'events', 'hotelActuals', 'forecasts'],
+};
+
+const STOPWORDS = new Set([
+  'a', 'an', 'and', 'are', 'at', 'be', 'by', 'do', 'for', 'from', 'has', 'have', 'how', 'i', 'in', 'is',
+  'it', 'me', 'my', 'of', 'on', 'or', 'our', 'show', 'tell', 'that', 'the', 'their', 'there', 'this',
+  'to', 'was', 'we', 'were', 'what', 'when', 'where', 'which', 'who', 'with', 'you',
+]);
+
+const MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August',
+  'September', 'October', 'November', 'December'];
+
+export function tokenize(text: string): string[] {
+  return text
+    .normalize('NFKD')
+    .replace(/[\u0300-\u036f]/g, '')
+    .toLowerCase()
+    // Dates stay whole so their day and month numbers do not match unrelated figures
+    .match(/\d{4}-\d{2}(?:-\d{2})?|[a-z0-9]+/g)
+    ?.filter(token => token.length > 1 && !STOPWORDS.has(token)) || [];
+}
+
+/**
+ * Rough token count for prompt budgeting (about four characters per token)
+ */
+export function estimateTokens(text: string): number {
+  return Math.ceil(text.length / 4);
+}
+
+/**
+ * Okapi BM25 over an inverted index that supports replacing single documents
+ */
+export class Bm25Index {
+  private postings = new Map<string, Map<string, number>>();
+  private lengths = new Map<string, number>();
+  private terms = new Map<string, string[]>(); // distinct terms per document, for removal
+  private totalLength = 0;
+
+  get size(): number {
+    return this.lengths.size;
+  }
+
+  upsert(id: string, text: string): void {
+    this.remove(id);
+    const terms = tokenize(text);
+    const frequencies = new Map<string, number>();
+    for (const term of terms) frequencies.set(term, (frequencies.get(term) || 0) + 1);
+
+    frequencies.forEach((count, term) => {
+      let posting = this.postings.get(term);
+      if (!posting) this.postings.set(term, posting = new Map());
+      posting.set(id, count);
+    });
+    this.lengths.set(id, terms.length);
+    this.terms.set(id, Array.from(frequencies.keys()));
+    this.totalLength += terms.length;
+  }
+
+  remove(id: string): void {
+    const length = this.lengths.get(id);
+    if (length === undefined) return;
+    for (const term of this.terms.get(id)!) {
+      const posting = this.postings.get(term)!;
+      posting.delete(id);
+      if (posting.size === 0) this.postings.delete(term);
+    }
+    this.lengths.delete(id);
+    this.terms.delete(id);
+    this.totalLength -= length;
+  }
+
+  search(query: string, limit: number): Array<{ id: string; score: number }> {
+    const n = this.lengths.size;
+    if (n === 0) return [];
+    const averageLength = this.totalLength / n || 1;
+    const scores = new Map<string, number>();
+
+    for (const term of Array.from(new Set(tokenize(query)))) {
+      const posting = this.postings.get(term);
+      if (!posting) continue;
+      const idf = Math.log(1 + (n - posting.size + 0.5) / (posting.size + 0.5));
+      posting.forEach((tf, id) => {
+        const norm = tf + BM25_K1 * (1 - BM25_B + (BM25_B * this.lengths.get(id)!) / averageLength);
+        scores.set(id, (scores.get(id) || 0) + (idf * tf * (BM25_K1 + 1)) / norm);
+      });
+    }
+
+    return Array.from(scores.entries())
+      .map(([id, score]) => ({ id, score }))
+      .sort((a, b) => b.score - a.score)
+      .slice(0, limit);
+  }
+}
+
+function money(value: number): string {
+  return `$${Math.round(value).toLocaleString('en-US')}`;
+}
+
+function monthLabel(month: string): string {
+  const [year, monthIndex] = month.split('-').map(Number);
+  return `${MONTH_NAMES[monthIndex - 1]} ${year} (${month}, Q${Math.ceil(monthIndex / 3)} ${year})`;
+}
+
+function place(row: { city: string | null; state: string | null; country: string | null }): string {
+  return [row.city, row.state, row.country].filter(Boolean).join(', ');
+}
+
+function listed(items: string[]): string {
+  const shown = items.slice(0, LIST_LIMIT).join('; ');
+  return items.length > LIST_LIMIT ? `${shown}; and ${items.length - LIST_LIMIT} more` : shown;
+}
+
+interface Totals {
+  revenue: number;
+  roomNights: number;
+  occupancy: number[];
+  adr: number[];
+  forecastRevenue: number;
+}
+
+function total(rows: HotelMonthSummary[]): Totals {
+  const totals: Totals = { revenue: 0, roomNights: 0, occupancy: [], adr: [], forecastRevenue: 0 };
+  for (const row of rows) {
+    totals.revenue += row.revenue || 0;
+    totals.roomNights += row.roomNights || 0;
+    totals.forecastRevenue += row.forecastRevenue || 0;
+    if (row.occupancyRate != null) totals.occupancy.push(row.occupancyRate);
+    if (row.averageDailyRate != null) totals.adr.push(row.averageDailyRate);
+  }
+  return totals;
+}
+
+function performance(totals: Totals): string {
+  const average = (values: number[]) => values.reduce((sum, v) => sum + v, 0) / values.length;
+  const parts = [`revenue ${money(totals.revenue)}`, `${totals.roomNights.toLocaleString('en-US')} room nights`];
+  if (totals.occupancy.length) parts.push(`average occupancy ${average(totals.occupancy).toFixed(1)}%`);
+  if (totals.adr.length) parts.push(`ADR ${money(average(totals.adr))}`);
+  return parts.join(', ');
+}
+
+interface SourceData {
+  hotels: Hotel[];
+  events: Event[];
+  summaries: HotelMonthSummary[];
+  currentMonth: string;
+}
+
+/**
+ * Documents of one family, written from the loaded rows
+ */
+function buildFamily(kind: DocumentKind, data: SourceData): RetrievalDocument[] {
+  const { hotels, events, summaries, currentMonth } = data;
+  const trailingFrom = addMonths(currentMonth, -11);
+  const hotelsById = new Map(hotels.map(hotel => [hotel.id, hotel]));
+  const byHotel = new Map<string, HotelMonthSummary[]>();
+  for (const row of summaries) {
+    const list = byHotel.get(row.hotelId) || [];
+    list.push(row);
+    byHotel.set(row.hotelId, list);
+  }
+  const documents: Array<Omit<RetrievalDocument, 'tokens'>> = [];
+
+  if (kind === 'hotel') {
+    for (const hotel of hotels) {
+      const rows = byHotel.get(hotel.id) || [];
+      const trailing = rows.filter(r => r.month >= trailingFrom && r.month <= currentMonth && r.revenue != null);
+      const best = trailing.reduce<HotelMonthSummary | null>((top, r) => (!top || r.revenue! > top.revenue! ? r : top), null);
+      const ahead = rows.filter(r => r.month > currentMonth && r.month <= addMonths(currentMonth, 3));
+      const sentences = [
+        `${hotel.name} is a hotel in ${place(hotel) || 'an unknown city'} with ${hotel.totalRooms ?? 'an unknown number of'} rooms` +
+          `${hotel.starRating ? `, rated ${hotel.starRating} stars` : ''}, status ${hotel.status || 'active'}.`,
+      ];
+      if (trailing.length) {
+        sentences.push(`Last 12 months (${trailingFrom} to ${currentMonth}): ${performance(total(trailing))}.`);
+        sentences.push(`Best month: ${monthLabel(best!.month)} with ${money(best!.revenue!)}.`);
+      }
+      if (ahead.some(r => r.forecastRevenue != null)) {
+        sentences.push(`Forecast revenue for the next 3 months: ${money(total(ahead).forecastRevenue)}.`);
+      }
+      if (hotel.description) sentences.push(hotel.description.substring(0, 200));
+      documents.push({ id: `hotel:${hotel.id}`, kind, title: hotel.name, text: sentences.join(' ') });
+    }
+  }
+
+  if (kind === 'city') {
+    const cities = new Map<string, { hotels: Hotel[]; events: Event[] }>();
+    const entry = (city: string) => {
+      if (!cities.has(city)) cities.set(city, { hotels: [], events: [] });
+      return cities.get(city)!;
+    };
+    hotels.forEach(hotel => hotel.city && entry(hotel.city).hotels.push(hotel));
+    const today = toISODate(new Date());
+    events.forEach(event => event.city && event.endDate >= today && entry(event.city).events.push(event));
+
+    cities.forEach((city, name) => {
+      const trailing = city.hotels
+        .flatMap(hotel => byHotel.get(hotel.id) || [])
+        .filter(r => r.month >= trailingFrom && r.month <= currentMonth);
+      const rooms = city.hotels.reduce((sum, hotel) => sum + (hotel.totalRooms || 0), 0);
+      const sentences = [`${name}: ${city.hotels.length} hotels with ${rooms} rooms.`];
+      if (city.hotels.length) sentences.push(`Hotels: ${listed(city.hotels.map(hotel => hotel.name))}.`);
+      if (trailing.length) sentences.push(`Last 12 months: ${performance(total(trailing))}.`);
+      if (city.events.length) {
+        const upcoming = city.events
+          .sort((a, b) => a.startDate.localeCompare(b.startDate))
+          .map(event => `${event.name} (${event.startDate} to ${event.endDate})`);
+        sentences.push(`Upcoming events: ${listed(upcoming)}.`);
+      }
+      documents.push({ id: `city:${name.toLowerCase()}`, kind, title: name, text: sentences.join(' ') });
+    });
+  }
+
+  if (kind === 'event') {
+    for (const event of events) {
+      const sentences = [
+        `${event.name} is a ${event.category || 'general'} event in ${place(event) || 'an unknown city'} ` +
+          `from ${event.startDate} to ${event.endDate}` +
+          `${event.expectedAttendees ? ` with about ${event.expectedAttendees.toLocaleString('en-US')} expected attendees` : ''}.`,
+      ];
+      if (event.location) sentences.push(`Venue: ${event.location}.`);
+      if (event.description) sentences.push(event.description.substring(0, 200));
+      documents.push({ id: `event:${event.id}`, kind, title: event.name, text: sentences.join(' ') });
+    }
+  }
+
+  if (kind === 'month') {
+    const byMonth = new Map<string, HotelMonthSummary[]>();
+    for (const row of summaries) {
+      const list = byMonth.get(row.month) || [];
+      list.push(row);
+      byMonth.set(row.month, list);
+    }
+    byMonth.forEach((rows, month) => {
+      const actual = rows.filter(r => r.revenue != null);
+      const totals = total(rows);
+      const sentences = [`${monthLabel(month)} portfolio.`];
+      if (actual.length) {
+        sentences.push(`Actuals across ${actual.length} hotels: ${performance(total(actual))}.`);
+        const lastYear = byMonth.get(previousYearMonth(month))?.filter(r => r.revenue != null) || [];
+        const lastYearRevenue = total(lastYear).revenue;
+        if (lastYearRevenue > 0) {
+          const growth = ((totals.revenue - lastYearRevenue) / lastYearRevenue) * 100;
+          sentences.push(`Same month last year: ${money(lastYearRevenue)} (${growth >= 0 ? '+' : ''}${growth.toFixed(1)}%).`);
+        }
+        const top = [...actual]
+          .sort((a, b) => b.revenue! - a.revenue!)
+          .map(r => `${hotelsById.get(r.hotelId)?.name || r.hotelId} ${money(r.revenue!)}`);
+        sentences.push(`Top hotels by revenue: ${listed(top)}.`);
+      }
+      if (rows.some(r => r.forecastRevenue != null)) sentences.push(`Forecast revenue: ${money(totals.forecastRevenue)}.`);
+
+      const { startDate, endDate } = monthBounds(month);
+      const during = events
+        .filter(event => event.startDate <= endDate && event.endDate >= startDate)
+        .map(event => `${event.name} in ${event.city || 'unknown city'}`);
+      if (during.length) sentences.push(`Events: ${listed(during)}.`);
+      documents.push({ id: `month:${month}`, kind, title: monthLabel(month), text: sentences.join(' ') });
+    });
+  }
+
+  return documents.map(doc => ({ ...doc, tokens: estimateTokens(doc.text) }));
+}
+
+export class ChatRetrievalService {
+  private documents = new Map<string, RetrievalDocument>();
+  private index = new Bm25Index();
+  private versions: string[] | null = null;
+  private checkedAt = 0;
+  private builtMonth = '';
+  private updating: Promise<void> | null = null;
+
+  /**
+   * Best matching documents for `query`, at most `topK`, fitting `tokenBudget`
+   */
+  async retrieve(query: string, tokenBudget: number = CONTEXT_TOKEN_BUDGET, topK: number = DEFAULT_TOP_K): Promise<RetrievedDocument[]> {
+    await this.refresh();
+
+    const selected: RetrievedDocument[] = [];
+    let used = 0;
+    // Skip documents that would overflow the budget but keep trying smaller ones
+    for (const { id, score } of this.index.search(query, topK * 4)) {
+      const doc = this.documents.get(id)!;
+      if (used + doc.tokens > tokenBudget) continue;
+      selected.push({ ...doc, score });
+      used += doc.tokens;
+      if (selected.length >= topK) break;
+    }
+    return selected;
+  }
+
+  getStats() {
+    const byKind: Record<string, number> = {};
+    this.documents.forEach(doc => {
+      byKind[doc.kind] = (byKind[doc.kind] || 0) + 1;
+    });
+    return { documents: this.documents.size, byKind, versions: this.versions?.join('.') || null };
+  }
+
+  private async refresh(): Promise<void> {
+    if (this.versions && Date.now() - this.checkedAt < VERSION_CHECK_MS) return;
+    if (!this.updating) {
+      this.updating = this.update().finally(() => {
+        this.updating = null;
+      });
+    }
+    await this.updating;
+  }
+
+  private async update(): Promise<void> {
+    const versions = (await changeTracker.getVersion({ tables: TRACKED_TABLES })).split('.');
+    const currentMonth = toISODate(new Date()).substring(0, 7);
+    const changed = new Set(TRACKED_TABLES.filter((_, i) => !this.versions || this.versions[i] !== versions[i]));
+    this.checkedAt = Date.now();
+
+    // Trailing windows and "upcoming" move with the calendar, so a new month rebuilds everything
+    const kinds = (Object.keys(FAMILY_SOURCES) as DocumentKind[]).filter(kind =>
+      this.builtMonth !== currentMonth || FAMILY_SOURCES[kind].some(table => changed.has(table))
+    );
+    if (kinds.length === 0) return;
+
+    const needsSummaries = kinds.some(kind => kind !== 'event');
+    const [hotelList, eventList, summaries] = await Promise.all([
+      storage.getAllHotels(),
+      storage.getEvents(),
+      needsSummaries ? storage.getHotelMonthSummaries() : Promise.resolve([]),
+    ]);
+    const data: SourceData = { hotels: hotelList, events: eventList, summaries, currentMonth };
+
+    let reindexed = 0;
+    for (const kind of kinds) {
+      const fresh = new Map(buildFamily(kind, data).map(doc => [doc.id, doc]));
+      this.documents.forEach((doc, id) => {
+        if (doc.kind === kind && !fresh.has(id)) {
+          this.documents.delete(id);
+          this.index.remove(id);
+        }
+      });
+      fresh.forEach((doc, id) => {
+        if (this.documents.get(id)?.text === doc.text) return;
+        this.documents.set(id, doc);
+        this.index.upsert(id, `${doc.title} ${doc.text}`);
+        reindexed++;
+      });
+    }
+
+    this.versions = versions;
+    this.builtMonth = currentMonth;
+    console.log(`Chat retrieval index: ${reindexed} documents re-indexed (${kinds.join(', ')}), ${this.documents.size} total`);
+  }
+}
+
+// Export singleton instance
+export const chatRetrieval = new ChatRetrievalService();
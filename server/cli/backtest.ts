@@ -0,0 +1,39 @@
+/**
+ * Backtest - command line entry, kept out of the server bundle
+ *   npm run backtest -- --start=2021-01-01 --end=2025-06-30 --step=7 --horizon=90 --workers=8
+ */
+
+import { storage } from '../storage';
+import { backtestService } from '../backtest';
+import { addDays, toISODate } from '../date-utils';
+import type { BacktestParams } from '@shared/schema';
+
+const arg = (name: string) => process.argv.find(a => a.startsWith(`--${name}=`))?.split('=')[1];
+const params: BacktestParams = {
+  startDate: arg('start') || addDays(toISODate(new Date()), -365),
+  endDate: arg('end') || addDays(toISODate(new Date()), -90),
+  stepDays: parseInt(arg('step') || '7'),
+  horizonDays: parseInt(arg('horizon') || '90'),
+  workers: arg('workers') ? parseInt(arg('workers')!) : undefined,
+};
+
+(async () => {
+  const run = await storage.createBacktestRun({ params });
+  await backtestService.execute(run.id, params);
+  const finished = await storage.getBacktestRun(run.id);
+  console.log(`Backtest ${run.id}: ${finished?.folds} folds in ${finished?.durationMs}ms`);
+  console.table((await storage.getBacktestResults(run.id)).map(r => ({
+    method: r.method,
+    metric: r.metric,
+    horizon: r.horizon,
+    count: r.count,
+    mape: r.mape,
+    wape: r.wape,
+    bias: r.bias,
+  })));
+})()
+  .then(() => process.exit(0))
+  .catch((error) => {
+    console.error(error);
+    process.exit(1);
+  });
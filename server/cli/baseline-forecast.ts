@@ -0,0 +1,19 @@
+/**
+ * Baseline forecast refresh - command line entry (e.g. from a nightly cron)
+ * Kept out of the server bundle, which only imports the engine itself.
+ *   npm run forecast:baseline -- --horizon=365
+ */
+
+import { baselineForecastEngine } from '../baseline-forecast';
+
+const horizonArg = process.argv.find(arg => arg.startsWith('--horizon='));
+baselineForecastEngine
+  .refresh({ horizonDays: horizonArg ? parseInt(horizonArg.split('=')[1]) : undefined })
+  .then((result) => {
+    console.log(`Baseline refreshed: ${result.rows} rows for ${result.hotels} hotels in ${result.durationMs}ms`);
+    process.exit(0);
+  })
+  .catch((error) => {
+    console.error(error);
+    process.exit(1);
+  });
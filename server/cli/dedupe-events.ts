@@ -0,0 +1,24 @@
+/**
+ * Duplicate event cleanup - command line entry, kept out of the server bundle.
+ * Run once before `npm run db:push` adds the unique (name, city, start date)
+ * and (search, dedup key) indexes to a database that already holds duplicates:
+ *   npm run db:dedupe-events
+ */
+
+import { storage } from '../storage';
+
+async function dedupe() {
+  const events = await storage.deactivateDuplicateEvents();
+  const externalEvents = await storage.deleteDuplicateExternalEvents();
+  return [events, externalEvents];
+}
+
+dedupe()
+  .then(([events, externalEvents]) => {
+    console.log(`Deactivated ${events} duplicate events, removed ${externalEvents} duplicate search results`);
+    process.exit(0);
+  })
+  .catch((error) => {
+    console.error(error);
+    process.exit(1);
+  });
@@ -0,0 +1,48 @@
+/**
+ * Portfolio export - command line entry, kept out of the server bundle
+ *   npm run export:portfolio -- --dataset=actuals --out=actuals.csv --incremental
+ */
+
+import { createWriteStream } from 'fs';
+import { finished } from 'stream/promises';
+import { storage } from '../storage';
+import { nextExportWatermark, writePortfolioExport } from '../portfolio-export';
+import { portfolioExportSchema } from '@shared/schema';
+
+const arg = (name: string) => process.argv.find(a => a.startsWith(`--${name}=`))?.split('=')[1];
+const incremental = process.argv.includes('--incremental');
+
+(async () => {
+  const filters = portfolioExportSchema.parse({
+    dataset: arg('dataset'),
+    format: arg('format'),
+    startDate: arg('start'),
+    endDate: arg('end'),
+    cities: arg('cities'),
+    hotelIds: arg('hotels'),
+    updatedSince: arg('since'),
+  });
+
+  const watermarkName = `export:${filters.dataset}`;
+  if (incremental && !filters.updatedSince) {
+    filters.updatedSince = await storage.getJobWatermark(watermarkName);
+  }
+
+  const watermark = await nextExportWatermark();
+  const path = arg('out') || `${filters.dataset}.${filters.format}`;
+  const out = createWriteStream(path);
+  const rows = await writePortfolioExport(out, filters);
+  out.end();
+  await finished(out);
+
+  if (incremental) {
+    await storage.setJobWatermark(watermarkName, watermark);
+  }
+  console.log(`Exported ${rows} ${filters.dataset} rows to ${path}` +
+    (filters.updatedSince ? ` (changed since ${filters.updatedSince.toISOString()})` : ''));
+})()
+  .then(() => process.exit(0))
+  .catch((error) => {
+    console.error(error);
+    process.exit(1);
+  });
@@ -0,0 +1,27 @@
+/**
+ * Saved search refresh - command line entry, kept out of the server bundle.
+ * Runs one refresh pass, e.g. from cron:
+ *   npm run refresh:searches -- --concurrency=5 --interval=360
+ */
+
+import { SearchRefreshScheduler, DEFAULT_REFRESH_OPTIONS } from '../search-refresh';
+
+const arg = (name: string) => process.argv.find(a => a.startsWith(`--${name}=`))?.split('=')[1];
+// Searches last run less than --interval minutes ago are left alone (default 6 hours)
+const intervalMinutes = arg('interval')
+  ? parseFloat(arg('interval')!)
+  : DEFAULT_REFRESH_OPTIONS.intervalMs / (60 * 1000) || 360;
+
+const scheduler = new SearchRefreshScheduler({
+  ...DEFAULT_REFRESH_OPTIONS,
+  intervalMs: intervalMinutes * 60 * 1000,
+  concurrency: arg('concurrency') ? parseInt(arg('concurrency')!) : DEFAULT_REFRESH_OPTIONS.concurrency,
+  batchSize: arg('limit') ? parseInt(arg('limit')!) : 1000,
+});
+
+scheduler.tick()
+  .then(() => process.exit(0))
+  .catch((error) => {
+    console.error(error);
+    process.exit(1);
+  });
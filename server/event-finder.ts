@@ -4,6 +4,16 @@
  */
 
 import { z } from 'zod';
+import { createHash } from 'crypto';
+import type { Writable } from 'stream';
+import { storage, type EventImportResult, type EventSearchChanges } from './storage';
+import type { EventSearch, ExternalEventRecord, InsertExternalEvent } from '@shared/schema';
+import { toISODate, parseISODate } from './date-utils';
+import { writeCsv } from './csv-stream';
+import { writeXlsx } from './xlsx-stream';
+import { configuredSources, type EventSource } from './event-sources';
+import { eventDeduplicator, type EventProvenance } from './event-dedup';
+import { geocodingService } from './geocoding';
 
 export interface EventSearchParams {
   location: string;
@@ -36,6 +46,127 @@ export interface ExternalEvent {
   isCanceled: boolean;
   isFavorited: boolean;
   userNotes?: string;
+  provenance?: EventProvenance[];
+  dedupKey?: string;
+}
+
+// Columns of a search results export, in order
+const EXPORT_COLUMNS: Array<{ header: string; value: (event: ExternalEventRecord) => unknown }> = [
+  { header: 'Event Name', value: e => e.eventName },
+  { header: 'Type', value: e => e.eventType },
+  { header: 'Date', value: e => e.eventDate },
+  { header: 'Time', value: e => e.eventTime },
+  { header: 'End Date', value: e => e.endDate },
+  { header: 'End Time', value: e => e.endTime },
+  { header: 'Venue', value: e => e.venueName },
+  { header: 'Address', value: e => e.venueAddress },
+  { header: 'City', value: e => e.city },
+  { header: 'Country', value: e => e.country },
+  { header: 'Source', value: e => e.source },
+  { header: 'Source URL', value: e => e.sourceUrl },
+  { header: 'Price Range', value: e => e.priceRange },
+  { header: 'Free', value: e => e.isFree ? 'Yes' : 'No' },
+  { header: 'Canceled', value: e => e.isCanceled ? 'Yes' : 'No' },
+  { header: 'Favorited', value: e => e.isFavorited ? 'Yes' : 'No' },
+  { header: 'Notes', value: e => e.userNotes },
+];
+
+export type SearchExportFormat = 'xlsx' | 'csv';
+
+const SEARCH_DEADLINE_MS = 20000;
+// Geocoding while saving or manually refreshing a search holds up the
+// request, so it gets its own budget
+export const INTERACTIVE_GEOCODE_DEADLINE_MS = 5000;
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+export interface SourceReport {
+  source: string;
+  status: 'ok' | 'timeout' | 'error';
+  events: number;
+  durationMs: number;
+  error?: string;
+}
+
+function whenAborted(signal: AbortSignal): Promise<never> {
+  return new Promise((_, reject) => {
+    if (signal.aborted) return reject(signal.reason);
+    signal.addEventListener('abort', () => reject(signal.reason), { once: true });
+  });
+}
+
+export interface EventSearchRefresh {
+  inserted: number;
+  updated: number;
+  canceled: number;
+  unchanged: number;
+  sources: SourceReport[];
+}
+
+// Columns owned by the sources; user columns (favorite, notes, import link) are never overwritten
+const SOURCE_FIELDS = [
+  'eventName', 'eventType', 'description', 'eventDate', 'eventTime', 'endDate', 'endTime',
+  'venueName', 'venueAddress', 'city', 'country', 'latitude', 'longitude', 'source', 'sourceUrl',
+  'externalId', 'priceRange', 'isFree', 'isCanceled', 'dedupKey', 'provenance',
+] as const;
+
+type SourceRecord = Omit<InsertExternalEvent, 'searchId' | 'isFavorited' | 'userNotes' | 'isImported' | 'importedEventId'>;
+
+function toRecord(event: ExternalEvent): SourceRecord {
+  return {
+    eventName: event.eventName,
+    eventType: event.eventType,
+    description: event.description,
+    eventDate: toISODate(event.eventDate),
+    eventTime: event.eventTime,
+    endDate: event.endDate ? toISODate(event.endDate) : null,
+    endTime: event.endTime,
+    venueName: event.venueName,
+    venueAddress: event.venueAddress,
+    city: event.city,
+    country: event.country,
+    latitude: event.latitude?.toString(),
+    longitude: event.longitude?.toString(),
+    source: event.source,
+    sourceUrl: event.sourceUrl,
+    externalId: event.externalId,
+    priceRange: event.priceRange,
+    isFree: event.isFree,
+    isCanceled: event.isCanceled,
+    dedupKey: event.dedupKey,
+    provenance: event.provenance,
+  };
+}
+
+// Identities a stored or fresh result can be matched on: every source id it carries, then its dedup key
+function matchKeys(record: SourceRecord | ExternalEventRecord): string[] {
+  const keys = (record.provenance || [])
+    .filter(p => p.externalId)
+    .map(p => `${p.source}:${p.externalId}`);
+  if (record.externalId) keys.push(`${record.source}:${record.externalId}`);
+  if (record.dedupKey) keys.push(`key:${record.dedupKey}`);
+  return keys;
+}
+
+/**
+ * Date of a sample event: the first day on or after `startDate` of a cycle of
+ * `periodDays` phased by `seed`, so every run of a search (and every refresh,
+ * whatever its start) finds the same events on the same days
+ */
+function sampleDate(seed: string, startDate: Date, periodDays: number): Date {
+  const phase = createHash('sha1').update(seed).digest().readUInt32BE(0) % periodDays;
+  const startDay = Math.floor(startDate.getTime() / DAY_MS);
+  const offset = (((phase - startDay) % periodDays) + periodDays) % periodDays;
+  return new Date((startDay + offset) * DAY_MS);
+}
+
+function sameValue(field: typeof SOURCE_FIELDS[number], stored: unknown, fresh: unknown): boolean {
+  if (field === 'latitude' || field === 'longitude') {
+    return (stored == null && fresh == null) || Number(stored) === Number(fresh);
+  }
+  if (field === 'provenance') {
+    return JSON.stringify(stored ?? null) === JSON.stringify(fresh ?? null);
+  }
+  return (stored ?? '') === (fresh ?? '');
 }
 
 export class EventFinderService {
@@ -52,16 +183,76 @@ export class EventFinderService {
    * Search for events across multiple sources
    */
   async searchEvents(params: EventSearchParams): Promise<ExternalEvent[]> {
-    const { location, eventTypes, startDate, endDate } = params;
-    
-    console.log(`Starting event search for ${location}, types: ${eventTypes.join(', ')}`);
-    
-    let eventsFound: ExternalEvent[] = [];
-    
-    // Generate diverse events based on requested types
+    const { events } = await this.searchEventsWithReport(params);
+    return events;
+  }
+
+  /**
+   * Query every source concurrently. Each source has its own deadline and the
+   * whole search has an overall one; whatever has arrived by then is returned.
+   */
+  async searchEventsWithReport(
+    params: EventSearchParams,
+    deadlineMs: number = SEARCH_DEADLINE_MS
+  ): Promise<{ events: ExternalEvent[]; sources: SourceReport[]; duplicates: number }> {
+    const { location, eventTypes } = params;
     const selectedTypes = eventTypes.length > 0 ? eventTypes : ['sports', 'concerts', 'fairs', 'culture', 'community', 'business'];
-    
-    for (const eventType of selectedTypes) {
+
+    console.log(`Starting event search for ${location}, types: ${selectedTypes.join(', ')}`);
+
+    const deadline = AbortSignal.timeout(deadlineMs);
+    const sources = [this.sampleSource, ...configuredSources()];
+    const results = await Promise.all(sources.map(source => this.runSource(source, params, selectedTypes, deadline)));
+
+    // The same event often comes back from several sources; keep one merged record
+    const { events, duplicates } = eventDeduplicator.dedup(results.flatMap(result => result.events));
+    console.log(`Found ${events.length} events for ${location} (${duplicates} duplicates merged)`);
+    return { events, sources: results.map(result => result.report), duplicates };
+  }
+
+  private async runSource(
+    source: EventSource,
+    params: EventSearchParams,
+    eventTypes: string[],
+    deadline: AbortSignal
+  ): Promise<{ events: ExternalEvent[]; report: SourceReport }> {
+    const started = Date.now();
+    const signal = AbortSignal.any([deadline, AbortSignal.timeout(source.timeoutMs)]);
+
+    try {
+      // Racing the abort keeps a source that ignores its signal from stalling the search
+      const events = await Promise.race([source.fetchEvents(params, eventTypes, signal), whenAborted(signal)]);
+      return {
+        events,
+        report: { source: source.name, status: 'ok', events: events.length, durationMs: Date.now() - started },
+      };
+    } catch (error) {
+      const status = signal.aborted ? 'timeout' : 'error';
+      console.warn(`${source.name} search ${status === 'timeout' ? 'timed out' : 'failed'}:`, error);
+      return {
+        events: [],
+        report: {
+          source: source.name,
+          status,
+          events: 0,
+          durationMs: Date.now() - started,
+          error: error instanceof Error ? error.message : String(error),
+        },
+      };
+    }
+  }
+
+  // Built-in generated events, used alongside any configured external sources
+  private sampleSource: EventSource = {
+    name: 'Sample events',
+    timeoutMs: 5000,
+    fetchEvents: async (params, eventTypes) => this.generateEvents(params.location, eventTypes, params.startDate, params.endDate),
+  };
+
+  private generateEvents(location: string, eventTypes: string[], startDate: Date, endDate: Date): ExternalEvent[] {
+    const eventsFound: ExternalEvent[] = [];
+
+    for (const eventType of eventTypes) {
       try {
         let typeEvents: ExternalEvent[] = [];
         
@@ -94,10 +285,167 @@ export class EventFinderService {
       }
     }
     
-    console.log(`Found ${eventsFound.length} events for ${location}`);
     return eventsFound;
   }
   
+  /**
+   * Persist a search and its results so they can be exported or rerun later
+   */
+  async saveSearch(params: EventSearchParams, results: ExternalEvent[], userId?: string): Promise<EventSearch> {
+    await this.geocodeMissing(results, AbortSignal.timeout(INTERACTIVE_GEOCODE_DEADLINE_MS));
+    return await storage.createEventSearch({
+      name: params.searchName,
+      location: params.location,
+      eventTypes: params.eventTypes,
+      startDate: toISODate(params.startDate),
+      endDate: toISODate(params.endDate),
+      createdBy: userId,
+    }, results.map(event => ({
+      ...toRecord(event),
+      isFavorited: event.isFavorited,
+      userNotes: event.userNotes,
+    })));
+  }
+
+  /**
+   * Rerun a saved search in place. Only the part of its window from today on
+   * is queried again, since past events no longer change. Fresh results are
+   * matched to stored ones by source id or dedup key, and only the difference
+   * is written: new events are inserted, changed ones updated, and ones that
+   * disappeared marked canceled. Favorites, notes and import links are kept.
+   * `geocodeSignal` bounds the geocoding step; coordinates it leaves empty are
+   * filled in by a later refresh.
+   */
+  async refreshSearch(search: EventSearch, geocodeSignal?: AbortSignal): Promise<EventSearchRefresh> {
+    const today = toISODate(new Date());
+    const from = search.startDate > today ? search.startDate : today;
+    const result: EventSearchRefresh = { inserted: 0, updated: 0, canceled: 0, unchanged: 0, sources: [] };
+
+    if (from > search.endDate) {
+      await storage.applyEventSearchChanges(search.id, { inserts: [], updates: [], cancelIds: [] });
+      return result;
+    }
+
+    const params: EventSearchParams = {
+      location: search.location,
+      eventTypes: search.eventTypes || [],
+      startDate: parseISODate(from),
+      endDate: parseISODate(search.endDate),
+      searchName: search.name || undefined,
+    };
+    const [{ events, sources }, existing] = await Promise.all([
+      this.searchEventsWithReport(params),
+      storage.getExternalEvents(search.id, from),
+    ]);
+    result.sources = sources;
+    await this.geocodeMissing(events, geocodeSignal);
+
+    const byKey = new Map<string, ExternalEventRecord>();
+    for (const row of existing) {
+      for (const key of matchKeys(row)) {
+        if (!byKey.has(key)) byKey.set(key, row);
+      }
+    }
+
+    const changes: EventSearchChanges = { inserts: [], updates: [], cancelIds: [] };
+    const matched = new Set<string>();
+
+    for (const event of events) {
+      const record = toRecord(event);
+      const row = matchKeys(record).map(key => byKey.get(key)).find(row => row && !matched.has(row.id));
+      if (!row) {
+        changes.inserts.push({ ...record, isFavorited: false });
+        continue;
+      }
+
+      matched.add(row.id);
+      const values: Partial<InsertExternalEvent> = {};
+      for (const field of SOURCE_FIELDS) {
+        // Geocoding cut short by its deadline must not erase stored coordinates
+        if ((field === 'latitude' || field === 'longitude') && record[field] == null) continue;
+        if (!sameValue(field, row[field], record[field])) {
+          (values as any)[field] = record[field] ?? null;
+        }
+      }
+      if (Object.keys(values).length > 0) {
+        changes.updates.push({ id: row.id, values });
+      } else {
+        result.unchanged++;
+      }
+    }
+
+    // A missing event is only treated as canceled when every source answered;
+    // otherwise it may just belong to a source that timed out this time
+    if (sources.every(source => source.status === 'ok')) {
+      changes.cancelIds = existing.filter(row => !matched.has(row.id) && !row.isCanceled).map(row => row.id);
+    }
+
+    await storage.applyEventSearchChanges(search.id, changes);
+    result.inserted = changes.inserts.length;
+    result.updated = changes.updates.length;
+    result.canceled = changes.cancelIds.length;
+    console.log(`Refreshed search ${search.id}: ${result.inserted} new, ${result.updated} updated, ` +
+      `${result.canceled} canceled, ${result.unchanged} unchanged`);
+    return result;
+  }
+
+  /**
+   * Fill in coordinates for results whose source gave none, in one bulk
+   * lookup against the geocoding cache. A geocoder outage or the deadline
+   * only leaves the coordinates empty; it never fails the save.
+   */
+  private async geocodeMissing(events: ExternalEvent[], signal?: AbortSignal): Promise<void> {
+    const pending = events.filter(event => event.latitude == null || event.longitude == null);
+    if (pending.length === 0) return;
+
+    try {
+      const results = await geocodingService.geocodeMany(pending.map(event => ({
+        address: event.venueAddress && event.venueAddress !== event.city ? event.venueAddress : undefined,
+        city: event.city,
+        country: event.country,
+      })), signal);
+      pending.forEach((event, i) => {
+        if (results[i]) {
+          event.latitude = results[i]!.latitude;
+          event.longitude = results[i]!.longitude;
+        }
+      });
+    } catch (error) {
+      console.warn("Geocoding search results failed:", error);
+    }
+  }
+
+  /**
+   * Import a saved search's results (or the selected ones) into the events
+   * table in one transaction, linking each result to the event it became
+   */
+  async importAllEvents(searchId: string, userId: string, externalEventIds?: string[]): Promise<EventImportResult> {
+    const result = await storage.importExternalEvents(searchId, userId, externalEventIds);
+    console.log(`Imported ${result.imported} events from search ${searchId} ` +
+      `(${result.duplicates} duplicates, ${result.skipped} already imported)`);
+    return result;
+  }
+
+  /**
+   * Stream a saved search's results to `out` straight from a database cursor
+   * and record the export with the number of bytes actually written
+   */
+  async exportSearch(out: Writable, search: EventSearch, format: SearchExportFormat, userId?: string) {
+    const results = storage.streamExternalEvents(search.id);
+
+    const { rows, bytes } = format === 'csv'
+      ? await writeCsv(out, EXPORT_COLUMNS, results)
+      : await writeXlsx(out, 'Events', EXPORT_COLUMNS.map(c => c.header), toCells(results));
+
+    return await storage.createEventSearchExport({
+      searchId: search.id,
+      format,
+      rowCount: rows,
+      fileSize: bytes,
+      createdBy: userId,
+    });
+  }
+
   /**
    * Generate sports events
    */
@@ -133,12 +481,12 @@ export class EventFinderService {
     ];
     
     sportsEvents.forEach((eventData, index) => {
-      const eventDate = new Date(startDate);
-      eventDate.setDate(startDate.getDate() + Math.floor(Math.random() * 30)); // Random within date range
+      const eventDate = sampleDate(`${city.toLowerCase()}|${eventData.name}`, startDate, 30);
       
       if (eventDate <= endDate) {
         events.push({
-          id: `sports-${city.toLowerCase()}-${index}-${Date.now()}`,
+          id: `sports-${city.toLowerCase()}-${index}-${toISODate(eventDate)}`,
+          externalId: `sports-${city.toLowerCase()}-${index}-${toISODate(eventDate)}`,
           eventName: eventData.name,
           eventType: 'sports',
           description: eventData.description,
@@ -197,12 +545,12 @@ export class EventFinderService {
     ];
     
     musicEvents.forEach((eventData, index) => {
-      const eventDate = new Date(startDate);
-      eventDate.setDate(startDate.getDate() + Math.floor(Math.random() * 25) + index * 3);
+      const eventDate = sampleDate(`${city.toLowerCase()}|${eventData.name}`, startDate, 25);
       
       if (eventDate <= endDate) {
         events.push({
-          id: `music-${city.toLowerCase()}-${index}-${Date.now()}`,
+          id: `music-${city.toLowerCase()}-${index}-${toISODate(eventDate)}`,
+          externalId: `music-${city.toLowerCase()}-${index}-${toISODate(eventDate)}`,
           eventName: eventData.name,
           eventType: 'concerts',
           description: eventData.description,
@@ -261,12 +609,12 @@ export class EventFinderService {
     ];
     
     businessEvents.forEach((eventData, index) => {
-      const eventDate = new Date(startDate);
-      eventDate.setDate(startDate.getDate() + Math.floor(Math.random() * 20) + index * 5);
+      const eventDate = sampleDate(`${city.toLowerCase()}|${eventData.name}`, startDate, 20);
       
       if (eventDate <= endDate) {
         events.push({
-          id: `business-${city.toLowerCase()}-${index}-${Date.now()}`,
+          id: `business-${city.toLowerCase()}-${index}-${toISODate(eventDate)}`,
+          externalId: `business-${city.toLowerCase()}-${index}-${toISODate(eventDate)}`,
           eventName: eventData.name,
           eventType: 'business',
           description: eventData.description,
@@ -325,12 +673,12 @@ export class EventFinderService {
     ];
     
     cultureEvents.forEach((eventData, index) => {
-      const eventDate = new Date(startDate);
-      eventDate.setDate(startDate.getDate() + Math.floor(Math.random() * 28) + index * 4);
+      const eventDate = sampleDate(`${city.toLowerCase()}|${eventData.name}`, startDate, 28);
       
       if (eventDate <= endDate) {
         events.push({
-          id: `culture-${city.toLowerCase()}-${index}-${Date.now()}`,
+          id: `culture-${city.toLowerCase()}-${index}-${toISODate(eventDate)}`,
+          externalId: `culture-${city.toLowerCase()}-${index}-${toISODate(eventDate)}`,
           eventName: eventData.name,
           eventType: 'culture',
           description: eventData.description,
@@ -389,12 +737,12 @@ export class EventFinderService {
     ];
     
     communityEvents.forEach((eventData, index) => {
-      const eventDate = new Date(startDate);
-      eventDate.setDate(startDate.getDate() + Math.floor(Math.random() * 21) + index * 7);
+      const eventDate = sampleDate(`${city.toLowerCase()}|${eventData.name}`, startDate, 21);
       
       if (eventDate <= endDate) {
         events.push({
-          id: `community-${city.toLowerCase()}-${index}-${Date.now()}`,
+          id: `community-${city.toLowerCase()}-${index}-${toISODate(eventDate)}`,
+          externalId: `community-${city.toLowerCase()}-${index}-${toISODate(eventDate)}`,
           eventName: eventData.name,
           eventType: 'community',
           description: eventData.description,
@@ -471,5 +819,11 @@ export class EventFinderService {
   }
 }
 
+async function* toCells(batches: AsyncIterable<ExternalEventRecord[]>): AsyncGenerator<unknown[][]> {
+  for await (const batch of batches) {
+    yield batch.map(event => EXPORT_COLUMNS.map(c => c.value(event)));
+  }
+}
+
 // Export singleton instance
 export const eventFinderService = new EventFinderService();
\ No newline at end of file
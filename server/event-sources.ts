@@ -0,0 +1,128 @@
+/**
+ * Event Sources - connectors for external event providers
+ * Every source takes an AbortSignal carrying its own deadline and the overall
+ * search deadline, so a slow provider is cut off instead of holding up the
+ * search. Requests go through Node's global fetch, which keeps connections
+ * alive and pools them per origin, behind the shared on-disk response cache
+ * (see http-cache.ts) and a per-source rate limit shared with background
+ * refreshes (see rate-limiter.ts). Base URLs can be overridden through the
+ * environment to point a source at a local stand-in server.
+ */
+
+import type { EventSearchParams, ExternalEvent } from './event-finder';
+import { toISODate } from './date-utils';
+import { eventSourceCache, sourceCacheKey } from './http-cache';
+import { sourceRateLimiter } from './rate-limiter';
+
+export interface EventSource {
+  name: string;
+  timeoutMs: number;
+  requestsPerMinute?: number;
+  fetchEvents(params: EventSearchParams, eventTypes: string[], signal: AbortSignal): Promise<ExternalEvent[]>;
+}
+
+// Ticketmaster classification names for our event types
+const TICKETMASTER_CLASSIFICATIONS: Record<string, string> = {
+  sports: 'Sports',
+  concerts: 'Music',
+  music: 'Music',
+  culture: 'Arts & Theatre',
+  art: 'Arts & Theatre',
+  fairs: 'Miscellaneous',
+  business: 'Miscellaneous',
+  community: 'Miscellaneous',
+};
+
+const TICKETMASTER_TYPES: Record<string, string> = {
+  'Sports': 'sports',
+  'Music': 'concerts',
+  'Arts & Theatre': 'culture',
+};
+
+/**
+ * Ticketmaster Discovery API (enabled when TICKETMASTER_API_KEY is set)
+ */
+export class TicketmasterSource implements EventSource {
+  name = 'Ticketmaster';
+  timeoutMs = 15000;
+  cacheTtlMs = 6 * 60 * 60 * 1000;
+  // The Discovery API allows 5 requests per second per key; stay well under it
+  requestsPerMinute = parseInt(process.env.TICKETMASTER_REQUESTS_PER_MINUTE || '120');
+
+  constructor(
+    private apiKey: string,
+    private baseUrl: string = 'https://app.ticketmaster.com/discovery/v2'
+  ) {}
+
+  async fetchEvents(params: EventSearchParams, eventTypes: string[], signal: AbortSignal): Promise<ExternalEvent[]> {
+    const city = params.location.split(',')[0].trim();
+    const classifications = Array.from(new Set(
+      eventTypes.map(type => TICKETMASTER_CLASSIFICATIONS[type.toLowerCase()]).filter(Boolean)
+    ));
+
+    const url = new URL(`${this.baseUrl}/events.json`);
+    url.searchParams.set('apikey', this.apiKey);
+    url.searchParams.set('city', city);
+    url.searchParams.set('startDateTime', `${toISODate(params.startDate)}T00:00:00Z`);
+    url.searchParams.set('endDateTime', `${toISODate(params.endDate)}T23:59:59Z`);
+    url.searchParams.set('size', '200');
+    if (classifications.length > 0) {
+      url.searchParams.set('classificationName', classifications.join(','));
+    }
+
+    const key = sourceCacheKey({
+      source: this.name,
+      location: city,
+      startDate: toISODate(params.startDate),
+      endDate: toISODate(params.endDate),
+      eventTypes: classifications,
+    });
+    const { body } = await eventSourceCache.fetchJson(key, url, this.cacheTtlMs, signal,
+      () => sourceRateLimiter.acquire(this.name, this.requestsPerMinute, signal, 5));
+    const items: any[] = body?._embedded?.events || [];
+
+    return items
+      .filter(item => item?.dates?.start?.localDate)
+      .map(item => {
+        const venue = item._embedded?.venues?.[0];
+        const segment = item.classifications?.[0]?.segment?.name;
+        const price = item.priceRanges?.[0];
+
+        return {
+          id: `ticketmaster-${item.id}`,
+          eventName: item.name,
+          eventType: TICKETMASTER_TYPES[segment] || 'community',
+          description: item.info || item.pleaseNote,
+          eventDate: new Date(`${item.dates.start.localDate}T00:00:00Z`),
+          eventTime: item.dates.start.localTime?.substring(0, 5),
+          endDate: item.dates.end?.localDate ? new Date(`${item.dates.end.localDate}T00:00:00Z`) : undefined,
+          venueName: venue?.name,
+          venueAddress: venue?.address?.line1,
+          city: venue?.city?.name || city,
+          country: venue?.country?.name,
+          latitude: venue?.location?.latitude ? parseFloat(venue.location.latitude) : undefined,
+          longitude: venue?.location?.longitude ? parseFloat(venue.location.longitude) : undefined,
+          source: this.name,
+          sourceUrl: item.url,
+          externalId: item.id,
+          priceRange: price ? `${price.currency || '$'} ${price.min}-${price.max}` : undefined,
+          isFree: price ? price.min === 0 && price.max === 0 : false,
+          isCanceled: item.dates.status?.code === 'cancelled',
+          isFavorited: false,
+        } as ExternalEvent;
+      });
+  }
+}
+
+/**
+ * External sources configured through the environment
+ */
+export function configuredSources(): EventSource[] {
+  const sources: EventSource[] = [];
+
+  if (process.env.TICKETMASTER_API_KEY) {
+    sources.push(new TicketmasterSource(process.env.TICKETMASTER_API_KEY, process.env.TICKETMASTER_API_URL));
+  }
+
+  return sources;
+}
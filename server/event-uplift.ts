@@ -0,0 +1,224 @@
+/**
+ * Event Uplift Model - learned event multipliers and forecast suggestions
+ * Training compares every event day's actuals with the same weekday last year
+ * (STLY, 364 days earlier) for all hotels in the event's city and learns
+ * revenue/occupancy/ADR multipliers per city, category and duration. It is
+ * incremental: only actuals uploaded, and events or hotels changed, since the
+ * last run are joined, and the multipliers are re-aggregated set-based in the
+ * database. Suggestions for upcoming events are then precomputed so the event
+ * forecast view is one read.
+ */
+
+import { storage } from './storage';
+import type { Event, EventUpliftFactor, Hotel, InsertEventForecastSuggestion } from '@shared/schema';
+import { addDays, daysBetween, eachDay, toISODate } from './date-utils';
+
+const WATERMARK = 'event-uplift';
+const SUGGESTION_HORIZON_DAYS = 365;
+const MIN_CITY_SAMPLE_DAYS = 5;
+
+interface Multipliers {
+  revenue: number;
+  occupancy: number;
+  adr: number;
+  level: string;
+}
+
+export function durationBucket(startDate: string, endDate: string): string {
+  const days = daysBetween(startDate, endDate) + 1;
+  if (days <= 1) return '1';
+  if (days <= 3) return '2-3';
+  if (days <= 7) return '4-7';
+  return '8+';
+}
+
+type TrainingResult = { observations: number; factors: number; suggestions: number };
+
+export class EventUpliftModel {
+  private training: Promise<TrainingResult> | null = null;
+  private trainingFull = false;
+  private queuedFull: Promise<TrainingResult> | null = null;
+
+  /**
+   * Train incrementally (or from scratch) and refresh suggestions.
+   * Concurrent calls share the run in progress, except that a full run asked
+   * for during an incremental one is queued behind it (and shared in turn).
+   */
+  train(options: { full?: boolean } = {}): Promise<TrainingResult> {
+    const full = options.full === true;
+    if (!this.training) {
+      this.trainingFull = full;
+      this.training = this.runTraining(full).finally(() => {
+        this.training = null;
+      });
+      return this.training;
+    }
+
+    if (full && !this.trainingFull) {
+      if (!this.queuedFull) {
+        this.queuedFull = this.training
+          .catch(() => undefined)
+          .then(() => {
+            this.queuedFull = null;
+            return this.train({ full: true });
+          });
+      }
+      return this.queuedFull;
+    }
+    return this.training;
+  }
+
+  private async runTraining(full: boolean) {
+    // Taken before reading so rows uploaded during the run are picked up next
+    // time, from the database clock that stamps uploaded_at and updated_at
+    const startedAt = await storage.getDatabaseTime();
+    const since = full ? undefined : await storage.getJobWatermark(WATERMARK);
+
+    const observations = await storage.recordEventUpliftObservations(since);
+    const factors = observations > 0 || full || !since
+      ? await storage.rebuildEventUpliftFactors()
+      : 0;
+    const suggestions = await this.refreshSuggestions();
+
+    await storage.setJobWatermark(WATERMARK, startedAt);
+    return { observations, factors, suggestions };
+  }
+
+  /**
+   * Precompute suggested event forecasts for every hotel in each upcoming event's city
+   */
+  async refreshSuggestions(): Promise<number> {
+    const today = toISODate(new Date());
+    const horizonEnd = addDays(today, SUGGESTION_HORIZON_DAYS);
+
+    const upcoming = (await storage.getEventsInRange(today, horizonEnd)).filter(e => !!e.city);
+    if (upcoming.length === 0) {
+      await storage.replaceEventForecastSuggestions([]);
+      return 0;
+    }
+
+    const cities = Array.from(new Set(upcoming.map(e => e.city!)));
+    const cityHotels = await storage.getHotelsByCities(cities);
+    const hotelIds = cityHotels.map(h => h.id);
+
+    const [factors, baselines, stly] = await Promise.all([
+      storage.getEventUpliftFactors(),
+      storage.getSystemForecastsForHotels(hotelIds, today, horizonEnd),
+      storage.getHotelActualsForHotels(hotelIds, addDays(today, -364), addDays(horizonEnd, -364)),
+    ]);
+
+    const factorIndex = new Map(factors.map(f => [`${f.city}|${f.category}|${f.durationBucket}`, f]));
+    const hotelsByCity = new Map<string, Hotel[]>();
+    for (const hotel of cityHotels) {
+      const list = hotelsByCity.get(hotel.city!) || [];
+      list.push(hotel);
+      hotelsByCity.set(hotel.city!, list);
+    }
+
+    // Dense [hotel x day] basis matrices: baseline first, STLY actual as fallback
+    const H = hotelIds.length;
+    const D = SUGGESTION_HORIZON_DAYS + 1;
+    const hotelRow = new Map(hotelIds.map((id, i) => [id, i]));
+    const occ = new Float64Array(H * D).fill(NaN);
+    const adr = new Float64Array(H * D).fill(NaN);
+    const revenue = new Float64Array(H * D).fill(NaN);
+    const fromBaseline = new Uint8Array(H * D);
+
+    for (const actual of stly) {
+      const h = hotelRow.get(actual.hotelId);
+      const d = daysBetween(today, actual.actualDate) + 364;
+      if (h === undefined || d < 0 || d >= D) continue;
+      const i = h * D + d;
+      occ[i] = toNumber(actual.occupancyRate);
+      adr[i] = toNumber(actual.averageDailyRate);
+      revenue[i] = toNumber(actual.revenue);
+    }
+    for (const baseline of baselines) {
+      const h = hotelRow.get(baseline.hotelId);
+      const d = daysBetween(today, baseline.forecastDate);
+      if (h === undefined || d < 0 || d >= D) continue;
+      const i = h * D + d;
+      occ[i] = toNumber(baseline.occupancyRate);
+      adr[i] = toNumber(baseline.averageDailyRate);
+      revenue[i] = toNumber(baseline.revenue);
+      fromBaseline[i] = 1;
+    }
+
+    const generatedAt = new Date();
+    const rows: InsertEventForecastSuggestion[] = [];
+
+    for (const event of upcoming) {
+      const multipliers = this.lookupMultipliers(factorIndex, event);
+      const start = event.startDate > today ? event.startDate : today;
+      const end = event.endDate < horizonEnd ? event.endDate : horizonEnd;
+
+      for (const hotel of hotelsByCity.get(event.city!) || []) {
+        const h = hotelRow.get(hotel.id)!;
+        const rooms = hotel.totalRooms || 0;
+
+        for (const date of eachDay(start, end)) {
+          const i = h * D + daysBetween(today, date);
+          if (Number.isNaN(occ[i]) && Number.isNaN(revenue[i])) continue;
+
+          const suggestedOcc = Number.isNaN(occ[i]) ? NaN : Math.min(100, occ[i] * multipliers.occupancy);
+          const suggestedAdr = Number.isNaN(adr[i]) ? NaN : adr[i] * multipliers.adr;
+          const roomNights = rooms > 0 && !Number.isNaN(suggestedOcc) ? Math.round((suggestedOcc / 100) * rooms) : null;
+          const suggestedRevenue = roomNights !== null && !Number.isNaN(suggestedAdr)
+            ? roomNights * suggestedAdr
+            : revenue[i] * multipliers.revenue;
+
+          rows.push({
+            eventId: event.id,
+            hotelId: hotel.id,
+            forecastDate: date,
+            occupancyRate: Number.isNaN(suggestedOcc) ? null : suggestedOcc.toFixed(2),
+            averageDailyRate: Number.isNaN(suggestedAdr) ? null : suggestedAdr.toFixed(2),
+            revenue: Number.isNaN(suggestedRevenue) ? null : suggestedRevenue.toFixed(2),
+            roomNights,
+            multiplier: multipliers.revenue.toFixed(4),
+            basis: fromBaseline[i] ? 'baseline' : 'stly',
+            factorLevel: multipliers.level,
+            generatedAt,
+          });
+        }
+      }
+    }
+
+    return await storage.replaceEventForecastSuggestions(rows);
+  }
+
+  /**
+   * Most specific multiplier with enough history: city -> category+duration -> category -> global
+   */
+  private lookupMultipliers(factorIndex: Map<string, EventUpliftFactor>, event: Event): Multipliers {
+    const category = event.category || 'other';
+    const bucket = durationBucket(event.startDate, event.endDate);
+    const levels: Array<[string, string, string, number]> = [
+      [event.city!, category, bucket, MIN_CITY_SAMPLE_DAYS],
+      ['*', category, bucket, 1],
+      ['*', category, '*', 1],
+      ['*', '*', '*', 1],
+    ];
+
+    for (const [city, cat, dur, minDays] of levels) {
+      const factor = factorIndex.get(`${city}|${cat}|${dur}`);
+      if (!factor || (factor.sampleDays || 0) < minDays) continue;
+      return {
+        revenue: toNumber(factor.revenueMultiplier) || 1,
+        occupancy: toNumber(factor.occupancyMultiplier) || 1,
+        adr: toNumber(factor.adrMultiplier) || 1,
+        level: `${city}|${cat}|${dur}`,
+      };
+    }
+
+    return { revenue: 1, occupancy: 1, adr: 1, level: 'none' };
+  }
+}
+
+function toNumber(value: string | number | null | undefined): number {
+  if (value === null || value === undefined) return NaN;
+  return parseFloat(value.toString());
+}
+
+// Export singleton instance
+export const eventUpliftModel = new EventUpliftModel();
@@ -0,0 +1,130 @@
+/**
+ * Forecast Accuracy - error metrics comparing forecasts against actuals
+ */
+
+import { storage } from './storage';
+import type { Forecast, HotelActual, SystemForecast } from '@shared/schema';
+import { FIRST_ISSUED_BASELINE } from './baseline-forecast';
+
+export interface AccuracyMetrics {
+  count: number;
+  mape: number | null; // mean absolute percentage error, %
+  wape: number | null; // weighted absolute percentage error, %
+  bias: number | null; // sum(forecast - actual) / sum(actual), %
+}
+
+/**
+ * Compute MAPE, WAPE and bias over aligned actual/forecast columns.
+ * Pairs where either side is NaN are ignored; MAPE also skips zero actuals.
+ */
+export function computeAccuracy(actual: ArrayLike<number>, forecast: ArrayLike<number>): AccuracyMetrics {
+  let count = 0;
+  let apeSum = 0;
+  let apeCount = 0;
+  let absErrorSum = 0;
+  let errorSum = 0;
+  let actualSum = 0;
+
+  for (let i = 0; i < actual.length; i++) {
+    const a = actual[i];
+    const f = forecast[i];
+    if (Number.isNaN(a) || Number.isNaN(f)) continue;
+
+    count++;
+    absErrorSum += Math.abs(f - a);
+    errorSum += f - a;
+    actualSum += Math.abs(a);
+    if (a !== 0) {
+      apeSum += Math.abs((f - a) / a);
+      apeCount++;
+    }
+  }
+
+  return accuracyFromSums({ count, apeSum, apeCount, absErrorSum, errorSum, actualSum });
+}
+
+/**
+ * Metrics from pre-aggregated error sums, e.g. summed in the database
+ */
+export function accuracyFromSums(sums: {
+  count: number;
+  apeSum: number;
+  apeCount: number;
+  absErrorSum: number;
+  errorSum: number;
+  actualSum: number;
+}): AccuracyMetrics {
+  const { count, apeSum, apeCount, absErrorSum, errorSum, actualSum } = sums;
+  return {
+    count,
+    mape: apeCount > 0 ? (apeSum / apeCount) * 100 : null,
+    wape: actualSum > 0 ? (absErrorSum / actualSum) * 100 : null,
+    bias: actualSum > 0 ? (errorSum / actualSum) * 100 : null,
+  };
+}
+
+const METRICS = ['revenue', 'occupancyRate', 'averageDailyRate'] as const;
+type Metric = typeof METRICS[number];
+
+/**
+ * Accuracy of user forecasts and system baselines for one hotel and date range
+ */
+export async function getForecastAccuracy(hotelId: string, startDate: string, endDate: string) {
+  const [actuals, userForecasts, baselines] = await Promise.all([
+    storage.getHotelActualsForHotels([hotelId], startDate, endDate),
+    storage.getForecastsByDateRange(hotelId, new Date(startDate), new Date(endDate)),
+    storage.getSystemForecasts(hotelId, startDate, endDate, FIRST_ISSUED_BASELINE),
+  ]);
+
+  // Already reduced to the latest upload per date by the query
+  const actualByDate = new Map<string, HotelActual>(actuals.map(a => [a.actualDate, a]));
+  const userByDate = latestUserForecastByDate(userForecasts);
+  const baselineByDate = new Map<string, SystemForecast>(baselines.map(b => [b.forecastDate, b]));
+  const dates = Array.from(actualByDate.keys()).sort();
+
+  const result: Record<Metric, { user: AccuracyMetrics; baseline: AccuracyMetrics }> = {} as any;
+  for (const metric of METRICS) {
+    const actual = new Float64Array(dates.length);
+    const user = new Float64Array(dates.length);
+    const baseline = new Float64Array(dates.length);
+
+    dates.forEach((date, i) => {
+      actual[i] = toNumber(actualByDate.get(date)?.[metric]);
+      user[i] = toNumber(userByDate.get(date)?.[metric]);
+      baseline[i] = toNumber(baselineByDate.get(date)?.[metric]);
+    });
+
+    result[metric] = {
+      user: computeAccuracy(actual, user),
+      baseline: computeAccuracy(actual, baseline),
+    };
+  }
+
+  return { hotelId, startDate, endDate, days: dates.length, metrics: result };
+}
+
+/**
+ * One user forecast per date: prefer monthly rows, then the most recently updated
+ */
+export function latestUserForecastByDate(list: Forecast[]): Map<string, Forecast> {
+  const byDate = new Map<string, Forecast>();
+  for (const forecast of list) {
+    const current = byDate.get(forecast.forecastDate);
+    if (!current) {
+      byDate.set(forecast.forecastDate, forecast);
+      continue;
+    }
+    const currentMonthly = current.forecastType === 'monthly';
+    const candidateMonthly = forecast.forecastType === 'monthly';
+    const newer = (forecast.updatedAt?.getTime() || 0) > (current.updatedAt?.getTime() || 0);
+    if ((candidateMonthly && !currentMonthly) || (candidateMonthly === currentMonthly && newer)) {
+      byDate.set(forecast.forecastDate, forecast);
+    }
+  }
+  return byDate;
+}
+
+function toNumber(value: string | number | null | undefined): number {
+  if (value === null || value === undefined) return NaN;
+  return parseFloat(value.toString());
+}
@@ -0,0 +1,374 @@
+/**
+ * Forecast Spreading Engine - Monthly targets to daily forecasts
+ * Distributes a monthly revenue, ADR or occupancy target across the days of
+ * the month using the hotel's same-time-last-year (STLY) day-of-week and
+ * event-day shape from hotel actuals. All targets of a request are processed
+ * together in flat typed arrays, so a portfolio x 12 months costs one actuals
+ * query, one events query and one bulk write.
+ */
+
+import { storage } from './storage';
+import type { ForecastSpreadTarget, Hotel, HotelActual, Event, InsertForecast } from '@shared/schema';
+import { addDays, dayOfWeek, eachDay, monthBounds, previousYearMonth } from './date-utils';
+
+const MAX_DAYS = 31;
+// Rows written here carry this methodology; re-spreading replaces only those,
+// never the monthly forecasts analysts entered by hand
+const SPREAD_METHODOLOGY = 'spread';
+
+export interface SpreadDay {
+  hotelId: string;
+  date: string;
+  occupancyRate: number;
+  averageDailyRate: number;
+  revenue: number;
+  roomNights: number;
+}
+
+export interface SpreadResult {
+  targetsProcessed: number;
+  rowsWritten: number;
+  skipped: Array<{ hotelId: string; month: string; reason: string }>;
+  days: SpreadDay[];
+}
+
+interface SpreadProfiles {
+  occFactor: Float64Array;      // [target x day-of-week]
+  adrFactor: Float64Array;      // [target x day-of-week]
+  eventOccFactor: Float64Array; // [target]
+  eventAdrFactor: Float64Array; // [target]
+  levelOcc: Float64Array;       // STLY average occupancy per target
+  levelAdr: Float64Array;       // STLY room-night weighted ADR per target
+  hasHistory: Uint8Array;
+}
+
+export class ForecastSpreadingEngine {
+  /**
+   * Spread monthly targets to daily forecasts and (unless dryRun) persist them
+   */
+  async spread(targets: ForecastSpreadTarget[], options: { dryRun?: boolean; userId?: string } = {}): Promise<SpreadResult> {
+    const skipped: SpreadResult['skipped'] = [];
+
+    const hotelIds = Array.from(new Set(targets.map(t => t.hotelId)));
+    const hotelList = await storage.getHotelsByIds(hotelIds);
+    const hotelsById = new Map(hotelList.map(h => [h.id, h]));
+
+    // Keep only targets we can spread; the last target wins for duplicate hotel-months
+    const targetsByKey = new Map<string, ForecastSpreadTarget>();
+    for (const target of targets) {
+      const hotel = hotelsById.get(target.hotelId);
+      if (!hotel) {
+        skipped.push({ hotelId: target.hotelId, month: target.month, reason: 'Hotel not found' });
+        continue;
+      }
+      if (!hotel.totalRooms || hotel.totalRooms <= 0) {
+        skipped.push({ hotelId: target.hotelId, month: target.month, reason: 'Hotel has no room count' });
+        continue;
+      }
+      targetsByKey.set(`${target.hotelId}|${target.month}`, target);
+    }
+    const active = Array.from(targetsByKey.values());
+
+    if (active.length === 0) {
+      return { targetsProcessed: 0, rowsWritten: 0, skipped, days: [] };
+    }
+
+    // One window covering every STLY month and every target month
+    const months = active.map(t => t.month).sort();
+    const stlyStart = monthBounds(previousYearMonth(months[0])).startDate;
+    const stlyEnd = monthBounds(previousYearMonth(months[months.length - 1])).endDate;
+    const targetEnd = monthBounds(months[months.length - 1]).endDate;
+
+    const activeHotelIds = Array.from(new Set(active.map(t => t.hotelId)));
+    const cities = Array.from(new Set(
+      activeHotelIds.map(id => hotelsById.get(id)!.city).filter((c): c is string => !!c)
+    ));
+
+    const [actuals, cityEvents] = await Promise.all([
+      storage.getHotelActualsForHotels(activeHotelIds, stlyStart, stlyEnd),
+      storage.getEventsByCitiesInRange(cities, stlyStart, targetEnd),
+    ]);
+
+    const eventDays = this.buildEventDaySets(cityEvents, stlyStart, targetEnd);
+    const profiles = this.buildProfiles(active, hotelsById, actuals, eventDays);
+    const grid = this.spreadGrid(active, hotelsById, profiles, eventDays, skipped);
+
+    const rows: InsertForecast[] = [];
+    const ranges: Array<{ hotelId: string; startDate: string; endDate: string }> = [];
+    const days: SpreadDay[] = [];
+
+    active.forEach((target, t) => {
+      if (!grid.valid[t]) return;
+      const { startDate, endDate, days: dayCount } = monthBounds(target.month);
+      ranges.push({ hotelId: target.hotelId, startDate, endDate });
+
+      for (let d = 0; d < dayCount; d++) {
+        const i = t * MAX_DAYS + d;
+        const day: SpreadDay = {
+          hotelId: target.hotelId,
+          date: addDays(startDate, d),
+          occupancyRate: round2(grid.occ[i]),
+          averageDailyRate: round2(grid.adr[i]),
+          revenue: round2(grid.revenue[i]),
+          roomNights: grid.roomNights[i],
+        };
+        days.push(day);
+        rows.push({
+          hotelId: day.hotelId,
+          forecastType: 'monthly',
+          forecastDate: day.date,
+          occupancyRate: day.occupancyRate.toFixed(2),
+          averageDailyRate: day.averageDailyRate.toFixed(2),
+          revenue: day.revenue.toFixed(2),
+          roomNights: day.roomNights,
+          confidence: profiles.hasHistory[t] ? 'medium' : 'low',
+          methodology: SPREAD_METHODOLOGY,
+          notes: `Spread from ${target.month} monthly target`,
+          createdBy: options.userId,
+        });
+      }
+    });
+
+    const rowsWritten = options.dryRun || rows.length === 0
+      ? 0
+      : await storage.replaceForecastsInRanges('monthly', SPREAD_METHODOLOGY, ranges, rows);
+
+    return {
+      targetsProcessed: ranges.length,
+      rowsWritten,
+      skipped,
+      days,
+    };
+  }
+
+  /**
+   * Expand events into per-city sets of covered dates, clipped to the window
+   */
+  private buildEventDaySets(cityEvents: Event[], windowStart: string, windowEnd: string): Map<string, Set<string>> {
+    const eventDays = new Map<string, Set<string>>();
+
+    for (const event of cityEvents) {
+      if (!event.city) continue;
+      const start = event.startDate > windowStart ? event.startDate : windowStart;
+      const end = event.endDate < windowEnd ? event.endDate : windowEnd;
+      if (start > end) continue;
+
+      let set = eventDays.get(event.city);
+      if (!set) {
+        set = new Set();
+        eventDays.set(event.city, set);
+      }
+      for (const day of eachDay(start, end)) set.add(day);
+    }
+
+    return eventDays;
+  }
+
+  /**
+   * Aggregate STLY actuals into per-target day-of-week and event-day factors
+   */
+  private buildProfiles(
+    active: ForecastSpreadTarget[],
+    hotelsById: Map<string, Hotel>,
+    actuals: HotelActual[],
+    eventDays: Map<string, Set<string>>
+  ): SpreadProfiles {
+    const T = active.length;
+    const targetIndex = new Map(active.map((t, i) => [`${t.hotelId}|${previousYearMonth(t.month)}`, i]));
+
+    const dowOcc = new Float64Array(T * 7);
+    const dowAdr = new Float64Array(T * 7);
+    const dowCount = new Float64Array(T * 7);
+    const evOcc = new Float64Array(T);
+    const evAdr = new Float64Array(T);
+    const evCount = new Float64Array(T);
+    const baseOcc = new Float64Array(T);
+    const baseAdr = new Float64Array(T);
+    const baseCount = new Float64Array(T);
+    const stlyRevenue = new Float64Array(T);
+    const stlyRoomNights = new Float64Array(T);
+    const stlyOcc = new Float64Array(T);
+    const stlyCount = new Float64Array(T);
+
+    for (const actual of actuals) {
+      const t = targetIndex.get(`${actual.hotelId}|${actual.actualDate.slice(0, 7)}`);
+      if (t === undefined) continue;
+
+      const occ = actual.occupancyRate ? parseFloat(actual.occupancyRate.toString()) : 0;
+      const adr = actual.averageDailyRate ? parseFloat(actual.averageDailyRate.toString()) : 0;
+      const revenue = actual.revenue ? parseFloat(actual.revenue.toString()) : 0;
+      const city = hotelsById.get(actual.hotelId)?.city;
+      const isEventDay = !!city && !!eventDays.get(city)?.has(actual.actualDate);
+
+      stlyRevenue[t] += revenue;
+      stlyRoomNights[t] += actual.roomNights || 0;
+      stlyOcc[t] += occ;
+      stlyCount[t] += 1;
+
+      if (isEventDay) {
+        evOcc[t] += occ;
+        evAdr[t] += adr;
+        evCount[t] += 1;
+      } else {
+        const k = t * 7 + dayOfWeek(actual.actualDate);
+        dowOcc[k] += occ;
+        dowAdr[k] += adr;
+        dowCount[k] += 1;
+        baseOcc[t] += occ;
+        baseAdr[t] += adr;
+        baseCount[t] += 1;
+      }
+    }
+
+    // Convert sums into multiplicative factors relative to the non-event mean
+    const occFactor = new Float64Array(T * 7).fill(1);
+    const adrFactor = new Float64Array(T * 7).fill(1);
+    const eventOccFactor = new Float64Array(T).fill(1);
+    const eventAdrFactor = new Float64Array(T).fill(1);
+    const levelOcc = new Float64Array(T);
+    const levelAdr = new Float64Array(T);
+    const hasHistory = new Uint8Array(T);
+
+    for (let t = 0; t < T; t++) {
+      if (stlyCount[t] === 0) continue;
+      hasHistory[t] = 1;
+      levelOcc[t] = stlyOcc[t] / stlyCount[t];
+      levelAdr[t] = stlyRoomNights[t] > 0 ? stlyRevenue[t] / stlyRoomNights[t] : 0;
+
+      const meanOcc = baseCount[t] > 0 ? baseOcc[t] / baseCount[t] : 0;
+      const meanAdr = baseCount[t] > 0 ? baseAdr[t] / baseCount[t] : 0;
+
+      for (let w = 0; w < 7; w++) {
+        const k = t * 7 + w;
+        if (dowCount[k] === 0) continue;
+        if (meanOcc > 0) occFactor[k] = (dowOcc[k] / dowCount[k]) / meanOcc;
+        if (meanAdr > 0) adrFactor[k] = (dowAdr[k] / dowCount[k]) / meanAdr;
+      }
+
+      if (evCount[t] > 0) {
+        if (meanOcc > 0) eventOccFactor[t] = (evOcc[t] / evCount[t]) / meanOcc;
+        if (meanAdr > 0) eventAdrFactor[t] = (evAdr[t] / evCount[t]) / meanAdr;
+      }
+    }
+
+    return { occFactor, adrFactor, eventOccFactor, eventAdrFactor, levelOcc, levelAdr, hasHistory };
+  }
+
+  /**
+   * Produce daily occupancy, ADR, room nights and revenue for every target
+   */
+  private spreadGrid(
+    active: ForecastSpreadTarget[],
+    hotelsById: Map<string, Hotel>,
+    profiles: SpreadProfiles,
+    eventDays: Map<string, Set<string>>,
+    skipped: SpreadResult['skipped']
+  ) {
+    const T = active.length;
+    const occ = new Float64Array(T * MAX_DAYS);
+    const adr = new Float64Array(T * MAX_DAYS);
+    const roomNights = new Int32Array(T * MAX_DAYS);
+    const revenue = new Float64Array(T * MAX_DAYS);
+    const valid = new Uint8Array(T);
+
+    active.forEach((target, t) => {
+      const hotel = hotelsById.get(target.hotelId)!;
+      const rooms = hotel.totalRooms!;
+      const { startDate, days } = monthBounds(target.month);
+      const cityDays = hotel.city ? eventDays.get(hotel.city) : undefined;
+      const base = t * MAX_DAYS;
+
+      // Raw shape for each day of the target month
+      let occShapeSum = 0;
+      for (let d = 0; d < days; d++) {
+        const date = addDays(startDate, d);
+        const w = t * 7 + dayOfWeek(date);
+        const isEventDay = !!cityDays?.has(date);
+        occ[base + d] = profiles.occFactor[w] * (isEventDay ? profiles.eventOccFactor[t] : 1);
+        adr[base + d] = profiles.adrFactor[w] * (isEventDay ? profiles.eventAdrFactor[t] : 1);
+        occShapeSum += occ[base + d];
+      }
+
+      // Monthly levels: explicit targets first, then implied, then STLY
+      let occLevel = target.occupancyRate;
+      let adrLevel = target.averageDailyRate;
+      if (occLevel === undefined && target.revenue !== undefined && adrLevel !== undefined) {
+        occLevel = (target.revenue / (adrLevel * rooms * days)) * 100;
+      }
+      if (occLevel === undefined && profiles.hasHistory[t]) occLevel = profiles.levelOcc[t];
+      if (adrLevel === undefined && target.revenue !== undefined && occLevel !== undefined && occLevel > 0) {
+        adrLevel = target.revenue / ((occLevel / 100) * rooms * days);
+      }
+      if (adrLevel === undefined && profiles.hasHistory[t] && profiles.levelAdr[t] > 0) adrLevel = profiles.levelAdr[t];
+
+      if (occLevel === undefined || adrLevel === undefined) {
+        skipped.push({ hotelId: target.hotelId, month: target.month, reason: 'No STLY history to derive the missing metrics' });
+        return;
+      }
+
+      // Occupancy: scale shape to the monthly average, capped at full house.
+      // Occupancy clipped on capped days is spread over the remaining days by
+      // rescaling them until no further day reaches the cap.
+      let remaining = Math.min(100, occLevel) * days;
+      let uncappedShape = occShapeSum;
+      for (let pass = 0; pass < days && uncappedShape > 0; pass++) {
+        const occScale = remaining / uncappedShape;
+        let capped = false;
+        for (let d = 0; d < days; d++) {
+          const i = base + d;
+          if (occ[i] >= 0 && occ[i] * occScale >= 100) {
+            remaining -= 100;
+            uncappedShape -= occ[i];
+            occ[i] = -1; // marks a capped day until the final pass
+            capped = true;
+          }
+        }
+        if (!capped) break;
+      }
+      const occScale = uncappedShape > 0 ? Math.max(0, remaining) / uncappedShape : 0;
+      let totalRoomNights = 0;
+      let adrWeighted = 0;
+      for (let d = 0; d < days; d++) {
+        const i = base + d;
+        occ[i] = occ[i] < 0 ? 100 : Math.min(100, occ[i] * occScale);
+        roomNights[i] = Math.round((occ[i] / 100) * rooms);
+        totalRoomNights += roomNights[i];
+        adrWeighted += adr[i] * roomNights[i];
+      }
+
+      // ADR: monthly ADR is room-night weighted, so normalise on that basis
+      const adrScale = adrWeighted > 0 ? (adrLevel * totalRoomNights) / adrWeighted : 0;
+      let totalRevenue = 0;
+      for (let d = 0; d < days; d++) {
+        const i = base + d;
+        adr[i] = adrScale > 0 ? adr[i] * adrScale : adrLevel;
+        revenue[i] = adr[i] * roomNights[i];
+        totalRevenue += revenue[i];
+      }
+
+      // A revenue target is matched exactly by absorbing rounding and caps into ADR
+      if (target.revenue !== undefined && totalRevenue > 0) {
+        const revenueScale = target.revenue / totalRevenue;
+        for (let d = 0; d < days; d++) {
+          const i = base + d;
+          adr[i] *= revenueScale;
+          revenue[i] = adr[i] * roomNights[i];
+        }
+      } else if (target.revenue !== undefined && target.revenue > 0) {
+        skipped.push({ hotelId: target.hotelId, month: target.month, reason: 'Occupancy shape yields no room nights' });
+        return;
+      }
+
+      valid[t] = 1;
+    });
+
+    return { occ, adr, roomNights, revenue, valid };
+  }
+}
+
+function round2(value: number): number {
+  return Math.round(value * 100) / 100;
+}
+
+// Export singleton instance
+export const forecastSpreadingEngine = new ForecastSpreadingEngine();
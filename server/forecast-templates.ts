@@ -0,0 +1,153 @@
+/**
+ * Forecast Templates - monthly forecast entry workbooks per hotel
+ * Each template lists every day of the month with the events in the hotel's
+ * city (or within EVENT_MATCH_RADIUS_KM of it) and blank forecast columns.
+ * Sheets are built from whole row arrays, events are placed on their days with
+ * one pass over each event's interval, and finished files are cached by hotel,
+ * month and events version so budget season re-downloads are free. Templates
+ * for many hotels can be streamed as one zip archive.
+ */
+
+import * as XLSX from 'xlsx';
+import type { Writable } from 'stream';
+import { storage } from './storage';
+import { changeTracker } from './change-tracker';
+import type { Event, Hotel } from '@shared/schema';
+import { daysBetween, dayOfWeek, eachDay, monthBounds } from './date-utils';
+import { ZipStream } from './zip-stream';
+import { spatialIndex, EVENT_MATCH_RADIUS_KM } from './spatial-index';
+
+const MAX_CACHED_TEMPLATES = 1000;
+const DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'];
+const HEADER = ['Date', 'Day', 'Events', 'Occupancy Rate (%)', 'Average Daily Rate', 'Revenue', 'Room Nights', 'Notes'];
+
+export interface TemplateFile {
+  filename: string;
+  buffer: Buffer;
+}
+
+export class ForecastTemplateService {
+  // Insertion-ordered map used as an LRU
+  private cache = new Map<string, Buffer>();
+
+  /**
+   * Monthly template for one hotel
+   */
+  async getMonthlyTemplate(hotel: Hotel, month: string): Promise<TemplateFile> {
+    const [template] = await this.getMonthlyTemplates([hotel], month);
+    return template;
+  }
+
+  /**
+   * Monthly templates for several hotels, loading the month's events once
+   */
+  async getMonthlyTemplates(hotelList: Hotel[], month: string): Promise<TemplateFile[]> {
+    const eventsVersion = await changeTracker.getVersion({ tables: ['events'] });
+    const keyOf = (hotel: Hotel) => `${hotel.id}|${month}|${eventsVersion}|${hotel.updatedAt?.getTime() || 0}`;
+
+    const missing = hotelList.filter(hotel => !this.cache.has(keyOf(hotel)));
+    let eventsByHotel = new Map<string, Event[]>();
+    if (missing.length > 0) {
+      const { startDate, endDate } = monthBounds(month);
+      if (EVENT_MATCH_RADIUS_KM > 0) {
+        const monthEvents = await storage.getEventsInRange(startDate, endDate);
+        eventsByHotel = spatialIndex.matchEventsToHotels(missing, monthEvents, EVENT_MATCH_RADIUS_KM);
+      } else {
+        const cities = Array.from(new Set(missing.map(h => h.city).filter((city): city is string => !!city)));
+        const eventsByCity = groupByCity(await storage.getEventsByCitiesInRange(cities, startDate, endDate));
+        eventsByHotel = new Map(missing.map(hotel => [hotel.id, eventsByCity.get(hotel.city || '') || []]));
+      }
+    }
+
+    return hotelList.map(hotel => {
+      const key = keyOf(hotel);
+      let buffer = this.cache.get(key);
+      if (buffer) {
+        this.cache.delete(key);
+      } else {
+        buffer = this.buildMonthlyTemplate(hotel, month, eventsByHotel.get(hotel.id) || []);
+      }
+      this.remember(key, buffer);
+      return { filename: templateFilename(hotel, month), buffer };
+    });
+  }
+
+  /**
+   * Stream a zip of monthly templates, building them in small groups so only
+   * a handful of workbooks are in memory at once
+   */
+  async writeMonthlyTemplatesZip(out: Writable, hotelList: Hotel[], month: string): Promise<void> {
+    const zip = new ZipStream(out);
+    const groupSize = 25;
+    const used = new Set<string>();
+
+    for (let i = 0; i < hotelList.length; i += groupSize) {
+      const templates = await this.getMonthlyTemplates(hotelList.slice(i, i + groupSize), month);
+      for (const template of templates) {
+        // Hotels may share a name; keep archive entries unique
+        let filename = template.filename;
+        for (let n = 2; used.has(filename); n++) filename = template.filename.replace(/\.xlsx$/, `-${n}.xlsx`);
+        used.add(filename);
+        await zip.addFile(filename, template.buffer);
+      }
+    }
+
+    await zip.finish();
+  }
+
+  private buildMonthlyTemplate(hotel: Hotel, month: string, monthEvents: Event[]): Buffer {
+    const { startDate, endDate } = monthBounds(month);
+    const days = eachDay(startDate, endDate);
+
+    // Interval lookup: each event is written onto the days it covers
+    const eventsByDay: string[][] = days.map(() => []);
+    for (const event of monthEvents) {
+      const first = Math.max(0, daysBetween(startDate, event.startDate));
+      const last = Math.min(days.length - 1, daysBetween(startDate, event.endDate));
+      for (let d = first; d <= last; d++) eventsByDay[d].push(event.name);
+    }
+
+    const rows: unknown[][] = [
+      ['Hotel', hotel.name],
+      ['Hotel ID', hotel.id],
+      ['City', hotel.city || ''],
+      ['Month', month],
+      ['Total Rooms', hotel.totalRooms || ''],
+      [],
+      HEADER,
+      ...days.map((day, d) => [day, DAY_NAMES[dayOfWeek(day)], eventsByDay[d].join('; '), '', '', '', '', '']),
+    ];
+
+    const worksheet = XLSX.utils.aoa_to_sheet(rows);
+    worksheet['!cols'] = [{ wch: 12 }, { wch: 11 }, { wch: 40 }, { wch: 18 }, { wch: 18 }, { wch: 14 }, { wch: 12 }, { wch: 30 }];
+    const workbook = XLSX.utils.book_new();
+    XLSX.utils.book_append_sheet(workbook, worksheet, 'Monthly Forecast');
+
+    return XLSX.write(workbook, { type: 'buffer', bookType: 'xlsx', compression: true });
+  }
+
+  private remember(key: string, buffer: Buffer): void {
+    this.cache.set(key, buffer);
+    if (this.cache.size > MAX_CACHED_TEMPLATES) {
+      this.cache.delete(this.cache.keys().next().value!);
+    }
+  }
+}
+
+function groupByCity(list: Event[]): Map<string, Event[]> {
+  const byCity = new Map<string, Event[]>();
+  for (const event of list) {
+    const group = byCity.get(event.city!) || [];
+    group.push(event);
+    byCity.set(event.city!, group);
+  }
+  return byCity;
+}
+
+function templateFilename(hotel: Hotel, month: string): string {
+  const slug = hotel.name.toLowerCase().replace(/[^a-z0-9]+/g, '-').replace(/^-|-$/g, '') || hotel.id;
+  return `${slug}-${month}-forecast-template.xlsx`;
+}
+
+// Export singleton instance
+export const forecastTemplateService = new ForecastTemplateService();
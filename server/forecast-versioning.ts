@@ -0,0 +1,356 @@
+/**
+ * Forecast Versioning Service - named forecast snapshots and diffs
+ * A version captures every forecast of a hotel (or the whole portfolio) but
+ * only stores the rows that changed since the previous version of the same
+ * scope. Every FULL_SNAPSHOT_INTERVAL versions a full snapshot is written so
+ * materialising a version never walks a long delta chain.
+ */
+
+import { storage } from './storage';
+import type { Forecast, ForecastVersion, ForecastVersionEntry, InsertForecast, InsertForecastVersionEntry } from '@shared/schema';
+
+const FULL_SNAPSHOT_INTERVAL = 10;
+
+type VersionRow = Omit<InsertForecastVersionEntry, 'versionId'>;
+
+export interface ForecastVersionDiff {
+  from: { id: string; name: string } | 'live';
+  to: { id: string; name: string } | 'live';
+  hotelId: string | null;
+  summary: {
+    added: number;
+    removed: number;
+    changed: number;
+    unchanged: number;
+    revenueBefore: number;
+    revenueAfter: number;
+    revenueDelta: number;
+    roomNightsDelta: number;
+  };
+  byHotel: Array<{ hotelId: string; changed: number; revenueDelta: number; roomNightsDelta: number }>;
+  changes: Array<{
+    hotelId: string;
+    forecastType: string | null;
+    forecastDate: string;
+    eventId: string | null;
+    status: 'added' | 'removed' | 'changed';
+    before: ForecastValues | null;
+    after: ForecastValues | null;
+  }>;
+}
+
+interface ForecastValues {
+  occupancyRate: number | null;
+  averageDailyRate: number | null;
+  revenue: number | null;
+  roomNights: number | null;
+}
+
+export class ForecastVersioningService {
+  /**
+   * Capture the live forecasts of a scope as a new named version
+   */
+  async captureVersion(name: string, hotelId: string | null, userId?: string): Promise<ForecastVersion> {
+    const [live, scopeVersions] = await Promise.all([
+      storage.getForecasts(hotelId || undefined),
+      storage.getForecastVersionsForScope(hotelId),
+    ]);
+
+    const current = this.rowsFromForecasts(live);
+    const parent = scopeVersions[0];
+    const chainLength = parent ? this.resolveChain(parent, scopeVersions).length : 0;
+    let isFull = !parent || chainLength >= FULL_SNAPSHOT_INTERVAL;
+    const previous = isFull ? null : await this.materialize(parent, scopeVersions);
+    // Versions captured before entries were keyed by day cannot be diffed against
+    if (previous && Array.from(previous.values()).some(row => !row.forecastId)) isFull = true;
+
+    let entries: VersionRow[];
+    if (isFull || !previous) {
+      entries = Array.from(current.values());
+    } else {
+      entries = [];
+
+      current.forEach((row, key) => {
+        const before = previous.get(key);
+        if (!before || !this.sameRow(before, row)) entries.push(row);
+      });
+      previous.forEach((row, key) => {
+        if (!current.has(key)) entries.push({ ...row, isDeleted: true });
+      });
+    }
+
+    return await storage.createForecastVersion({
+      name,
+      hotelId,
+      parentId: isFull ? null : parent.id,
+      isFull,
+      rowCount: current.size,
+      entryCount: entries.length,
+      createdBy: userId,
+    }, entries);
+  }
+
+  /**
+   * Diff two versions, or a version against the live forecasts ("live")
+   */
+  async diff(fromId: string, toId: string, limit = 500): Promise<ForecastVersionDiff | undefined> {
+    const [fromSide, toSide] = await Promise.all([this.loadSide(fromId), this.loadSide(toId)]);
+    if (!fromSide || !toSide) return undefined;
+
+    // When scopes differ, compare only the narrower (single hotel) scope
+    const hotelId = fromSide.hotelId || toSide.hotelId;
+    const before = this.filterScope(fromSide.rows, hotelId);
+    const after = this.filterScope(toSide.rows, hotelId);
+
+    // Align both sides on the union of keys into parallel columns
+    const keys = Array.from(new Set([...before.keys(), ...after.keys()]));
+    const n = keys.length;
+    const present = new Uint8Array(n * 2);
+    const revenue = new Float64Array(n * 2);
+    const roomNights = new Float64Array(n * 2);
+    const differs = new Uint8Array(n);
+
+    for (let i = 0; i < n; i++) {
+      const b = before.get(keys[i]);
+      const a = after.get(keys[i]);
+      if (b) {
+        present[i * 2] = 1;
+        revenue[i * 2] = toNumber(b.revenue) || 0;
+        roomNights[i * 2] = b.roomNights || 0;
+      }
+      if (a) {
+        present[i * 2 + 1] = 1;
+        revenue[i * 2 + 1] = toNumber(a.revenue) || 0;
+        roomNights[i * 2 + 1] = a.roomNights || 0;
+      }
+      differs[i] = b && a ? (this.sameValues(b, a) ? 0 : 1) : 1;
+    }
+
+    const summary = { added: 0, removed: 0, changed: 0, unchanged: 0, revenueBefore: 0, revenueAfter: 0, revenueDelta: 0, roomNightsDelta: 0 };
+    const byHotel = new Map<string, { hotelId: string; changed: number; revenueDelta: number; roomNightsDelta: number }>();
+    const changes: ForecastVersionDiff['changes'] = [];
+
+    for (let i = 0; i < n; i++) {
+      summary.revenueBefore += revenue[i * 2];
+      summary.revenueAfter += revenue[i * 2 + 1];
+      if (!differs[i]) {
+        summary.unchanged++;
+        continue;
+      }
+
+      const status = !present[i * 2] ? 'added' : !present[i * 2 + 1] ? 'removed' : 'changed';
+      summary[status]++;
+
+      const row = (after.get(keys[i]) || before.get(keys[i]))!;
+      const revenueDelta = revenue[i * 2 + 1] - revenue[i * 2];
+      const roomNightsDelta = roomNights[i * 2 + 1] - roomNights[i * 2];
+
+      let hotel = byHotel.get(row.hotelId);
+      if (!hotel) {
+        hotel = { hotelId: row.hotelId, changed: 0, revenueDelta: 0, roomNightsDelta: 0 };
+        byHotel.set(row.hotelId, hotel);
+      }
+      hotel.changed++;
+      hotel.revenueDelta += revenueDelta;
+      hotel.roomNightsDelta += roomNightsDelta;
+
+      if (changes.length < limit) {
+        changes.push({
+          hotelId: row.hotelId,
+          forecastType: row.forecastType || null,
+          forecastDate: row.forecastDate,
+          eventId: row.eventId || null,
+          status,
+          before: present[i * 2] ? this.values(before.get(keys[i])!) : null,
+          after: present[i * 2 + 1] ? this.values(after.get(keys[i])!) : null,
+        });
+      }
+    }
+
+    summary.revenueDelta = summary.revenueAfter - summary.revenueBefore;
+    summary.roomNightsDelta = Array.from(byHotel.values()).reduce((sum, h) => sum + h.roomNightsDelta, 0);
+
+    return {
+      from: fromSide.label,
+      to: toSide.label,
+      hotelId,
+      summary,
+      byHotel: Array.from(byHotel.values()).sort((a, b) => Math.abs(b.revenueDelta) - Math.abs(a.revenueDelta)),
+      changes,
+    };
+  }
+
+  /**
+   * Replace the live forecasts of a version's scope with its contents.
+   * The current state is captured first so a restore is itself reversible.
+   */
+  async restoreVersion(versionId: string, userId?: string): Promise<{ restored: number; backupVersionId: string } | undefined> {
+    const version = await storage.getForecastVersion(versionId);
+    if (!version) return undefined;
+
+    const backup = await this.captureVersion(`Before restoring "${version.name}"`, version.hotelId, userId);
+    const scopeVersions = await storage.getForecastVersionsForScope(version.hotelId);
+    const rows = await this.materialize(version, scopeVersions);
+
+    // Forecasts come back under the ids they were captured with, notes and authors
+    const forecastRows: InsertForecast[] = Array.from(rows.values()).map(row => ({
+      id: row.forecastId ?? undefined,
+      hotelId: row.hotelId,
+      forecastType: row.forecastType,
+      forecastDate: row.forecastDate,
+      eventId: row.eventId,
+      occupancyRate: row.occupancyRate,
+      averageDailyRate: row.averageDailyRate,
+      revenue: row.revenue,
+      roomNights: row.roomNights,
+      confidence: row.confidence,
+      methodology: row.methodology,
+      notes: row.notes,
+      createdBy: row.createdBy,
+    }));
+
+    const restored = await storage.replaceForecastsForScope(version.hotelId, forecastRows);
+    return { restored, backupVersionId: backup.id };
+  }
+
+  private async loadSide(id: string): Promise<{ label: ForecastVersionDiff['from']; hotelId: string | null; rows: Map<string, VersionRow> } | undefined> {
+    if (id === 'live') {
+      return { label: 'live', hotelId: null, rows: this.rowsFromForecasts(await storage.getForecasts()) };
+    }
+
+    const version = await storage.getForecastVersion(id);
+    if (!version) return undefined;
+
+    const scopeVersions = await storage.getForecastVersionsForScope(version.hotelId);
+    return {
+      label: { id: version.id, name: version.name },
+      hotelId: version.hotelId,
+      rows: await this.materialize(version, scopeVersions),
+    };
+  }
+
+  /**
+   * Rebuild the full row set of a version by replaying its delta chain
+   */
+  private async materialize(version: ForecastVersion, scopeVersions: ForecastVersion[]): Promise<Map<string, VersionRow>> {
+    const chain = this.resolveChain(version, scopeVersions);
+    const entries = await storage.getForecastVersionEntries(chain.map(v => v.id));
+
+    const entriesByVersion = new Map<string, ForecastVersionEntry[]>();
+    for (const entry of entries) {
+      const list = entriesByVersion.get(entry.versionId) || [];
+      list.push(entry);
+      entriesByVersion.set(entry.versionId, list);
+    }
+
+    // Chain is newest first; replay from the full snapshot forward
+    const rows = new Map<string, VersionRow>();
+    for (let i = chain.length - 1; i >= 0; i--) {
+      for (const entry of entriesByVersion.get(chain[i].id) || []) {
+        if (entry.isDeleted) {
+          rows.delete(entry.entryKey);
+        } else {
+          const { versionId, ...row } = entry;
+          rows.set(entry.entryKey, row);
+        }
+      }
+    }
+    return rows;
+  }
+
+  /**
+   * Versions from the given one back to the nearest full snapshot (newest first)
+   */
+  private resolveChain(version: ForecastVersion, scopeVersions: ForecastVersion[]): ForecastVersion[] {
+    const byId = new Map(scopeVersions.map(v => [v.id, v]));
+    const chain: ForecastVersion[] = [];
+
+    let current: ForecastVersion | undefined = version;
+    while (current) {
+      chain.push(current);
+      if (current.isFull || !current.parentId) break;
+      current = byId.get(current.parentId);
+    }
+    return chain;
+  }
+
+  /**
+   * Rows keyed by what the forecast is for rather than its id, since
+   * spreading re-inserts a whole month under new ids. Forecasts sharing a key
+   * are numbered in creation order.
+   */
+  private rowsFromForecasts(list: Forecast[]): Map<string, VersionRow> {
+    const rows = new Map<string, VersionRow>();
+    const ordered = list.slice().sort((a, b) =>
+      (a.createdAt?.getTime() ?? 0) - (b.createdAt?.getTime() ?? 0) || (a.id < b.id ? -1 : a.id > b.id ? 1 : 0));
+    for (const forecast of ordered) {
+      const base = [forecast.hotelId, forecast.forecastType ?? '', forecast.forecastDate, forecast.eventId ?? '', forecast.methodology ?? ''].join('|');
+      let entryKey = base;
+      for (let n = 2; rows.has(entryKey); n++) entryKey = `${base}#${n}`;
+
+      rows.set(entryKey, {
+        entryKey,
+        forecastId: forecast.id,
+        hotelId: forecast.hotelId,
+        forecastType: forecast.forecastType,
+        forecastDate: forecast.forecastDate,
+        eventId: forecast.eventId,
+        occupancyRate: forecast.occupancyRate,
+        averageDailyRate: forecast.averageDailyRate,
+        revenue: forecast.revenue,
+        roomNights: forecast.roomNights,
+        confidence: forecast.confidence,
+        methodology: forecast.methodology,
+        notes: forecast.notes,
+        createdBy: forecast.createdBy,
+        isDeleted: false,
+      });
+    }
+    return rows;
+  }
+
+  private filterScope(rows: Map<string, VersionRow>, hotelId: string | null): Map<string, VersionRow> {
+    if (!hotelId) return rows;
+    return new Map(Array.from(rows).filter(([, row]) => row.hotelId === hotelId));
+  }
+
+  private sameValues(a: VersionRow, b: VersionRow): boolean {
+    return toNumber(a.occupancyRate) === toNumber(b.occupancyRate)
+      && toNumber(a.averageDailyRate) === toNumber(b.averageDailyRate)
+      && toNumber(a.revenue) === toNumber(b.revenue)
+      && (a.roomNights ?? null) === (b.roomNights ?? null)
+      && (a.confidence ?? null) === (b.confidence ?? null)
+      && (a.methodology ?? null) === (b.methodology ?? null);
+  }
+
+  /**
+   * Whether a row needs no new entry: same day, type and event, same values,
+   * notes and author. The id is left out, so re-inserted rows cost nothing.
+   */
+  private sameRow(a: VersionRow, b: VersionRow): boolean {
+    return this.sameValues(a, b)
+      && a.hotelId === b.hotelId
+      && (a.forecastType ?? null) === (b.forecastType ?? null)
+      && a.forecastDate === b.forecastDate
+      && (a.eventId ?? null) === (b.eventId ?? null)
+      && (a.notes ?? null) === (b.notes ?? null)
+      && (a.createdBy ?? null) === (b.createdBy ?? null);
+  }
+
+  private values(row: VersionRow): ForecastValues {
+    return {
+      occupancyRate: toNumber(row.occupancyRate),
+      averageDailyRate: toNumber(row.averageDailyRate),
+      revenue: toNumber(row.revenue),
+      roomNights: row.roomNights ?? null,
+    };
+  }
+}
+
+function toNumber(value: string | number | null | undefined): number | null {
+  if (value === null || value === undefined) return null;
+  return parseFloat(value.toString());
+}
+
+// Export singleton instance
+export const forecastVersioningService = new ForecastVersioningService();
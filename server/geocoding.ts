@@ -0,0 +1,202 @@
+/**
+ * Geocoding - address to coordinates with a persistent cache
+ * Addresses are normalized into a cache key (accents, case, punctuation and
+ * spacing folded) and looked up in bulk: first in a small in-memory map, then
+ * in the geocode_cache table, and only the remaining misses go to the
+ * provider in batches. Every answer is written back so an address is resolved
+ * once per provider: rows written by a different provider are looked up
+ * again, and "not found" answers expire after GEOCODING_MISS_TTL_HOURS (a
+ * week by default) since the address may become known later. Providers are
+ * pluggable; the offline gazetteer built on sample-coordinates.ts is the
+ * default, so local development needs no network. Geocoding happens when rows
+ * are written, never on the read path.
+ */
+
+import { storage } from './storage';
+import { getCoordinatesForCity } from './sample-coordinates';
+import { sourceRateLimiter } from './rate-limiter';
+import type { GeoPoint } from './spatial-index';
+
+const MAX_MEMORY_ENTRIES = 10000;
+const MISS_TTL_MS = parseFloat(process.env.GEOCODING_MISS_TTL_HOURS || '168') * 60 * 60 * 1000;
+
+export interface GeocodeQuery {
+  address?: string | null;
+  city?: string | null;
+  state?: string | null;
+  country?: string | null;
+}
+
+export type GeocodePrecision = 'address' | 'city';
+
+export interface GeocodeResult extends GeoPoint {
+  precision: GeocodePrecision;
+}
+
+export interface GeocodingProvider {
+  name: string;
+  maxBatchSize: number;
+  // Answers must line up with the queries; null means not found
+  geocode(queries: GeocodeQuery[], signal?: AbortSignal): Promise<Array<GeocodeResult | null>>;
+}
+
+/**
+ * Normalized cache key for an address
+ */
+export function addressKey(query: GeocodeQuery): string {
+  return [query.address, query.city, query.state, query.country]
+    .map(part => (part || '')
+      .normalize('NFKD')
+      .replace(/[\u0300-\u036f]/g, '')
+      .toLowerCase()
+      .replace(/[^a-z0-9]+/g, ' ')
+      .trim())
+    .join('|')
+    .substring(0, 500);
+}
+
+/**
+ * Offline provider resolving city names from the built-in gazetteer
+ */
+export class GazetteerProvider implements GeocodingProvider {
+  name = 'gazetteer';
+  maxBatchSize = 10000;
+
+  async geocode(queries: GeocodeQuery[]): Promise<Array<GeocodeResult | null>> {
+    return queries.map((query) => {
+      // Free-text locations such as "Miami, FL" carry the city first
+      const coords = getCoordinatesForCity(query.city || query.address?.split(',')[0] || '');
+      return coords ? { latitude: coords.latitude, longitude: coords.longitude, precision: 'city' } : null;
+    });
+  }
+}
+
+/**
+ * Nominatim-compatible HTTP geocoder (GEOCODING_URL), one address per
+ * request under a shared rate limit
+ */
+export class NominatimProvider implements GeocodingProvider {
+  name = 'nominatim';
+  maxBatchSize = 50;
+  requestsPerMinute = parseInt(process.env.GEOCODING_REQUESTS_PER_MINUTE || '60');
+
+  constructor(private baseUrl: string) {}
+
+  async geocode(queries: GeocodeQuery[], signal?: AbortSignal): Promise<Array<GeocodeResult | null>> {
+    const results: Array<GeocodeResult | null> = [];
+    for (const query of queries) {
+      await sourceRateLimiter.acquire(this.name, this.requestsPerMinute, signal);
+
+      const url = new URL(`${this.baseUrl}/search`);
+      url.searchParams.set('format', 'jsonv2');
+      url.searchParams.set('limit', '1');
+      url.searchParams.set('q', [query.address, query.city, query.state, query.country].filter(Boolean).join(', '));
+
+      const response = await fetch(url, { signal, headers: { Accept: 'application/json' } });
+      if (!response.ok) {
+        throw new Error(`Geocoder responded with ${response.status}`);
+      }
+      const [match] = await response.json() as any[];
+      results.push(match ? {
+        latitude: parseFloat(match.lat),
+        longitude: parseFloat(match.lon),
+        precision: query.address ? 'address' : 'city',
+      } : null);
+    }
+    return results;
+  }
+}
+
+export class GeocodingService {
+  // Insertion-ordered map used as an LRU; a null result marks a cached miss
+  private memory = new Map<string, { result: GeocodeResult | null; storedAt: number }>();
+
+  constructor(private provider: GeocodingProvider) {}
+
+  /**
+   * Resolve many addresses at once. Results line up with `queries`. Once
+   * `signal` aborts, addresses the provider has not answered yet come back
+   * null (and uncached) while cached answers are still returned.
+   */
+  async geocodeMany(queries: GeocodeQuery[], signal?: AbortSignal): Promise<Array<GeocodeResult | null>> {
+    const keys = queries.map(addressKey);
+    const found = new Map<string, GeocodeResult | null>();
+
+    const now = Date.now();
+    const storedAt = new Map<string, number>();
+    const unknown = Array.from(new Set(keys)).filter((key) => {
+      if (key.replace(/\|/g, '') === '') return false;
+      const cached = this.memory.get(key);
+      if (!cached || (cached.result === null && now - cached.storedAt > MISS_TTL_MS)) return true;
+      found.set(key, cached.result);
+      storedAt.set(key, cached.storedAt);
+      return false;
+    });
+
+    for (const entry of await storage.getGeocodes(unknown)) {
+      // Another provider's answer (or its miss) says nothing about this one's
+      if (entry.provider !== this.provider.name) continue;
+      const cachedAt = entry.createdAt?.getTime() ?? 0;
+      const point = entry.latitude && entry.longitude ? {
+        latitude: parseFloat(entry.latitude),
+        longitude: parseFloat(entry.longitude),
+        precision: entry.precision as GeocodePrecision,
+      } : null;
+      if (point === null && now - cachedAt > MISS_TTL_MS) continue;
+      found.set(entry.addressKey, point);
+      storedAt.set(entry.addressKey, cachedAt);
+    }
+
+    // Ask the provider only for addresses without a usable cached answer
+    const missing = unknown.filter(key => !found.has(key));
+    const queryByKey = new Map(keys.map((key, i) => [key, queries[i]]));
+    for (let i = 0; i < missing.length; i += this.provider.maxBatchSize) {
+      const batch = missing.slice(i, i + this.provider.maxBatchSize);
+      let answers: Array<GeocodeResult | null>;
+      try {
+        answers = await this.provider.geocode(batch.map(key => queryByKey.get(key)!), signal);
+      } catch (error) {
+        if (signal?.aborted) break;
+        throw error;
+      }
+
+      batch.forEach((key, j) => found.set(key, answers[j] || null));
+      await storage.saveGeocodes(batch.map((key, j) => ({
+        addressKey: key,
+        latitude: answers[j]?.latitude.toString() ?? null,
+        longitude: answers[j]?.longitude.toString() ?? null,
+        precision: answers[j]?.precision ?? null,
+        provider: this.provider.name,
+      })));
+    }
+
+    found.forEach((result, key) => this.remember(key, result, storedAt.get(key) ?? now));
+    return keys.map(key => found.get(key) || null);
+  }
+
+  async geocode(query: GeocodeQuery, signal?: AbortSignal): Promise<GeocodeResult | null> {
+    const [result] = await this.geocodeMany([query], signal);
+    return result;
+  }
+
+  private remember(key: string, result: GeocodeResult | null, storedAt: number): void {
+    this.memory.delete(key);
+    this.memory.set(key, { result, storedAt });
+    if (this.memory.size > MAX_MEMORY_ENTRIES) {
+      this.memory.delete(this.memory.keys().next().value!);
+    }
+  }
+}
+
+/**
+ * Provider selected through the environment; the offline gazetteer by default
+ */
+export function configuredProvider(): GeocodingProvider {
+  if (process.env.GEOCODING_PROVIDER === 'nominatim' && process.env.GEOCODING_URL) {
+    return new NominatimProvider(process.env.GEOCODING_URL);
+  }
+  return new GazetteerProvider();
+}
+
+// Export singleton instance
+export const geocodingService = new GeocodingService(configuredProvider());
@@ -0,0 +1,267 @@
+/**
+ * HTTP Response Cache - persistent cache in front of external event sources
+ * Responses are stored on disk under a normalized request key (source,
+ * location, date window, event types) with a TTL. Fresh entries are served
+ * without a request; stale ones are revalidated with ETag/Last-Modified so an
+ * unchanged page costs a 304. The directory is bounded in bytes and evicts the
+ * least recently used entries first. Hit ratio and bytes saved are tracked.
+ */
+
+import { createHash, randomBytes } from 'crypto';
+import { promises as fs } from 'fs';
+import os from 'os';
+import path from 'path';
+
+const DEFAULT_MAX_BYTES = 200 * 1024 * 1024;
+
+interface CacheEntryMeta {
+  key: string;
+  etag?: string;
+  lastModified?: string;
+  storedAt: number;
+  expiresAt: number;
+  lastAccess: number;
+  size: number;
+}
+
+export interface CacheKeyParts {
+  source: string;
+  location: string;
+  startDate: string;
+  endDate: string;
+  eventTypes: string[];
+}
+
+export type CacheOutcome = 'hit' | 'revalidated' | 'miss';
+
+/**
+ * Normalize the parts of a search so equivalent requests share an entry
+ */
+export function sourceCacheKey(parts: CacheKeyParts): string {
+  const types = Array.from(new Set(parts.eventTypes.map(t => t.trim().toLowerCase()))).sort();
+  return [
+    parts.source.toLowerCase(),
+    parts.location.trim().toLowerCase().replace(/\s+/g, ' '),
+    parts.startDate,
+    parts.endDate,
+    types.join(','),
+  ].join('|');
+}
+
+export class HttpResponseCache {
+  private index: Map<string, CacheEntryMeta> | null = null;
+  private loading: Promise<Map<string, CacheEntryMeta>> | null = null;
+  private totalBytes = 0;
+  private stats = { hits: 0, revalidated: 0, misses: 0, bytesSaved: 0, bytesFetched: 0 };
+
+  constructor(
+    private directory: string,
+    private maxBytes: number = DEFAULT_MAX_BYTES
+  ) {}
+
+  /**
+   * GET `url` as JSON through the cache. `key` identifies the logical request
+   * and must not contain credentials; the URL itself is never stored.
+   * `beforeRequest` runs only when the network is actually used, e.g. to wait
+   * for a rate limit that cache hits should not count against.
+   */
+  async fetchJson(
+    key: string,
+    url: URL,
+    ttlMs: number,
+    signal?: AbortSignal,
+    beforeRequest?: () => Promise<void>
+  ): Promise<{ body: any; outcome: CacheOutcome }> {
+    const index = await this.load();
+    const id = hashKey(key);
+    let meta = index.get(id);
+    const now = Date.now();
+
+    if (meta && meta.expiresAt > now) {
+      const body = await this.readBody(id);
+      if (body !== undefined) {
+        meta.lastAccess = now;
+        this.stats.hits++;
+        this.stats.bytesSaved += meta.size;
+        return { body, outcome: 'hit' };
+      }
+      // Metadata without a body cannot be revalidated
+      await this.drop(id);
+      meta = undefined;
+    }
+
+    const headers: Record<string, string> = { Accept: 'application/json' };
+    if (meta?.etag) headers['If-None-Match'] = meta.etag;
+    if (meta?.lastModified) headers['If-Modified-Since'] = meta.lastModified;
+
+    await beforeRequest?.();
+    const response = await fetch(url, { signal, headers });
+
+    if (response.status === 304 && meta) {
+      const body = await this.readBody(id);
+      if (body === undefined) {
+        // The body is gone (e.g. an interrupted eviction): start over without
+        // validators so the source sends the full response
+        await this.drop(id);
+        return this.fetchJson(key, url, ttlMs, signal, beforeRequest);
+      }
+
+      meta.expiresAt = now + ttlMs;
+      meta.lastAccess = now;
+      try {
+        await this.writeMeta(id, meta);
+      } catch (error) {
+        // The refreshed expiry is best effort; the cached body is still valid
+        console.error("Error writing event source cache entry:", error);
+      }
+      this.stats.revalidated++;
+      this.stats.bytesSaved += meta.size;
+      return { body, outcome: 'revalidated' };
+    }
+
+    if (!response.ok) {
+      throw new Error(`Source responded with ${response.status}`);
+    }
+
+    const text = await response.text();
+    const body = JSON.parse(text);
+    this.stats.misses++;
+    this.stats.bytesFetched += Buffer.byteLength(text);
+
+    await this.store(id, text, {
+      key,
+      etag: response.headers.get('etag') || undefined,
+      lastModified: response.headers.get('last-modified') || undefined,
+      storedAt: now,
+      expiresAt: now + ttlMs,
+      lastAccess: now,
+      size: Buffer.byteLength(text),
+    });
+
+    return { body, outcome: 'miss' };
+  }
+
+  getStats() {
+    const lookups = this.stats.hits + this.stats.revalidated + this.stats.misses;
+    return {
+      ...this.stats,
+      lookups,
+      hitRatio: lookups > 0 ? (this.stats.hits + this.stats.revalidated) / lookups : 0,
+      entries: this.index?.size || 0,
+      sizeBytes: this.totalBytes,
+      maxBytes: this.maxBytes,
+    };
+  }
+
+  private async store(id: string, text: string, meta: CacheEntryMeta): Promise<void> {
+    const index = await this.load();
+    try {
+      await fs.mkdir(this.directory, { recursive: true });
+      await writeAtomic(this.bodyPath(id), text);
+      await this.writeMeta(id, meta);
+
+      this.totalBytes += meta.size - (index.get(id)?.size || 0);
+      index.set(id, meta);
+      await this.evict();
+    } catch (error) {
+      // Caching is best effort; the response itself is still returned
+      console.error("Error writing event source cache entry:", error);
+    }
+  }
+
+  private async drop(id: string): Promise<void> {
+    const index = await this.load();
+    const meta = index.get(id);
+    if (meta) {
+      index.delete(id);
+      this.totalBytes -= meta.size;
+    }
+    // Metadata first: an interrupted drop then leaves an orphan body, which
+    // is never read, rather than metadata pointing at nothing
+    await fs.rm(this.metaPath(id), { force: true });
+    await fs.rm(this.bodyPath(id), { force: true });
+  }
+
+  /**
+   * Drop least recently used entries until the cache fits its byte budget
+   */
+  private async evict(): Promise<void> {
+    const index = await this.load();
+    if (this.totalBytes <= this.maxBytes) return;
+
+    const byAge = Array.from(index.entries()).sort((a, b) => a[1].lastAccess - b[1].lastAccess);
+    for (const [id] of byAge) {
+      if (this.totalBytes <= this.maxBytes) break;
+      await this.drop(id);
+    }
+  }
+
+  private load(): Promise<Map<string, CacheEntryMeta>> {
+    if (this.index) return Promise.resolve(this.index);
+    if (!this.loading) {
+      this.loading = this.readIndex().then((index) => {
+        this.index = index;
+        this.totalBytes = Array.from(index.values()).reduce((sum, meta) => sum + meta.size, 0);
+        return index;
+      });
+    }
+    return this.loading;
+  }
+
+  private async readIndex(): Promise<Map<string, CacheEntryMeta>> {
+    const index = new Map<string, CacheEntryMeta>();
+    let files: string[] = [];
+    try {
+      files = await fs.readdir(this.directory);
+    } catch {
+      return index;
+    }
+
+    for (const file of files.filter(f => f.endsWith('.meta.json'))) {
+      try {
+        const meta = JSON.parse(await fs.readFile(path.join(this.directory, file), 'utf8')) as CacheEntryMeta;
+        index.set(file.replace(/\.meta\.json$/, ''), meta);
+      } catch {
+        // Ignore half-written or foreign files
+      }
+    }
+    return index;
+  }
+
+  private async readBody(id: string): Promise<any | undefined> {
+    try {
+      return JSON.parse(await fs.readFile(this.bodyPath(id), 'utf8'));
+    } catch {
+      return undefined;
+    }
+  }
+
+  private async writeMeta(id: string, meta: CacheEntryMeta): Promise<void> {
+    await writeAtomic(this.metaPath(id), JSON.stringify(meta));
+  }
+
+  private bodyPath(id: string): string {
+    return path.join(this.directory, `${id}.json`);
+  }
+
+  private metaPath(id: string): string {
+    return path.join(this.directory, `${id}.meta.json`);
+  }
+}
+
+function hashKey(key: string): string {
+  return createHash('sha256').update(key).digest('hex').substring(0, 32);
+}
+
+async function writeAtomic(file: string, contents: string): Promise<void> {
+  // Unique per write, so concurrent stores of the same key never share a temp file
+  const temp = `${file}.${process.pid}.${randomBytes(6).toString('hex')}.tmp`;
+  await fs.writeFile(temp, contents);
+  await fs.rename(temp, file);
+}
+
+// Shared cache for all event source connectors
+export const eventSourceCache = new HttpResponseCache(
+  process.env.EVENT_SOURCE_CACHE_DIR || path.join(os.tmpdir(), 'hotelcast-event-source-cache'),
+  process.env.EVENT_SOURCE_CACHE_MAX_MB ? parseInt(process.env.EVENT_SOURCE_CACHE_MAX_MB) * 1024 * 1024 : DEFAULT_MAX_BYTES
+);
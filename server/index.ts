@@ -1,6 +1,7 @@
 import express, { type Request, Response, NextFunction } from "express";
 import { registerRoutes } from "./routes";
 import { setupVite, serveStatic, log } from "./vite";
+import { searchRefreshScheduler } from "./search-refresh";
 
 const app = express();
 app.use(express.json());
@@ -67,5 +68,7 @@ app.use((req, res, next) => {
     reusePort: true,
   }, () => {
     log(`serving on port ${port}`);
+    // Keep saved event searches fresh in the background when EVENT_SEARCH_REFRESH_MINUTES is set
+    searchRefreshScheduler.start();
   });
 })();
@@ -0,0 +1,178 @@
+/**
+ * LLM Client - HTTP client for an Ollama-compatible backend
+ * Requests go over a keep-alive agent, so consecutive chat messages reuse warm
+ * connections to the model server instead of paying for a new connection (or
+ * a new process) each time. Connection, idle and total timeouts are
+ * configurable (streams are bounded by the idle timeout alone), and
+ * per-request latency and socket reuse are tracked so the effect can be
+ * measured. Point OLLAMA_URL at a local stub server to exercise it without a
+ * model.
+ */
+
+import http from 'http';
+import https from 'https';
+
+export interface LlmClientOptions {
+  maxSockets: number;
+  connectTimeoutMs: number; // to establish a connection
+  idleTimeoutMs: number; // max silence while waiting for the model
+  requestTimeoutMs: number; // whole request, including generation (not for streams)
+}
+
+export interface GenerateOptions {
+  system?: string;
+  signal?: AbortSignal;
+  temperature?: number;
+}
+
+export const DEFAULT_LLM_OPTIONS: LlmClientOptions = {
+  maxSockets: parseInt(process.env.OLLAMA_MAX_SOCKETS || '8'),
+  connectTimeoutMs: parseInt(process.env.OLLAMA_CONNECT_TIMEOUT_MS || '2000'),
+  idleTimeoutMs: parseInt(process.env.OLLAMA_IDLE_TIMEOUT_MS || '30000'),
+  requestTimeoutMs: parseInt(process.env.OLLAMA_TIMEOUT_MS || '45000'),
+};
+
+export class LlmClient {
+  private agent: http.Agent;
+  private transport: typeof http | typeof https;
+  private stats = { requests: 0, failures: 0, reusedSockets: 0, totalMs: 0 };
+
+  constructor(private baseUrl: string, private options: LlmClientOptions = DEFAULT_LLM_OPTIONS) {
+    const url = new URL(baseUrl);
+    this.transport = url.protocol === 'https:' ? https : http;
+    this.agent = new this.transport.Agent({ keepAlive: true, maxSockets: options.maxSockets });
+  }
+
+  /**
+   * Names of the models the backend has pulled
+   */
+  async listModels(timeoutMs: number = this.options.connectTimeoutMs): Promise<string[]> {
+    const body = await this.requestJson('GET', '/api/tags', undefined, AbortSignal.timeout(timeoutMs));
+    return (body.models || []).map((model: { name: string }) => model.name);
+  }
+
+  /**
+   * Generate a complete answer for `prompt`
+   */
+  async generate(model: string, prompt: string, options: GenerateOptions = {}): Promise<string> {
+    const body = await this.requestJson('POST', '/api/generate', {
+      model,
+      prompt,
+      system: options.system,
+      stream: false,
+      options: options.temperature !== undefined ? { temperature: options.temperature } : undefined,
+    }, options.signal);
+    return body.response || '';
+  }
+
+  /**
+   * Generate an answer token by token. The backend sends one JSON object per
+   * line; each chunk is yielded as soon as its line is complete. The body is
+   * read to its end so the connection can go back to the pool. Only the idle
+   * timeout applies: a long answer that keeps arriving is never cut off.
+   */
+  async *stream(model: string, prompt: string, options: GenerateOptions = {}): AsyncGenerator<string> {
+    const response = await this.request('POST', '/api/generate', {
+      model,
+      prompt,
+      system: options.system,
+      stream: true,
+      options: options.temperature !== undefined ? { temperature: options.temperature } : undefined,
+    }, options.signal, false);
+
+    let buffered = '';
+    response.setEncoding('utf8');
+    for await (const chunk of response) {
+      buffered += chunk;
+      const lines = buffered.split('\n');
+      buffered = lines.pop()!;
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const part = JSON.parse(line);
+        if (part.error) throw new Error(part.error);
+        if (part.response) yield part.response;
+      }
+    }
+    if (buffered.trim()) {
+      const part = JSON.parse(buffered);
+      if (part.response) yield part.response;
+    }
+  }
+
+  getStats() {
+    return {
+      ...this.stats,
+      averageMs: this.stats.requests > 0 ? Math.round((this.stats.totalMs * 10) / this.stats.requests) / 10 : 0,
+      socketReuseRatio: this.stats.requests > 0 ? this.stats.reusedSockets / this.stats.requests : 0,
+    };
+  }
+
+  private async requestJson(method: string, path: string, payload?: unknown, signal?: AbortSignal): Promise<any> {
+    const response = await this.request(method, path, payload, signal);
+    let text = '';
+    response.setEncoding('utf8');
+    for await (const chunk of response) text += chunk;
+    return text ? JSON.parse(text) : {};
+  }
+
+  /**
+   * Send a request over the pooled agent and resolve once the response
+   * headers arrive. Non-2xx responses are turned into errors. `limitTotal`
+   * applies requestTimeoutMs to the whole exchange, body included; streamed
+   * responses turn it off and rely on the idle timeout.
+   */
+  protected request(
+    method: string,
+    path: string,
+    payload?: unknown,
+    signal?: AbortSignal,
+    limitTotal: boolean = true
+  ): Promise<http.IncomingMessage> {
+    const started = Date.now();
+    const data = payload === undefined ? undefined : Buffer.from(JSON.stringify(payload));
+    const timeout = limitTotal ? AbortSignal.timeout(this.options.requestTimeoutMs) : undefined;
+    const combined = signal && timeout ? AbortSignal.any([signal, timeout]) : signal || timeout;
+
+    return new Promise((resolve, reject) => {
+      const req = this.transport.request(new URL(path, this.baseUrl), {
+        method,
+        agent: this.agent,
+        signal: combined,
+        headers: {
+          Accept: 'application/json',
+          ...(data ? { 'Content-Type': 'application/json', 'Content-Length': data.length } : {}),
+        },
+      });
+
+      // Destroying with an error surfaces it through the 'error' handler below
+      const fail = (error: Error) => req.destroy(error);
+
+      // Fresh sockets must connect in time; reused ones are already connected
+      req.on('socket', (socket) => {
+        if (req.reusedSocket) return;
+        const timer = setTimeout(() => fail(new Error('LLM backend connection timed out')), this.options.connectTimeoutMs);
+        socket.once('connect', () => clearTimeout(timer));
+        socket.once('close', () => clearTimeout(timer));
+      });
+      req.setTimeout(this.options.idleTimeoutMs, () => fail(new Error('LLM backend stopped responding')));
+
+      req.on('error', (error) => {
+        this.stats.failures++;
+        reject(error);
+      });
+      req.on('response', (response) => {
+        this.stats.requests++;
+        this.stats.totalMs += Date.now() - started;
+        if (req.reusedSocket) this.stats.reusedSockets++;
+
+        if (response.statusCode && response.statusCode >= 300) {
+          response.resume();
+          return reject(new Error(`LLM backend responded with ${response.statusCode}`));
+        }
+        resolve(response);
+      });
+
+      req.end(data);
+    });
+  }
+}
@@ -0,0 +1,196 @@
+/**
+ * Map Tiles - server-side clustering of hotels and events for the map view
+ * A viewport request is split into standard web map tiles (z/x/y) for its
+ * zoom level. Each tile is clustered on a small pixel grid straight from the
+ * spatial index, and finished tiles are cached against the index version, so
+ * panning over known tiles is a cache lookup and only newly exposed tiles are
+ * clustered. At street zoom the individual points are returned instead.
+ */
+
+import { spatialIndex, type GeoPoint, type GridIndex, type LoadedIndex } from './spatial-index';
+import type { Event, Hotel } from '@shared/schema';
+import type { MapExternalEvent } from './storage';
+
+const TILE_CLUSTER_CELLS = 4; // 64px cells on a 256px tile
+const MAX_ZOOM = 20;
+const POINT_ZOOM = 15; // from here on every point is returned on its own
+const MAX_TILES = 64;
+const MAX_CACHED_TILES = 5000;
+const MAX_LATITUDE = 85.05112878;
+
+export type MapLayer = 'hotels' | 'events' | 'externalEvents';
+export const MAP_LAYERS: MapLayer[] = ['hotels', 'events', 'externalEvents'];
+
+export interface MapCluster {
+  layer: MapLayer;
+  latitude: number;
+  longitude: number;
+  count: number;
+  // Set when the cluster is a single point
+  id?: string;
+  name?: string;
+  // Aggregates: rooms for hotels, expected attendees for events
+  rooms?: number;
+  attendees?: number;
+}
+
+export interface BoundingBox {
+  west: number;
+  south: number;
+  east: number;
+  north: number;
+}
+
+function tileX(longitude: number, zoom: number): number {
+  return ((longitude + 180) / 360) * 2 ** zoom;
+}
+
+function tileY(latitude: number, zoom: number): number {
+  const lat = (Math.max(-MAX_LATITUDE, Math.min(MAX_LATITUDE, latitude)) * Math.PI) / 180;
+  return ((1 - Math.log(Math.tan(lat) + 1 / Math.cos(lat)) / Math.PI) / 2) * 2 ** zoom;
+}
+
+function tileLongitude(x: number, zoom: number): number {
+  return (x / 2 ** zoom) * 360 - 180;
+}
+
+function tileLatitude(y: number, zoom: number): number {
+  return (Math.atan(Math.sinh(Math.PI * (1 - (2 * y) / 2 ** zoom))) * 180) / Math.PI;
+}
+
+interface Accumulator {
+  count: number;
+  latitude: number;
+  longitude: number;
+  rooms: number;
+  attendees: number;
+  first: { id: string; name: string };
+}
+
+export class MapTileService {
+  // Insertion-ordered map used as an LRU
+  private cache = new Map<string, MapCluster[]>();
+  private cacheVersion = '';
+
+  /**
+   * Clusters for every tile covering `bbox` at `zoom`
+   */
+  async getClusters(bbox: BoundingBox, zoom: number, layers: MapLayer[] = MAP_LAYERS): Promise<{ zoom: number; tiles: number; clusters: MapCluster[] }> {
+    const index = await spatialIndex.getIndex();
+    if (index.version !== this.cacheVersion) {
+      this.cache.clear();
+      this.cacheVersion = index.version;
+    }
+
+    // Very wide viewports are tiled at a coarser zoom to bound the work per request
+    let z = Math.max(0, Math.min(MAX_ZOOM, Math.floor(zoom)));
+    let range = this.tileRange(bbox, z);
+    while (z > 0 && range.count > MAX_TILES) {
+      z--;
+      range = this.tileRange(bbox, z);
+    }
+
+    const clusters: MapCluster[] = [];
+    for (const x of range.xs) {
+      for (let y = range.y0; y <= range.y1; y++) {
+        for (const layer of layers) {
+          clusters.push(...this.getTile(index, layer, z, x, y));
+        }
+      }
+    }
+    return { zoom: z, tiles: range.count, clusters };
+  }
+
+  private tileRange(bbox: BoundingBox, zoom: number) {
+    const n = 2 ** zoom;
+    const clampTile = (value: number) => Math.max(0, Math.min(n - 1, Math.floor(value)));
+    const x0 = clampTile(tileX(bbox.west, zoom));
+    const x1 = clampTile(tileX(bbox.east, zoom));
+    const y0 = clampTile(tileY(bbox.north, zoom));
+    const y1 = clampTile(tileY(bbox.south, zoom));
+
+    // A box crossing the antimeridian wraps around from the last column to the first
+    const xs: number[] = [];
+    for (let x = x0; xs.length < n; x = (x + 1) % n) {
+      xs.push(x);
+      if (x === x1) break;
+    }
+    return { xs, y0, y1, count: xs.length * (y1 - y0 + 1) };
+  }
+
+  private getTile(index: LoadedIndex, layer: MapLayer, z: number, x: number, y: number): MapCluster[] {
+    const key = `${layer}/${z}/${x}/${y}`;
+    let tile = this.cache.get(key);
+    if (tile) {
+      this.cache.delete(key);
+    } else {
+      tile = this.buildTile(index, layer, z, x, y);
+    }
+
+    this.cache.set(key, tile);
+    if (this.cache.size > MAX_CACHED_TILES) {
+      this.cache.delete(this.cache.keys().next().value!);
+    }
+    return tile;
+  }
+
+  private buildTile(index: LoadedIndex, layer: MapLayer, z: number, x: number, y: number): MapCluster[] {
+    const west = tileLongitude(x, z);
+    const east = tileLongitude(x + 1, z);
+    const north = tileLatitude(y, z);
+    const south = tileLatitude(y + 1, z);
+    const points = (index[layer] as GridIndex<Hotel | Event | MapExternalEvent>).inBox(south, west, north, east);
+
+    // Points on a shared edge belong to the tile to their east/south only
+    const inTile = (p: GeoPoint) =>
+      (p.longitude < east || x === 2 ** z - 1) && (p.latitude > south || y === 2 ** z - 1);
+
+    const cells = new Map<number, Accumulator>();
+    const pointsOnly = z >= POINT_ZOOM;
+
+    points.forEach((point, i) => {
+      if (!inTile(point)) return;
+      const cx = Math.min(TILE_CLUSTER_CELLS - 1, Math.floor((tileX(point.longitude, z) - x) * TILE_CLUSTER_CELLS));
+      const cy = Math.min(TILE_CLUSTER_CELLS - 1, Math.floor((tileY(point.latitude, z) - y) * TILE_CLUSTER_CELLS));
+      const cellKey = pointsOnly ? i : cy * TILE_CLUSTER_CELLS + cx;
+
+      const item = point.item as any;
+      let acc = cells.get(cellKey);
+      if (!acc) {
+        acc = {
+          count: 0,
+          latitude: 0,
+          longitude: 0,
+          rooms: 0,
+          attendees: 0,
+          first: { id: item.id, name: item.name ?? item.eventName },
+        };
+        cells.set(cellKey, acc);
+      }
+      acc.count++;
+      acc.latitude += point.latitude;
+      acc.longitude += point.longitude;
+      acc.rooms += item.totalRooms || 0;
+      acc.attendees += item.expectedAttendees || 0;
+    });
+
+    return Array.from(cells.values()).map(acc => {
+      const cluster: MapCluster = {
+        layer,
+        latitude: acc.latitude / acc.count,
+        longitude: acc.longitude / acc.count,
+        count: acc.count,
+      };
+      if (acc.count === 1) {
+        cluster.id = acc.first.id;
+        cluster.name = acc.first.name;
+      }
+      if (layer === 'hotels') cluster.rooms = acc.rooms;
+      if (layer === 'events') cluster.attendees = acc.attendees;
+      return cluster;
+    });
+  }
+}
+
+// Export singleton instance
+export const mapTileService = new MapTileService();
@@ -0,0 +1,43 @@
+/**
+ * Query Stream - server-side cursor reads for large result sets
+ * Rows are fetched in fixed-size batches from a DECLAREd cursor on a dedicated
+ * pooled connection, so memory stays bounded no matter how many rows match
+ * and the first batch is available as soon as Postgres produces it.
+ */
+
+import { pool } from './db';
+
+const DEFAULT_BATCH_SIZE = 2000;
+
+/**
+ * Yield rows of a parameterized query ($1, $2, ...) batch by batch.
+ * Breaking out of the loop closes the cursor and releases the connection.
+ */
+export async function* streamQuery<T = Record<string, unknown>>(
+  text: string,
+  values: unknown[] = [],
+  batchSize: number = DEFAULT_BATCH_SIZE
+): AsyncGenerator<T[]> {
+  const client = await pool.connect();
+  let open = false;
+
+  try {
+    await client.query('BEGIN READ ONLY');
+    open = true;
+    await client.query(`DECLARE export_cursor NO SCROLL CURSOR FOR ${text}`, values);
+
+    while (true) {
+      const result = await client.query(`FETCH ${batchSize} FROM export_cursor`);
+      if (result.rows.length > 0) yield result.rows as T[];
+      if (result.rows.length < batchSize) break;
+    }
+
+    await client.query('COMMIT');
+    open = false;
+  } finally {
+    if (open) {
+      await client.query('ROLLBACK').catch(() => undefined);
+    }
+    client.release();
+  }
+}
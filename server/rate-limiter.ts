@@ -0,0 +1,69 @@
+/**
+ * Rate Limiter - per-key token buckets shared by everything in the process
+ * Each external source gets a bucket refilled at its allowed requests per
+ * minute, so user searches and background refreshes draw from one budget and
+ * a provider's quota is never exceeded. Waiting callers are released in order
+ * and give up as soon as their AbortSignal fires.
+ */
+
+interface Bucket {
+  tokens: number;
+  updatedAt: number;
+  queue: Promise<void>;
+}
+
+export class RateLimiter {
+  private buckets = new Map<string, Bucket>();
+
+  /**
+   * Wait until `key` may make one more request at `perMinute` requests per
+   * minute, allowing short bursts of up to `burst` requests
+   */
+  acquire(key: string, perMinute: number, signal?: AbortSignal, burst: number = 1): Promise<void> {
+    let bucket = this.buckets.get(key);
+    if (!bucket) {
+      bucket = { tokens: burst, updatedAt: Date.now(), queue: Promise.resolve() };
+      this.buckets.set(key, bucket);
+    }
+
+    const b = bucket;
+    const take = async () => {
+      if (signal?.aborted) throw signal.reason;
+      const refill = () => {
+        const now = Date.now();
+        b.tokens = Math.min(burst, b.tokens + ((now - b.updatedAt) * perMinute) / 60000);
+        b.updatedAt = now;
+      };
+
+      refill();
+      while (b.tokens < 1) {
+        await sleep(Math.ceil(((1 - b.tokens) * 60000) / perMinute), signal);
+        refill();
+      }
+      b.tokens -= 1;
+    };
+
+    // Chain callers so they are served first come, first served
+    const turn = b.queue.then(take);
+    b.queue = turn.catch(() => undefined);
+    return turn;
+  }
+}
+
+export function sleep(ms: number, signal?: AbortSignal): Promise<void> {
+  return new Promise((resolve, reject) => {
+    if (signal?.aborted) return reject(signal.reason);
+    const onAbort = () => {
+      clearTimeout(timer);
+      reject(signal!.reason);
+    };
+    const timer = setTimeout(() => {
+      signal?.removeEventListener('abort', onAbort);
+      resolve();
+    }, ms);
+    signal?.addEventListener('abort', onAbort, { once: true });
+  });
+}
+
+// Shared limiter for external event sources
+export const sourceRateLimiter = new RateLimiter();
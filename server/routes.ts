@@ -1,5 +1,6 @@
 import type { Express } from "express";
 import { createServer, type Server } from "http";
+import { randomUUID } from "crypto";
 import cors from "cors";
 import { storage } from "./storage";
 import { setupAuth, requireAuth } from "./auth";
@@ -10,12 +11,19 @@ import {
   insertHotelActualSchema,
   insertTaskSchema,
   insertCommentSchema,
+  forecastSpreadSchema,
+  createForecastVersionSchema,
+  backtestParamsSchema,
+  scenarioSimulationSchema,
+  portfolioExportSchema,
+  mapClustersQuerySchema,
 } from "@shared/schema";
 import { z } from "zod";
 import { initializeTestData } from "./data-init";
 import multer from "multer";
 import * as XLSX from "xlsx";
-import { getCoordinatesForCity, addRandomOffset } from "./sample-coordinates";
+import { addRandomOffset } from "./sample-coordinates";
+import { conditionalGet } from "./change-tracker";
 
 export async function registerRoutes(app: Express): Promise<Server> {
   // CORS configuration
@@ -90,7 +98,9 @@ export async function registerRoutes(app: Express): Promise<Server> {
     }
   });
 
-  app.get('/api/dashboard/top-performers', requireAuth, async (req: any, res) => {
+  app.get('/api/dashboard/top-performers', requireAuth, conditionalGet(() => ({
+    tables: ['hotels', 'hotelActuals'],
+  })), async (req: any, res) => {
     try {
       const limit = parseInt(req.query.limit as string) || 4;
       const topPerformers = await storage.getTopPerformingHotels(limit);
@@ -143,7 +153,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
       if (city) {
         hotels = await storage.getHotelsByCity(city as string);
       } else {
-        hotels = await storage.getHotels('');
+        hotels = await storage.getAllHotels();
       }
       
       res.json(hotels);
@@ -167,6 +177,26 @@ export async function registerRoutes(app: Express): Promise<Server> {
     }
   });
 
+  app.get('/api/hotels/:id/nearby-events', requireAuth, async (req, res) => {
+    try {
+      const { spatialIndex, DEFAULT_RADIUS_KM } = await import('./spatial-index');
+      const radiusKm = parseFloat(req.query.radiusKm as string) || DEFAULT_RADIUS_KM;
+      const nearby = await spatialIndex.eventsNearHotel(
+        req.params.id,
+        radiusKm,
+        req.query.startDate as string | undefined,
+        req.query.endDate as string | undefined
+      );
+      if (!nearby) {
+        return res.status(404).json({ message: "Hotel not found or has no coordinates" });
+      }
+      res.json(nearby.map(({ item, distanceKm }) => ({ ...item, distanceKm: Math.round(distanceKm * 10) / 10 })));
+    } catch (error) {
+      console.error("Error fetching nearby events:", error);
+      res.status(500).json({ message: "Failed to fetch nearby events" });
+    }
+  });
+
   app.post('/api/hotels', requireAuth, async (req: any, res) => {
     try {
       const result = insertHotelSchema.safeParse(req.body);
@@ -179,6 +209,24 @@ export async function registerRoutes(app: Express): Promise<Server> {
         ownerId: 'demo-user', // Use demo user ID since we don't have auth
       };
 
+      // Resolve the address once on write so proximity queries never geocode
+      if (!hotelData.latitude || !hotelData.longitude) {
+        const { geocodingService } = await import('./geocoding');
+        const coords = await geocodingService.geocode({
+          address: hotelData.address,
+          city: hotelData.city,
+          state: hotelData.state,
+          country: hotelData.country,
+        }).catch((error) => {
+          console.warn("Geocoding hotel address failed:", error);
+          return null;
+        });
+        if (coords) {
+          hotelData.latitude = coords.latitude.toString();
+          hotelData.longitude = coords.longitude.toString();
+        }
+      }
+
       const hotel = await storage.createHotel(hotelData);
       res.status(201).json(hotel);
     } catch (error) {
@@ -268,6 +316,10 @@ export async function registerRoutes(app: Express): Promise<Server> {
       if (error instanceof z.ZodError) {
         return res.status(400).json({ message: "Invalid data", errors: error.errors });
       }
+      // Unique violation on (name, city, start date)
+      if ((error as any)?.code === '23505') {
+        return res.status(409).json({ message: "An event with this name, city and start date already exists" });
+      }
       console.error("Error creating event:", error);
       res.status(500).json({ message: "Failed to create event" });
     }
@@ -293,12 +345,16 @@ export async function registerRoutes(app: Express): Promise<Server> {
         searchName
       };
 
-      const foundEvents = await eventFinderService.searchEvents(searchParams);
+      const { events: foundEvents, sources, duplicates } = await eventFinderService.searchEventsWithReport(searchParams);
+      const search = await eventFinderService.saveSearch(searchParams, foundEvents, req.user?.id);
       
       const searchResult = {
+        searchId: search.id,
         searchParams,
         events: foundEvents,
+        sources,
         resultsCount: foundEvents.length,
+        duplicatesMerged: duplicates,
         timestamp: new Date().toISOString()
       };
 
@@ -309,6 +365,141 @@ export async function registerRoutes(app: Express): Promise<Server> {
     }
   });
 
+  app.get('/api/event-sources/cache-stats', requireAuth, async (req, res) => {
+    try {
+      const { eventSourceCache } = await import('./http-cache');
+      res.json(eventSourceCache.getStats());
+    } catch (error) {
+      console.error("Error fetching event source cache stats:", error);
+      res.status(500).json({ message: "Failed to fetch event source cache stats" });
+    }
+  });
+
+  app.get('/api/event-searches/:id/export', requireAuth, async (req: any, res) => {
+    try {
+      const format = (req.query.format as string | undefined) || 'xlsx';
+      if (format !== 'xlsx' && format !== 'csv') {
+        return res.status(400).json({ message: "Format must be xlsx or csv" });
+      }
+
+      const search = await storage.getEventSearch(req.params.id);
+      if (!search) {
+        return res.status(404).json({ message: "Event search not found" });
+      }
+
+      const { eventFinderService } = await import('./event-finder');
+      res.setHeader('Content-Disposition', `attachment; filename="event-search-${search.id}.${format}"`);
+      res.setHeader('Content-Type', format === 'csv'
+        ? 'text/csv; charset=utf-8'
+        : 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet');
+
+      try {
+        await eventFinderService.exportSearch(res, search, format, req.user.id);
+        res.end();
+      } catch (error) {
+        res.destroy(error as Error);
+        throw error;
+      }
+    } catch (error) {
+      console.error("Error exporting event search:", error);
+      if (!res.headersSent) {
+        res.status(500).json({ message: "Failed to export event search" });
+      }
+    }
+  });
+
+  // Saved search results are kept current by the background refresh, so this is a plain read
+  app.get('/api/event-searches/:id/results', requireAuth, async (req, res) => {
+    try {
+      const search = await storage.getEventSearch(req.params.id);
+      if (!search) {
+        return res.status(404).json({ message: "Event search not found" });
+      }
+
+      const events = await storage.getExternalEvents(search.id);
+      res.json({ search, events });
+    } catch (error) {
+      console.error("Error fetching event search results:", error);
+      res.status(500).json({ message: "Failed to fetch event search results" });
+    }
+  });
+
+  app.post('/api/event-searches/:id/refresh', requireAuth, async (req: any, res) => {
+    try {
+      const search = await storage.getEventSearch(req.params.id);
+      if (!search) {
+        return res.status(404).json({ message: "Event search not found" });
+      }
+
+      const { eventFinderService, INTERACTIVE_GEOCODE_DEADLINE_MS } = await import('./event-finder');
+      const result = await eventFinderService.refreshSearch(search, AbortSignal.timeout(INTERACTIVE_GEOCODE_DEADLINE_MS));
+      res.json({ searchId: search.id, ...result });
+    } catch (error) {
+      console.error("Error refreshing event search:", error);
+      res.status(500).json({ message: "Failed to refresh event search" });
+    }
+  });
+
+  app.post('/api/event-searches/:id/import', requireAuth, async (req: any, res) => {
+    try {
+      const { eventIds } = req.body || {};
+      if (eventIds !== undefined && (!Array.isArray(eventIds) || eventIds.some((id: unknown) => typeof id !== 'string'))) {
+        return res.status(400).json({ message: "eventIds must be an array of ids" });
+      }
+
+      const search = await storage.getEventSearch(req.params.id);
+      if (!search) {
+        return res.status(404).json({ message: "Event search not found" });
+      }
+
+      const { eventFinderService } = await import('./event-finder');
+      const result = await eventFinderService.importAllEvents(search.id, req.user.id, eventIds);
+      res.json(result);
+    } catch (error) {
+      console.error("Error importing event search results:", error);
+      res.status(500).json({ message: "Failed to import events" });
+    }
+  });
+
+  app.get('/api/events/:id/nearby-hotels', requireAuth, async (req, res) => {
+    try {
+      const { spatialIndex, DEFAULT_RADIUS_KM } = await import('./spatial-index');
+      const radiusKm = parseFloat(req.query.radiusKm as string) || DEFAULT_RADIUS_KM;
+      const nearby = await spatialIndex.hotelsNearEvent(req.params.id, radiusKm);
+      if (!nearby) {
+        return res.status(404).json({ message: "Event not found or has no coordinates" });
+      }
+      res.json(nearby.map(({ item, distanceKm }) => ({ ...item, distanceKm: Math.round(distanceKm * 10) / 10 })));
+    } catch (error) {
+      console.error("Error fetching nearby hotels:", error);
+      res.status(500).json({ message: "Failed to fetch nearby hotels" });
+    }
+  });
+
+  // Precomputed event forecast suggestions from the uplift model
+  app.get('/api/events/:id/forecast-suggestions', async (req, res) => {
+    try {
+      const { id } = req.params;
+      const { hotelId } = req.query;
+      const suggestions = await storage.getEventForecastSuggestions(id, hotelId as string | undefined);
+      res.json(suggestions);
+    } catch (error) {
+      console.error("Error fetching event forecast suggestions:", error);
+      res.status(500).json({ message: "Failed to fetch event forecast suggestions" });
+    }
+  });
+
+  app.post('/api/event-uplift/train', requireAuth, async (req, res) => {
+    try {
+      const { eventUpliftModel } = await import('./event-uplift');
+      const result = await eventUpliftModel.train({ full: req.body?.full === true });
+      res.json(result);
+    } catch (error) {
+      console.error("Error training event uplift model:", error);
+      res.status(500).json({ message: "Failed to train event uplift model" });
+    }
+  });
+
   // Event management routes 
   app.get('/api/events/:id', async (req: any, res) => {
     try {
@@ -340,6 +531,10 @@ export async function registerRoutes(app: Express): Promise<Server> {
       if (error instanceof z.ZodError) {
         return res.status(400).json({ message: "Invalid data", errors: error.errors });
       }
+      // Unique violation on (name, city, start date)
+      if ((error as any)?.code === '23505') {
+        return res.status(409).json({ message: "An event with this name, city and start date already exists" });
+      }
       console.error("Error updating event:", error);
       res.status(500).json({ message: "Failed to update event" });
     }
@@ -375,28 +570,16 @@ export async function registerRoutes(app: Express): Promise<Server> {
       };
 
       const foundEvents = await eventFinderService.searchEvents(searchParams);
-      
-      // Store found events in database
-      let savedCount = 0;
-      for (const eventData of foundEvents) {
-        try {
-          const existingEvent = await storage.getEventByNameAndDate(eventData.name, eventData.startDate);
-          if (!existingEvent) {
-            await storage.createEvent({
-              ...eventData,
-              createdBy: req.user.id,
-              scrapedAt: new Date().toISOString(),
-            });
-            savedCount++;
-          }
-        } catch (error) {
-          console.error("Error saving event:", error);
-        }
-      }
+
+      // Store found events in database with one bulk import
+      const search = await eventFinderService.saveSearch(searchParams, foundEvents, req.user.id);
+      const result = await eventFinderService.importAllEvents(search.id, req.user.id);
 
       res.json({ 
         eventsFound: foundEvents.length,
-        eventsSaved: savedCount,
+        eventsSaved: result.imported,
+        duplicates: result.duplicates,
+        searchId: search.id,
         city 
       });
     } catch (error) {
@@ -537,19 +720,157 @@ export async function registerRoutes(app: Express): Promise<Server> {
     }
   });
 
+  app.get('/api/hotels/:id/event-forecasts/export', requireAuth, async (req, res) => {
+    try {
+      const hotel = await storage.getHotel(req.params.id);
+      if (!hotel) {
+        return res.status(404).json({ message: "Hotel not found" });
+      }
+
+      const isoDate = z.string().regex(/^\d{4}-\d{2}-\d{2}$/, "Date must be formatted as YYYY-MM-DD");
+      const { startDate, endDate } = z.object({
+        startDate: isoDate.optional(),
+        endDate: isoDate.optional(),
+      }).parse(req.query);
+
+      const { sendCsv } = await import('./csv-stream');
+      await sendCsv(res, `event-forecasts-${hotel.id}.csv`, [
+        { header: 'Event Name', value: row => row.eventName },
+        { header: 'Category', value: row => row.category },
+        { header: 'City', value: row => row.city },
+        { header: 'Event Start', value: row => row.startDate },
+        { header: 'Event End', value: row => row.endDate },
+        { header: 'Date', value: row => row.forecastDate },
+        { header: 'Event Day', value: row => row.eventDay },
+        { header: 'Occupancy Rate', value: row => row.occupancyRate },
+        { header: 'Average Daily Rate', value: row => row.averageDailyRate },
+        { header: 'Revenue', value: row => row.revenue },
+        { header: 'Room Nights', value: row => row.roomNights },
+        { header: 'Confidence', value: row => row.confidence },
+        { header: 'Notes', value: row => row.notes },
+      ], storage.streamEventForecastExport(hotel.id, startDate, endDate));
+    } catch (error) {
+      if (error instanceof z.ZodError) {
+        return res.status(400).json({ message: "Invalid data", errors: error.errors });
+      }
+      console.error("Error exporting event forecasts:", error);
+      if (!res.headersSent) {
+        res.status(500).json({ message: "Failed to export event forecasts" });
+      }
+    }
+  });
+
+  // Monthly forecast entry templates (default: next month)
+  const templateMonth = (value: unknown): string | null => {
+    if (value === undefined) {
+      const now = new Date();
+      const next = new Date(Date.UTC(now.getUTCFullYear(), now.getUTCMonth() + 1, 1));
+      return next.toISOString().substring(0, 7);
+    }
+    return typeof value === 'string' && /^\d{4}-(0[1-9]|1[0-2])$/.test(value) ? value : null;
+  };
+
+  app.get('/api/hotels/:id/templates/monthly', requireAuth, async (req, res) => {
+    try {
+      const month = templateMonth(req.query.month);
+      if (!month) {
+        return res.status(400).json({ message: "Month must be formatted as YYYY-MM" });
+      }
+
+      const hotel = await storage.getHotel(req.params.id);
+      if (!hotel) {
+        return res.status(404).json({ message: "Hotel not found" });
+      }
+
+      const { forecastTemplateService } = await import('./forecast-templates');
+      const template = await forecastTemplateService.getMonthlyTemplate(hotel, month);
+
+      res.setHeader('Content-Disposition', `attachment; filename="${template.filename}"`);
+      res.setHeader('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet');
+      res.send(template.buffer);
+    } catch (error) {
+      console.error("Error generating monthly template:", error);
+      res.status(500).json({ message: "Failed to generate monthly template" });
+    }
+  });
+
+  app.get('/api/templates/monthly', requireAuth, async (req: any, res) => {
+    try {
+      const month = templateMonth(req.query.month);
+      if (!month) {
+        return res.status(400).json({ message: "Month must be formatted as YYYY-MM" });
+      }
+
+      const hotels = await storage.getHotels(req.user.id);
+      const { forecastTemplateService } = await import('./forecast-templates');
+
+      res.setHeader('Content-Disposition', `attachment; filename="forecast-templates-${month}.zip"`);
+      res.setHeader('Content-Type', 'application/zip');
+      try {
+        await forecastTemplateService.writeMonthlyTemplatesZip(res, hotels, month);
+        res.end();
+      } catch (error) {
+        res.destroy(error as Error);
+        throw error;
+      }
+    } catch (error) {
+      console.error("Error generating monthly templates:", error);
+      if (!res.headersSent) {
+        res.status(500).json({ message: "Failed to generate monthly templates" });
+      }
+    }
+  });
+
+  app.get('/api/exports/portfolio', requireAuth, async (req, res) => {
+    try {
+      const filters = portfolioExportSchema.parse(req.query);
+
+      // Pass back as updatedSince on the next sync to fetch only changed rows
+      const { writePortfolioExport, nextExportWatermark, EXPORT_CONTENT_TYPES } = await import('./portfolio-export');
+      const watermark = await nextExportWatermark();
+      res.setHeader('Content-Type', EXPORT_CONTENT_TYPES[filters.format]);
+      res.setHeader('Content-Disposition', `attachment; filename="${filters.dataset}.${filters.format}"`);
+      res.setHeader('X-Export-Watermark', watermark.toISOString());
+
+      try {
+        await writePortfolioExport(res, filters);
+        res.end();
+      } catch (error) {
+        res.destroy(error as Error);
+        throw error;
+      }
+    } catch (error) {
+      if (error instanceof z.ZodError) {
+        return res.status(400).json({ message: "Invalid data", errors: error.errors });
+      }
+      console.error("Error exporting portfolio data:", error);
+      if (!res.headersSent) {
+        res.status(500).json({ message: "Failed to export portfolio data" });
+      }
+    }
+  });
+
   // Forecast routes
-  app.get('/api/forecasts', async (req, res) => {
+  // Each forecast carries the system baseline for the same hotel and day
+  app.get('/api/forecasts', conditionalGet(req => ({
+    tables: ['forecasts', 'systemForecasts'],
+    hotelId: req.query.hotelId as string | undefined,
+  })), async (req, res) => {
     try {
       const { hotelId } = req.query;
       const forecasts = await storage.getForecasts(hotelId as string);
-      res.json(forecasts);
+      const { baselineForecastEngine } = await import('./baseline-forecast');
+      res.json(await baselineForecastEngine.withBaselines(forecasts));
     } catch (error) {
       console.error("Error fetching forecasts:", error);
       res.status(500).json({ message: "Failed to fetch forecasts" });
     }
   });
 
-  app.get('/api/forecasts/date-range', async (req, res) => {
+  app.get('/api/forecasts/date-range', conditionalGet(req => ({
+    tables: ['forecasts', 'systemForecasts'],
+    hotelId: req.query.hotelId as string | undefined,
+  })), async (req, res) => {
     try {
       const { hotelId, startDate, endDate } = req.query;
       
@@ -562,7 +883,8 @@ export async function registerRoutes(app: Express): Promise<Server> {
         new Date(startDate as string),
         new Date(endDate as string)
       );
-      res.json(forecasts);
+      const { baselineForecastEngine } = await import('./baseline-forecast');
+      res.json(await baselineForecastEngine.withBaselines(forecasts));
     } catch (error) {
       console.error("Error fetching forecasts by date range:", error);
       res.status(500).json({ message: "Failed to fetch forecasts" });
@@ -587,8 +909,216 @@ export async function registerRoutes(app: Express): Promise<Server> {
     }
   });
 
+  // Spread monthly targets into daily forecasts
+  app.post('/api/forecasts/spread', requireAuth, async (req: any, res) => {
+    try {
+      const { targets, dryRun } = forecastSpreadSchema.parse(req.body);
+
+      const { forecastSpreadingEngine } = await import('./forecast-spreading');
+      const result = await forecastSpreadingEngine.spread(targets, {
+        dryRun,
+        userId: req.user.id,
+      });
+
+      res.json(result);
+    } catch (error) {
+      if (error instanceof z.ZodError) {
+        return res.status(400).json({ message: "Invalid data", errors: error.errors });
+      }
+      console.error("Error spreading forecasts:", error);
+      res.status(500).json({ message: "Failed to spread forecasts" });
+    }
+  });
+
+  // System (baseline) forecast routes
+  app.get('/api/system-forecasts', conditionalGet(req => ({
+    tables: ['systemForecasts'],
+    hotelId: req.query.hotelId as string | undefined,
+  })), async (req, res) => {
+    try {
+      const { hotelId, startDate, endDate, method } = req.query;
+
+      if (!hotelId || !startDate || !endDate) {
+        return res.status(400).json({ message: "hotelId, startDate, and endDate are required" });
+      }
+
+      const systemForecasts = await storage.getSystemForecasts(
+        hotelId as string,
+        startDate as string,
+        endDate as string,
+        (method as string) || 'baseline'
+      );
+      res.json(systemForecasts);
+    } catch (error) {
+      console.error("Error fetching system forecasts:", error);
+      res.status(500).json({ message: "Failed to fetch system forecasts" });
+    }
+  });
+
+  app.post('/api/system-forecasts/refresh', requireAuth, async (req, res) => {
+    try {
+      const { horizonDays } = z.object({
+        horizonDays: z.coerce.number().int().min(1).max(730).optional(),
+      }).parse(req.body ?? {});
+
+      const { baselineForecastEngine } = await import('./baseline-forecast');
+      if (baselineForecastEngine.isRefreshing) {
+        return res.status(409).json({ message: "A baseline refresh is already running" });
+      }
+      const result = await baselineForecastEngine.refresh({ horizonDays });
+
+      res.json(result);
+    } catch (error) {
+      if (error instanceof z.ZodError) {
+        return res.status(400).json({ message: "Invalid data", errors: error.errors });
+      }
+      console.error("Error refreshing baseline forecasts:", error);
+      res.status(500).json({ message: "Failed to refresh baseline forecasts" });
+    }
+  });
+
+  app.get('/api/analytics/forecast-accuracy', requireAuth, conditionalGet(req => ({
+    tables: ['forecasts', 'systemForecasts', 'hotelActuals'],
+    hotelId: req.query.hotelId as string | undefined,
+  })), async (req, res) => {
+    try {
+      const { hotelId, startDate, endDate } = req.query;
+
+      if (!hotelId || !startDate || !endDate) {
+        return res.status(400).json({ message: "hotelId, startDate, and endDate are required" });
+      }
+
+      const { getForecastAccuracy } = await import('./forecast-accuracy');
+      const accuracy = await getForecastAccuracy(hotelId as string, startDate as string, endDate as string);
+      res.json(accuracy);
+    } catch (error) {
+      console.error("Error computing forecast accuracy:", error);
+      res.status(500).json({ message: "Failed to compute forecast accuracy" });
+    }
+  });
+
+  // What-if scenario routes
+  app.post('/api/scenarios/simulate', requireAuth, async (req, res) => {
+    try {
+      const scenario = scenarioSimulationSchema.parse(req.body);
+
+      const { scenarioSimulator } = await import('./scenario-simulator');
+      const result = await scenarioSimulator.simulate(scenario);
+
+      res.json(result);
+    } catch (error) {
+      if (error instanceof z.ZodError) {
+        return res.status(400).json({ message: "Invalid data", errors: error.errors });
+      }
+      console.error("Error simulating scenario:", error);
+      res.status(500).json({ message: "Failed to simulate scenario" });
+    }
+  });
+
+  // Backtest routes
+  app.post('/api/backtests', requireAuth, async (req: any, res) => {
+    try {
+      const params = backtestParamsSchema.parse(req.body);
+
+      if (params.endDate < params.startDate) {
+        return res.status(400).json({ message: "endDate must not be before startDate" });
+      }
+
+      const { backtestService } = await import('./backtest');
+      const run = await backtestService.start(params, req.user.id);
+      res.status(202).json(run);
+    } catch (error) {
+      if (error instanceof z.ZodError) {
+        return res.status(400).json({ message: "Invalid data", errors: error.errors });
+      }
+      console.error("Error starting backtest:", error);
+      res.status(500).json({ message: "Failed to start backtest" });
+    }
+  });
+
+  app.get('/api/backtests/:id', requireAuth, async (req, res) => {
+    try {
+      const run = await storage.getBacktestRun(req.params.id);
+      if (!run) {
+        return res.status(404).json({ message: "Backtest not found" });
+      }
+
+      const results = await storage.getBacktestResults(run.id);
+      res.json({ ...run, results });
+    } catch (error) {
+      console.error("Error fetching backtest:", error);
+      res.status(500).json({ message: "Failed to fetch backtest" });
+    }
+  });
+
+  // Forecast version routes
+  app.get('/api/forecast-versions', requireAuth, async (req, res) => {
+    try {
+      const { hotelId } = req.query;
+      const versions = await storage.getForecastVersions(hotelId as string | undefined);
+      res.json(versions);
+    } catch (error) {
+      console.error("Error fetching forecast versions:", error);
+      res.status(500).json({ message: "Failed to fetch forecast versions" });
+    }
+  });
+
+  app.post('/api/forecast-versions', requireAuth, async (req: any, res) => {
+    try {
+      const { name, hotelId } = createForecastVersionSchema.parse(req.body);
+
+      const { forecastVersioningService } = await import('./forecast-versioning');
+      const version = await forecastVersioningService.captureVersion(name, hotelId || null, req.user.id);
+
+      res.status(201).json(version);
+    } catch (error) {
+      if (error instanceof z.ZodError) {
+        return res.status(400).json({ message: "Invalid data", errors: error.errors });
+      }
+      console.error("Error capturing forecast version:", error);
+      res.status(500).json({ message: "Failed to capture forecast version" });
+    }
+  });
+
+  app.get('/api/forecast-versions/:id/diff', requireAuth, async (req, res) => {
+    try {
+      const { id } = req.params;
+      const against = (req.query.against as string) || 'live';
+      const limit = parseInt(req.query.limit as string) || 500;
+
+      const { forecastVersioningService } = await import('./forecast-versioning');
+      const diff = await forecastVersioningService.diff(id, against, limit);
+      if (!diff) {
+        return res.status(404).json({ message: "Forecast version not found" });
+      }
+      res.json(diff);
+    } catch (error) {
+      console.error("Error diffing forecast versions:", error);
+      res.status(500).json({ message: "Failed to diff forecast versions" });
+    }
+  });
+
+  app.post('/api/forecast-versions/:id/restore', requireAuth, async (req: any, res) => {
+    try {
+      const { id } = req.params;
+
+      const { forecastVersioningService } = await import('./forecast-versioning');
+      const result = await forecastVersioningService.restoreVersion(id, req.user.id);
+      if (!result) {
+        return res.status(404).json({ message: "Forecast version not found" });
+      }
+      res.json(result);
+    } catch (error) {
+      console.error("Error restoring forecast version:", error);
+      res.status(500).json({ message: "Failed to restore forecast version" });
+    }
+  });
+
   // Hotel actuals routes
-  app.get('/api/hotel-actuals/:hotelId', async (req, res) => {
+  app.get('/api/hotel-actuals/:hotelId', conditionalGet(req => ({
+    tables: ['hotelActuals'],
+    hotelId: req.params.hotelId,
+  })), async (req, res) => {
     try {
       const { hotelId } = req.params;
       const { startDate, endDate } = req.query;
@@ -618,6 +1148,11 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       const createdActuals = await storage.createHotelActuals(validatedActuals);
 
+      // New actuals feed the event uplift model; training runs in the background
+      import('./event-uplift')
+        .then(({ eventUpliftModel }) => eventUpliftModel.train())
+        .catch(error => console.error("Error updating event uplift model:", error));
+
       res.status(201).json(createdActuals);
     } catch (error) {
       if (error instanceof z.ZodError) {
@@ -628,7 +1163,10 @@ export async function registerRoutes(app: Express): Promise<Server> {
     }
   });
 
-  app.get('/api/hotel-actuals/:hotelId/kpis', async (req, res) => {
+  app.get('/api/hotel-actuals/:hotelId/kpis', conditionalGet(req => ({
+    tables: ['hotelActuals'],
+    hotelId: req.params.hotelId,
+  })), async (req, res) => {
     try {
       const { hotelId } = req.params;
       const kpis = await storage.getHotelPerformanceKPIs(hotelId);
@@ -775,6 +1313,17 @@ export async function registerRoutes(app: Express): Promise<Server> {
     }
   });
 
+  // Chat readiness: answers immediately with the model status last seen by the health probe
+  app.get('/api/ai-chat/status', async (req, res) => {
+    try {
+      const { hotelChatAssistant } = await import('./ai-chat');
+      res.json({ ready: true, llm: hotelChatAssistant.getStatus() });
+    } catch (error) {
+      console.error("Error fetching AI chat status:", error);
+      res.status(500).json({ message: "Failed to fetch AI chat status" });
+    }
+  });
+
   // AI Chat route with real functionality
   app.post('/api/ai-chat', async (req: any, res) => {
     try {
@@ -804,41 +1353,159 @@ export async function registerRoutes(app: Express): Promise<Server> {
     }
   });
 
+  // Streamed AI chat: tokens are relayed as Server-Sent Events while the model
+  // generates, and the finished exchange is saved to the conversation
+  app.post('/api/ai-chat/stream', requireAuth, async (req: any, res) => {
+    const { message } = req.body;
+    if (!message || typeof message !== 'string') {
+      return res.status(400).json({ message: "Message is required" });
+    }
+
+    // Conversation ids are issued here; a client may only continue one of its own
+    let conversationId: string = randomUUID();
+    if (typeof req.body.conversationId === 'string' && req.body.conversationId) {
+      try {
+        const existing = await storage.getChatMessages(req.body.conversationId, req.user.id, 1);
+        if (existing.length === 0) {
+          return res.status(404).json({ message: "Conversation not found" });
+        }
+        conversationId = req.body.conversationId;
+      } catch (error) {
+        console.error("Error fetching AI chat conversation:", error);
+        return res.status(500).json({ message: "Failed to process AI chat" });
+      }
+    }
+
+    // Stop generating if the client goes away
+    const abort = new AbortController();
+    res.on('close', () => {
+      if (!res.writableEnded) abort.abort();
+    });
+
+    res.writeHead(200, {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache',
+      'Connection': 'keep-alive',
+      'X-Accel-Buffering': 'no',
+    });
+    const send = (event: string, data: unknown) => res.write(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`);
+    // Comment lines keep proxies from timing out while the model loads
+    const heartbeat = setInterval(() => res.write(': keep-alive\n\n'), 15000);
+
+    try {
+      const { hotelChatAssistant } = await import('./ai-chat');
+      send('start', { conversationId });
+
+      const startTime = Date.now();
+      const { response, answeredBy } = await hotelChatAssistant.streamMessage(
+        message,
+        (token) => send('token', { token }),
+        abort.signal
+      );
+      const processingTime = Date.now() - startTime;
+
+      const saved = await storage.createChatMessage({
+        conversationId,
+        userId: req.user.id,
+        message,
+        response,
+        answeredBy,
+        processingTime,
+      });
+      send('done', {
+        id: saved.id,
+        conversationId,
+        message: response,
+        timestamp: saved.createdAt,
+        processingTime,
+      });
+    } catch (error) {
+      if (!abort.signal.aborted) {
+        console.error("Error streaming AI chat:", error);
+        send('error', { message: "Failed to process AI chat" });
+      }
+    } finally {
+      clearInterval(heartbeat);
+      res.end();
+    }
+  });
+
+  // Saved exchanges of one of the user's AI chat conversations, oldest first
+  app.get('/api/ai-chat/conversations/:id', requireAuth, async (req: any, res) => {
+    try {
+      const messages = await storage.getChatMessages(req.params.id, req.user.id);
+      res.json(messages.map(m => ({
+        id: m.id,
+        message: m.message,
+        response: m.response,
+        timestamp: m.createdAt,
+        processingTime: m.processingTime,
+      })));
+    } catch (error) {
+      console.error("Error fetching AI chat conversation:", error);
+      res.status(500).json({ message: "Failed to fetch AI chat conversation" });
+    }
+  });
+
+  // Clustered hotels and events for the map viewport
+  app.get('/api/map/clusters', requireAuth, conditionalGet(() => ({
+    tables: ['hotels', 'events', 'externalEvents'],
+  })), async (req, res) => {
+    try {
+      const { bbox, zoom, layers } = mapClustersQuerySchema.parse(req.query);
+      const { mapTileService } = await import('./map-tiles');
+      res.json(await mapTileService.getClusters(bbox, zoom, layers));
+    } catch (error) {
+      if (error instanceof z.ZodError) {
+        return res.status(400).json({ message: "Invalid data", errors: error.errors });
+      }
+      console.error("Error fetching map clusters:", error);
+      res.status(500).json({ message: "Failed to fetch map clusters" });
+    }
+  });
+
   // Populate coordinates for existing hotels and events
   app.post('/api/populate-coordinates', async (req, res) => {
     try {
+      const { geocodingService } = await import('./geocoding');
       let hotelUpdates = 0;
       let eventUpdates = 0;
 
-      // Update hotels with coordinates
-      const hotels = await storage.getAllHotels();
-      for (const hotel of hotels) {
-        if (!hotel.latitude || !hotel.longitude) {
-          const coords = getCoordinatesForCity(hotel.city || '');
-          if (coords) {
-            const offsetCoords = addRandomOffset(coords.latitude, coords.longitude);
-            await storage.updateHotel(hotel.id, {
-              latitude: offsetCoords.latitude.toString(),
-              longitude: offsetCoords.longitude.toString()
-            });
-            hotelUpdates++;
-          }
+      // City-level matches get a small offset so markers don't sit exactly on top of each other
+      const place = (result: { latitude: number; longitude: number; precision: string }) => {
+        const coords = result.precision === 'city' ? addRandomOffset(result.latitude, result.longitude) : result;
+        return { latitude: coords.latitude.toString(), longitude: coords.longitude.toString() };
+      };
+
+      // Update hotels with coordinates, geocoding all addresses in one batch
+      const hotels = (await storage.getAllHotels()).filter(hotel => !hotel.latitude || !hotel.longitude);
+      const hotelResults = await geocodingService.geocodeMany(hotels.map(hotel => ({
+        address: hotel.address,
+        city: hotel.city,
+        state: hotel.state,
+        country: hotel.country,
+      })));
+      for (const [i, hotel] of Array.from(hotels.entries())) {
+        const result = hotelResults[i];
+        if (result) {
+          await storage.updateHotel(hotel.id, place(result));
+          hotelUpdates++;
         }
       }
 
       // Update events with coordinates
-      const events = await storage.getAllEvents();
-      for (const event of events) {
-        if (!event.latitude || !event.longitude) {
-          const coords = getCoordinatesForCity(event.city || '');
-          if (coords) {
-            const offsetCoords = addRandomOffset(coords.latitude, coords.longitude);
-            await storage.updateEvent(event.id, {
-              latitude: offsetCoords.latitude.toString(),
-              longitude: offsetCoords.longitude.toString()
-            });
-            eventUpdates++;
-          }
+      const events = (await storage.getAllEvents()).filter(event => !event.latitude || !event.longitude);
+      const eventResults = await geocodingService.geocodeMany(events.map(event => ({
+        address: event.location,
+        city: event.city,
+        state: event.state,
+        country: event.country,
+      })));
+      for (const [i, event] of Array.from(events.entries())) {
+        const result = eventResults[i];
+        if (result) {
+          await storage.updateEvent(event.id, place(result));
+          eventUpdates++;
         }
       }
 
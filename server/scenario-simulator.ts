@@ -0,0 +1,444 @@
+/**
+ * Scenario Simulator - Monte Carlo what-if analysis on top of forecasts
+ * The forecast for every hotel-day (user forecast, else system baseline, else
+ * same weekday last year) is shocked by the scenario and rolled up to one
+ * total per hotel. Each draw then perturbs every hotel with log-normal
+ * occupancy and ADR errors whose spread is measured from how far past monthly
+ * forecasts missed actuals, with a shared market component so hotels do not
+ * miss independently. Results are percentile bands for the portfolio and for
+ * each city.
+ */
+
+import { storage } from './storage';
+import type { Forecast, Hotel, HotelActual, ScenarioShock, ScenarioSimulation, SystemForecast } from '@shared/schema';
+import { addDays, daysBetween, toISODate } from './date-utils';
+import { latestUserForecastByDate } from './forecast-accuracy';
+
+const ERROR_LOOKBACK_DAYS = 365;
+const MIN_ERROR_MONTHS = 3; // hotel-specific spread needs this many scored months
+const DEFAULT_OCCUPANCY_SIGMA = 0.08;
+const DEFAULT_ADR_SIGMA = 0.05;
+const DEFAULT_MARKET_CORRELATION = 0.5;
+const PERCENTILES = [5, 10, 25, 50, 75, 90, 95];
+
+type Band = Record<string, number>;
+
+interface ErrorModel {
+  occupancySigma: Float64Array; // per hotel, log scale
+  adrSigma: Float64Array;
+  pooledOccupancySigma: number;
+  pooledAdrSigma: number;
+  occupancyCorrelation: number;
+  adrCorrelation: number;
+}
+
+export class ScenarioSimulator {
+  /**
+   * Run the scenario and return percentile bands for revenue, ADR and room nights
+   */
+  async simulate(scenario: ScenarioSimulation) {
+    const started = Date.now();
+    const { startDate, endDate } = scenario;
+    const today = toISODate(new Date());
+
+    const hotelList = scenario.hotelIds?.length
+      ? await storage.getHotelsByIds(scenario.hotelIds)
+      : scenario.cities?.length
+        ? await storage.getHotelsByCities(scenario.cities)
+        : await storage.getAllHotels();
+    const hotelIds = hotelList.map(h => h.id);
+
+    const historyStart = addDays(today, -ERROR_LOOKBACK_DAYS);
+    const yesterday = addDays(today, -1);
+    const [userForecasts, baselines, stly, pastActuals, pastUserForecasts, pastBaselines] = await Promise.all([
+      storage.getForecastsForHotelsInRange(hotelIds, startDate, endDate),
+      storage.getSystemForecastsForHotels(hotelIds, startDate, endDate),
+      storage.getHotelActualsForHotels(hotelIds, addDays(startDate, -364), addDays(endDate, -364)),
+      storage.getHotelActualsForHotels(hotelIds, historyStart, yesterday),
+      storage.getForecastsForHotelsInRange(hotelIds, historyStart, yesterday),
+      storage.getSystemForecastsForHotels(hotelIds, historyStart, yesterday),
+    ]);
+
+    // Dense daily [hotel x day] forecast: user forecast > baseline > STLY
+    const H = hotelIds.length;
+    const D = daysBetween(startDate, endDate) + 1;
+    const hotelRow = new Map(hotelIds.map((id, i) => [id, i]));
+    const occ = new Float64Array(H * D).fill(NaN);
+    const adr = new Float64Array(H * D).fill(NaN);
+    const source = new Uint8Array(H * D); // 0 none, 1 stly, 2 baseline, 3 user
+
+    const fill = (hotelId: string, d: number, occupancy: unknown, rate: unknown, level: number) => {
+      const h = hotelRow.get(hotelId);
+      if (h === undefined || d < 0 || d >= D) return;
+      const o = toNumber(occupancy);
+      const a = toNumber(rate);
+      if (Number.isNaN(o) || Number.isNaN(a)) return;
+      occ[h * D + d] = o;
+      adr[h * D + d] = a;
+      source[h * D + d] = level;
+    };
+
+    for (const actual of stly) {
+      fill(actual.hotelId, daysBetween(startDate, actual.actualDate) + 364, actual.occupancyRate, actual.averageDailyRate, 1);
+    }
+    for (const baseline of baselines) {
+      fill(baseline.hotelId, daysBetween(startDate, baseline.forecastDate), baseline.occupancyRate, baseline.averageDailyRate, 2);
+    }
+    groupByHotel(userForecasts).forEach((list, hotelId) => {
+      latestUserForecastByDate(list).forEach((forecast, date) => {
+        fill(hotelId, daysBetween(startDate, date), forecast.occupancyRate, forecast.averageDailyRate, 3);
+      });
+    });
+
+    const sources = { user: 0, baseline: 0, stly: 0, missing: 0 };
+    for (let i = 0; i < source.length; i++) {
+      if (source[i] === 3) sources.user++;
+      else if (source[i] === 2) sources.baseline++;
+      else if (source[i] === 1) sources.stly++;
+      else sources.missing++;
+    }
+
+    const shockedOcc = occ.slice();
+    const shockedAdr = adr.slice();
+    await this.applyShocks(scenario.shocks, hotelList, startDate, D, shockedOcc, shockedAdr);
+
+    // Roll up to one total per hotel
+    const rooms = hotelList.map(h => h.totalRooms || 0);
+    const hotelRoomNights = new Float64Array(H);
+    const hotelRevenue = new Float64Array(H);
+    const hotelCapacity = new Float64Array(H);
+    const expected = { roomNights: 0, revenue: 0, scenarioRoomNights: 0, scenarioRevenue: 0 };
+
+    for (let h = 0; h < H; h++) {
+      if (rooms[h] <= 0) continue;
+      for (let d = 0; d < D; d++) {
+        const i = h * D + d;
+        if (Number.isNaN(occ[i])) continue;
+        const baseRoomNights = (Math.min(100, Math.max(0, occ[i])) / 100) * rooms[h];
+        const roomNights = (Math.min(100, Math.max(0, shockedOcc[i])) / 100) * rooms[h];
+        const rate = Math.max(0, shockedAdr[i]);
+
+        hotelRoomNights[h] += roomNights;
+        hotelRevenue[h] += roomNights * rate;
+        hotelCapacity[h] += rooms[h];
+        expected.roomNights += baseRoomNights;
+        expected.revenue += baseRoomNights * Math.max(0, adr[i]);
+        expected.scenarioRoomNights += roomNights;
+        expected.scenarioRevenue += roomNights * rate;
+      }
+    }
+
+    const errorModel = this.buildErrorModel(hotelIds, pastActuals, pastUserForecasts, pastBaselines);
+    const cities = Array.from(new Set(hotelList.map(h => h.city || 'Unknown'))).sort();
+    const hotelCity = new Int32Array(hotelList.map(h => cities.indexOf(h.city || 'Unknown')));
+
+    const draws = scenario.draws;
+    const rng = gaussian(scenario.seed ?? Math.floor(Math.random() * 2 ** 31));
+    const totals = { roomNights: new Float64Array(draws), revenue: new Float64Array(draws) };
+    const C = cities.length;
+    const cityRoomNights = new Float64Array(draws * C);
+    const cityRevenue = new Float64Array(draws * C);
+
+    // Only hotels with forecast volume take part in the draws; their
+    // constants are packed into flat arrays so the draw loop stays tight
+    const active: number[] = [];
+    for (let h = 0; h < H; h++) if (hotelRoomNights[h] > 0) active.push(h);
+    const K = active.length;
+    const kCity = new Int32Array(active.map(h => hotelCity[h]));
+    const kRoomNights = new Float64Array(active.map(h => hotelRoomNights[h]));
+    const kAdr = new Float64Array(active.map(h => hotelRevenue[h] / hotelRoomNights[h]));
+    const kCapacity = new Float64Array(active.map(h => hotelCapacity[h]));
+    const kSigmaOcc = new Float64Array(active.map(h => errorModel.occupancySigma[h]));
+    const kSigmaAdr = new Float64Array(active.map(h => errorModel.adrSigma[h]));
+
+    const rhoOcc = Math.sqrt(errorModel.occupancyCorrelation);
+    const rhoAdr = Math.sqrt(errorModel.adrCorrelation);
+    const idioOcc = Math.sqrt(1 - errorModel.occupancyCorrelation);
+    const idioAdr = Math.sqrt(1 - errorModel.adrCorrelation);
+
+    for (let n = 0; n < draws; n++) {
+      const marketOcc = rng();
+      const marketAdr = rng();
+
+      let roomNightsSum = 0;
+      let revenueSum = 0;
+      for (let k = 0; k < K; k++) {
+        const sOcc = kSigmaOcc[k];
+        const sAdr = kSigmaAdr[k];
+
+        // Mean-preserving log-normal multipliers, capped at room capacity
+        const zOcc = rhoOcc * marketOcc + idioOcc * rng();
+        const zAdr = rhoAdr * marketAdr + idioAdr * rng();
+        const roomNights = Math.min(kCapacity[k], kRoomNights[k] * Math.exp(sOcc * zOcc - (sOcc * sOcc) / 2));
+        const revenue = roomNights * kAdr[k] * Math.exp(sAdr * zAdr - (sAdr * sAdr) / 2);
+
+        roomNightsSum += roomNights;
+        revenueSum += revenue;
+        cityRoomNights[n * C + kCity[k]] += roomNights;
+        cityRevenue[n * C + kCity[k]] += revenue;
+      }
+      totals.roomNights[n] = roomNightsSum;
+      totals.revenue[n] = revenueSum;
+    }
+
+    const cityBands = cities.map((city, ci) => {
+      const roomNights = new Float64Array(draws);
+      const revenue = new Float64Array(draws);
+      for (let n = 0; n < draws; n++) {
+        roomNights[n] = cityRoomNights[n * C + ci];
+        revenue[n] = cityRevenue[n * C + ci];
+      }
+      return { city, ...bands(roomNights, revenue) };
+    }).filter(city => city.roomNights.p50 > 0);
+
+    return {
+      startDate,
+      endDate,
+      draws,
+      hotels: H,
+      hotelsWithoutRooms: rooms.filter(r => r <= 0).length,
+      sources,
+      errorModel: {
+        occupancySigma: round(errorModel.pooledOccupancySigma, 4),
+        adrSigma: round(errorModel.pooledAdrSigma, 4),
+        occupancyCorrelation: round(errorModel.occupancyCorrelation, 4),
+        adrCorrelation: round(errorModel.adrCorrelation, 4),
+      },
+      expected: {
+        base: summary(expected.roomNights, expected.revenue),
+        scenario: summary(expected.scenarioRoomNights, expected.scenarioRevenue),
+      },
+      portfolio: bands(totals.roomNights, totals.revenue),
+      cities: cityBands,
+      durationMs: Date.now() - started,
+    };
+  }
+
+  /**
+   * Multiply the daily forecast by each shock over the hotels and dates it targets
+   */
+  private async applyShocks(
+    shocks: ScenarioShock[],
+    hotelList: Hotel[],
+    startDate: string,
+    days: number,
+    occ: Float64Array,
+    adr: Float64Array
+  ): Promise<void> {
+    const eventIds = Array.from(new Set(shocks.map(s => s.eventId).filter((id): id is string => !!id)));
+    const events = new Map((await Promise.all(eventIds.map(id => storage.getEvent(id))))
+      .filter(e => !!e)
+      .map(e => [e!.id, e!]));
+
+    for (const shock of shocks) {
+      const event = shock.eventId ? events.get(shock.eventId) : undefined;
+      if (shock.eventId && !event) continue;
+
+      const city = shock.city || event?.city;
+      let from = shock.startDate || event?.startDate || startDate;
+      let to = shock.endDate || event?.endDate || addDays(startDate, days - 1);
+      if (event) {
+        from = from > event.startDate ? from : event.startDate;
+        to = to < event.endDate ? to : event.endDate;
+      }
+
+      const first = Math.max(0, daysBetween(startDate, from));
+      const last = Math.min(days - 1, daysBetween(startDate, to));
+      const occFactor = 1 + shock.occupancyChangePct / 100;
+      const adrFactor = 1 + shock.adrChangePct / 100;
+
+      hotelList.forEach((hotel, h) => {
+        if (shock.hotelId && hotel.id !== shock.hotelId) return;
+        if (city && hotel.city?.toLowerCase() !== city.toLowerCase()) return;
+        for (let d = first; d <= last; d++) {
+          occ[h * days + d] *= occFactor;
+          adr[h * days + d] *= adrFactor;
+        }
+      });
+    }
+  }
+
+  /**
+   * Spread of monthly log errors (forecast vs actual) per hotel, pooled across
+   * the portfolio, plus the share of that variance common to all hotels
+   */
+  private buildErrorModel(
+    hotelIds: string[],
+    actuals: HotelActual[],
+    userForecasts: Forecast[],
+    baselines: SystemForecast[]
+  ): ErrorModel {
+    const forecastByKey = new Map<string, Forecast | SystemForecast>();
+    for (const baseline of baselines) forecastByKey.set(`${baseline.hotelId}|${baseline.forecastDate}`, baseline);
+    groupByHotel(userForecasts).forEach((list, hotelId) => {
+      latestUserForecastByDate(list).forEach((forecast, date) => forecastByKey.set(`${hotelId}|${date}`, forecast));
+    });
+
+    // Sums per hotel-month over days that have both a forecast and an actual
+    const months = new Map<string, { hotelId: string; month: string; fOcc: number; aOcc: number; fAdr: number; aAdr: number; n: number }>();
+    for (const actual of actuals) {
+      const forecast = forecastByKey.get(`${actual.hotelId}|${actual.actualDate}`);
+      if (!forecast) continue;
+      const values = [forecast.occupancyRate, actual.occupancyRate, forecast.averageDailyRate, actual.averageDailyRate].map(toNumber);
+      if (values.some(v => Number.isNaN(v) || v <= 0)) continue;
+
+      const month = actual.actualDate.substring(0, 7);
+      const key = `${actual.hotelId}|${month}`;
+      const entry = months.get(key) || { hotelId: actual.hotelId, month, fOcc: 0, aOcc: 0, fAdr: 0, aAdr: 0, n: 0 };
+      entry.fOcc += values[0];
+      entry.aOcc += values[1];
+      entry.fAdr += values[2];
+      entry.aAdr += values[3];
+      entry.n++;
+      months.set(key, entry);
+    }
+
+    const hotelErrors = new Map<string, { occ: number[]; adr: number[] }>();
+    const monthErrors = new Map<string, { occ: number[]; adr: number[] }>();
+    months.forEach((entry) => {
+      const occError = Math.log(entry.fOcc / entry.aOcc);
+      const adrError = Math.log(entry.fAdr / entry.aAdr);
+      pushError(hotelErrors, entry.hotelId, occError, adrError);
+      pushError(monthErrors, entry.month, occError, adrError);
+    });
+
+    const all = Array.from(hotelErrors.values());
+    const pooledOcc = all.length ? rms(all.flatMap(e => e.occ)) : DEFAULT_OCCUPANCY_SIGMA;
+    const pooledAdr = all.length ? rms(all.flatMap(e => e.adr)) : DEFAULT_ADR_SIGMA;
+
+    const occupancySigma = new Float64Array(hotelIds.length);
+    const adrSigma = new Float64Array(hotelIds.length);
+    hotelIds.forEach((id, h) => {
+      const errors = hotelErrors.get(id);
+      const own = errors && errors.occ.length >= MIN_ERROR_MONTHS;
+      occupancySigma[h] = own ? rms(errors!.occ) : pooledOcc;
+      adrSigma[h] = own ? rms(errors!.adr) : pooledAdr;
+    });
+
+    const monthList = Array.from(monthErrors.values()).filter(e => e.occ.length >= 2);
+    return {
+      occupancySigma,
+      adrSigma,
+      pooledOccupancySigma: pooledOcc,
+      pooledAdrSigma: pooledAdr,
+      occupancyCorrelation: commonShare(monthList.map(e => e.occ)),
+      adrCorrelation: commonShare(monthList.map(e => e.adr)),
+    };
+  }
+}
+
+/**
+ * Share of error variance common to all hotels in a month, from how much the
+ * monthly mean errors vary compared with what independent errors would give
+ */
+function commonShare(groups: number[][]): number {
+  if (groups.length < MIN_ERROR_MONTHS) return DEFAULT_MARKET_CORRELATION;
+
+  let meanSquare = 0;
+  let variance = 0;
+  let inverseSize = 0;
+  for (const group of groups) {
+    const mean = group.reduce((sum, e) => sum + e, 0) / group.length;
+    meanSquare += mean * mean;
+    variance += group.reduce((sum, e) => sum + e * e, 0) / group.length;
+    inverseSize += 1 / group.length;
+  }
+  meanSquare /= groups.length;
+  variance /= groups.length;
+  inverseSize /= groups.length;
+
+  if (variance <= 0 || inverseSize >= 1) return DEFAULT_MARKET_CORRELATION;
+  const share = (meanSquare - variance * inverseSize) / (variance * (1 - inverseSize));
+  return Math.min(1, Math.max(0, share));
+}
+
+/**
+ * Seeded standard normal generator (mulberry32 + Box-Muller)
+ */
+function gaussian(seed: number): () => number {
+  let state = seed >>> 0;
+  let spare = NaN;
+  const uniform = () => {
+    state = (state + 0x6D2B79F5) >>> 0;
+    let t = state;
+    t = Math.imul(t ^ (t >>> 15), t | 1);
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+    return (((t ^ (t >>> 14)) >>> 0) + 1) / 4294967297;
+  };
+
+  return () => {
+    if (!Number.isNaN(spare)) {
+      const value = spare;
+      spare = NaN;
+      return value;
+    }
+    const radius = Math.sqrt(-2 * Math.log(uniform()));
+    const angle = 2 * Math.PI * uniform();
+    spare = radius * Math.sin(angle);
+    return radius * Math.cos(angle);
+  };
+}
+
+function bands(roomNights: Float64Array, revenue: Float64Array) {
+  const adr = new Float64Array(roomNights.length);
+  for (let n = 0; n < adr.length; n++) adr[n] = roomNights[n] > 0 ? revenue[n] / roomNights[n] : 0;
+  return {
+    revenue: percentiles(revenue, 2),
+    averageDailyRate: percentiles(adr, 2),
+    roomNights: percentiles(roomNights, 0),
+  };
+}
+
+function percentiles(values: Float64Array, digits: number): Band {
+  const sorted = values.slice().sort();
+  const result: Band = {};
+  for (const p of PERCENTILES) {
+    const position = (p / 100) * (sorted.length - 1);
+    const lower = Math.floor(position);
+    const upper = Math.min(sorted.length - 1, lower + 1);
+    result[`p${p}`] = round(sorted[lower] + (sorted[upper] - sorted[lower]) * (position - lower), digits);
+  }
+  return result;
+}
+
+function summary(roomNights: number, revenue: number) {
+  return {
+    revenue: round(revenue, 2),
+    averageDailyRate: roomNights > 0 ? round(revenue / roomNights, 2) : 0,
+    roomNights: Math.round(roomNights),
+  };
+}
+
+function pushError(index: Map<string, { occ: number[]; adr: number[] }>, key: string, occError: number, adrError: number) {
+  const errors = index.get(key) || { occ: [], adr: [] };
+  errors.occ.push(occError);
+  errors.adr.push(adrError);
+  index.set(key, errors);
+}
+
+function groupByHotel(list: Forecast[]): Map<string, Forecast[]> {
+  const byHotel = new Map<string, Forecast[]>();
+  for (const forecast of list) {
+    const group = byHotel.get(forecast.hotelId) || [];
+    group.push(forecast);
+    byHotel.set(forecast.hotelId, group);
+  }
+  return byHotel;
+}
+
+function rms(values: number[]): number {
+  return Math.sqrt(values.reduce((sum, v) => sum + v * v, 0) / values.length);
+}
+
+function round(value: number, digits: number): number {
+  const factor = 10 ** digits;
+  return Math.round(value * factor) / factor;
+}
+
+function toNumber(value: unknown): number {
+  if (value === null || value === undefined) return NaN;
+  return parseFloat(String(value));
+}
+
+// Export singleton instance
+export const scenarioSimulator = new ScenarioSimulator();
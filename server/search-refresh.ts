@@ -0,0 +1,130 @@
+/**
+ * Search Refresh Scheduler - keeps saved event searches up to date
+ * Runs inside the server process when EVENT_SEARCH_REFRESH_MINUTES is set
+ * (it is off by default, since every refresh queries the external sources),
+ * or on its own via server/cli/refresh-searches.ts. There is no queue or
+ * broker: every tick it claims the saved searches whose last run is
+ * older than the refresh cadence, stamping them in the same statement so
+ * several processes never pick the same one, and refreshes them
+ * incrementally on a small bounded pool of workers. Each job starts after a random delay so refreshes
+ * do not hit the sources in bursts, and the sources' own rate limits are
+ * shared with interactive searches. Results land in external_events, so
+ * opening a saved search is a plain database read.
+ */
+
+import { storage } from './storage';
+import { eventFinderService } from './event-finder';
+import { toISODate } from './date-utils';
+import { sleep } from './rate-limiter';
+import type { EventSearch } from '@shared/schema';
+
+export interface RefreshSchedulerOptions {
+  intervalMs: number; // how old a search's last run may get
+  tickMs: number; // how often to look for due searches
+  concurrency: number;
+  jitterMs: number; // max random delay before each refresh
+  batchSize: number; // searches picked up per tick
+}
+
+const MINUTE_MS = 60 * 1000;
+
+function envNumber(name: string, fallback: number): number {
+  const value = process.env[name] ? parseFloat(process.env[name]!) : NaN;
+  return Number.isFinite(value) ? value : fallback;
+}
+
+export const DEFAULT_REFRESH_OPTIONS: RefreshSchedulerOptions = {
+  intervalMs: envNumber('EVENT_SEARCH_REFRESH_MINUTES', 0) * MINUTE_MS,
+  tickMs: envNumber('EVENT_SEARCH_REFRESH_TICK_MINUTES', 5) * MINUTE_MS,
+  concurrency: Math.max(1, envNumber('EVENT_SEARCH_REFRESH_CONCURRENCY', 3)),
+  jitterMs: envNumber('EVENT_SEARCH_REFRESH_JITTER_SECONDS', 30) * 1000,
+  batchSize: 100,
+};
+
+export class SearchRefreshScheduler {
+  private timer: NodeJS.Timeout | null = null;
+  private running = new Set<string>();
+  private ticking = false;
+  private stopped = new AbortController();
+
+  constructor(private options: RefreshSchedulerOptions = DEFAULT_REFRESH_OPTIONS) {}
+
+  /**
+   * Start refreshing in the background. Does nothing when the cadence is 0.
+   */
+  start(): void {
+    if (this.timer || this.options.intervalMs <= 0) return;
+    console.log(`Saved search refresh every ${Math.round(this.options.intervalMs / MINUTE_MS)} minutes`);
+
+    const schedule = (delay: number) => {
+      this.timer = setTimeout(async () => {
+        await this.tick();
+        if (this.timer) schedule(this.options.tickMs);
+      }, delay);
+      // Never keep the process alive just for refreshes
+      this.timer.unref();
+    };
+    schedule(Math.random() * this.options.tickMs);
+  }
+
+  stop(): void {
+    if (this.timer) clearTimeout(this.timer);
+    this.timer = null;
+    this.stopped.abort();
+  }
+
+  /**
+   * Refresh every search that is due, `concurrency` at a time. Returns how
+   * many searches were refreshed successfully.
+   */
+  async tick(): Promise<number> {
+    if (this.ticking) return 0;
+    this.ticking = true;
+
+    try {
+      const due = await storage.claimEventSearchesDueForRefresh(
+        new Date(Date.now() - this.options.intervalMs),
+        toISODate(new Date()),
+        this.options.batchSize
+      );
+      const queue = due.filter(search => !this.running.has(search.id));
+      let refreshed = 0;
+
+      const worker = async () => {
+        for (let search = queue.shift(); search; search = queue.shift()) {
+          if (await this.refresh(search)) refreshed++;
+        }
+      };
+      await Promise.all(Array.from({ length: Math.min(this.options.concurrency, queue.length) }, worker));
+
+      if (due.length > 0) {
+        console.log(`Refreshed ${refreshed} of ${due.length} saved event searches`);
+      }
+      return refreshed;
+    } catch (error) {
+      console.error("Error refreshing saved event searches:", error);
+      return 0;
+    } finally {
+      this.ticking = false;
+    }
+  }
+
+  private async refresh(search: EventSearch): Promise<boolean> {
+    this.running.add(search.id);
+    try {
+      await sleep(Math.random() * this.options.jitterMs, this.stopped.signal);
+      await eventFinderService.refreshSearch(search);
+      return true;
+    } catch (error) {
+      if (!this.stopped.signal.aborted) {
+        console.error(`Error refreshing saved event search ${search.id}:`, error);
+      }
+      return false;
+    } finally {
+      this.running.delete(search.id);
+    }
+  }
+}
+
+// Export singleton instance
+export const searchRefreshScheduler = new SearchRefreshScheduler();
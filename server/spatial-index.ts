@@ -0,0 +1,281 @@
+/**
+ * Spatial Index - radius queries between hotels and events
+ * Hotels, active events and upcoming saved search results with coordinates
+ * are bucketed into a fixed grid of quarter-degree cells held in memory. A
+ * radius query only visits the cells overlapping the circle's bounding box
+ * and then checks the exact great-circle distance, so "events within X km of
+ * a hotel" and "hotels within X km of an event" stay in the millisecond range
+ * across the whole portfolio. The index is rebuilt when the change counters
+ * of those tables move (see change-tracker.ts).
+ */
+
+import { storage } from './storage';
+import { changeTracker } from './change-tracker';
+import type { Event, Hotel } from '@shared/schema';
+import type { MapExternalEvent } from './storage';
+
+const CELL_DEGREES = 0.25;
+const LON_CELLS = Math.round(360 / CELL_DEGREES);
+const KM_PER_DEGREE = 111.32;
+const EARTH_RADIUS_KM = 6371;
+// How long a loaded index is trusted before the change counters are checked again
+const VERSION_CHECK_MS = 5000;
+
+export const DEFAULT_RADIUS_KM = 25;
+
+// Radius used to link events to hotels in forecast templates; 0 keeps city-name
+// matching. Event impact and uplift SQL, forecast spreading and scenarios still
+// match on the city name whatever this is set to.
+export const EVENT_MATCH_RADIUS_KM = parseFloat(process.env.EVENT_MATCH_RADIUS_KM || '0') || 0;
+
+export interface GeoPoint {
+  latitude: number;
+  longitude: number;
+}
+
+export interface Nearby<T> {
+  item: T;
+  distanceKm: number;
+}
+
+export function distanceKm(a: GeoPoint, b: GeoPoint): number {
+  const toRad = Math.PI / 180;
+  const dLat = (b.latitude - a.latitude) * toRad;
+  const dLon = (b.longitude - a.longitude) * toRad;
+  const h = Math.sin(dLat / 2) ** 2 +
+    Math.cos(a.latitude * toRad) * Math.cos(b.latitude * toRad) * Math.sin(dLon / 2) ** 2;
+  return 2 * EARTH_RADIUS_KM * Math.asin(Math.min(1, Math.sqrt(h)));
+}
+
+/**
+ * Coordinates of a row with decimal latitude/longitude columns, if it has any
+ */
+export function pointOf(row: { latitude: string | null; longitude: string | null }): GeoPoint | null {
+  if (row.latitude == null || row.longitude == null) return null;
+  const latitude = parseFloat(row.latitude);
+  const longitude = parseFloat(row.longitude);
+  if (!Number.isFinite(latitude) || !Number.isFinite(longitude)) return null;
+  return { latitude, longitude };
+}
+
+function cellX(longitude: number): number {
+  return ((Math.floor((longitude + 180) / CELL_DEGREES) % LON_CELLS) + LON_CELLS) % LON_CELLS;
+}
+
+function cellY(latitude: number): number {
+  return Math.floor((Math.max(-90, Math.min(90, latitude)) + 90) / CELL_DEGREES);
+}
+
+/**
+ * Uniform lat/lon grid of points
+ */
+export class GridIndex<T> {
+  private cells = new Map<number, Array<GeoPoint & { item: T }>>();
+  size = 0;
+
+  insert(point: GeoPoint, item: T): void {
+    const key = cellY(point.latitude) * LON_CELLS + cellX(point.longitude);
+    const cell = this.cells.get(key);
+    const entry = { latitude: point.latitude, longitude: point.longitude, item };
+    if (cell) cell.push(entry);
+    else this.cells.set(key, [entry]);
+    this.size++;
+  }
+
+  /**
+   * Items within `radiusKm` of `center`, nearest first
+   */
+  within(center: GeoPoint, radiusKm: number): Nearby<T>[] {
+    const latSpan = radiusKm / KM_PER_DEGREE;
+    const cosLat = Math.cos((center.latitude * Math.PI) / 180);
+    const lonSpan = cosLat > 1e-6 ? Math.min(180, radiusKm / (KM_PER_DEGREE * cosLat)) : 180;
+
+    const results: Nearby<T>[] = [];
+    const y0 = cellY(center.latitude - latSpan);
+    const y1 = cellY(center.latitude + latSpan);
+    const xCount = Math.min(LON_CELLS, Math.floor((2 * lonSpan) / CELL_DEGREES) + 2);
+    const x0 = cellX(center.longitude - lonSpan);
+
+    for (let y = y0; y <= y1; y++) {
+      for (let i = 0; i < xCount; i++) {
+        const cell = this.cells.get(y * LON_CELLS + ((x0 + i) % LON_CELLS));
+        if (!cell) continue;
+        for (const entry of cell) {
+          const d = distanceKm(center, entry);
+          if (d <= radiusKm) results.push({ item: entry.item, distanceKm: d });
+        }
+      }
+    }
+
+    return results.sort((a, b) => a.distanceKm - b.distanceKm);
+  }
+
+  /**
+   * Points inside a bounding box (west may exceed east across the antimeridian)
+   */
+  inBox(south: number, west: number, north: number, east: number): Array<GeoPoint & { item: T }> {
+    const inLon = west <= east
+      ? (lon: number) => lon >= west && lon <= east
+      : (lon: number) => lon >= west || lon <= east;
+    const y0 = cellY(south);
+    const y1 = cellY(north);
+    const x0 = cellX(west);
+    const xCount = Math.min(LON_CELLS, ((cellX(east) - x0 + LON_CELLS) % LON_CELLS) + 1);
+    const results: Array<GeoPoint & { item: T }> = [];
+    const collect = (cell: Array<GeoPoint & { item: T }>) => {
+      for (const entry of cell) {
+        if (entry.latitude >= south && entry.latitude <= north && inLon(entry.longitude)) results.push(entry);
+      }
+    };
+
+    // Small boxes visit their own cells; large ones scan the occupied cells instead
+    if ((y1 - y0 + 1) * xCount <= this.cells.size) {
+      for (let y = y0; y <= y1; y++) {
+        for (let i = 0; i < xCount; i++) {
+          const cell = this.cells.get(y * LON_CELLS + ((x0 + i) % LON_CELLS));
+          if (cell) collect(cell);
+        }
+      }
+    } else {
+      for (const [key, cell] of Array.from(this.cells.entries())) {
+        const y = Math.floor(key / LON_CELLS);
+        if (y >= y0 && y <= y1) collect(cell);
+      }
+    }
+    return results;
+  }
+}
+
+export interface LoadedIndex {
+  version: string;
+  checkedAt: number;
+  hotels: GridIndex<Hotel>;
+  events: GridIndex<Event>;
+  externalEvents: GridIndex<MapExternalEvent>;
+  hotelsById: Map<string, Hotel>;
+  eventsById: Map<string, Event>;
+}
+
+export class SpatialIndexService {
+  private loaded: LoadedIndex | null = null;
+  private loading: Promise<LoadedIndex> | null = null;
+
+  /**
+   * Active events within `radiusKm` of a hotel, optionally overlapping a date window
+   */
+  async eventsNearHotel(
+    hotelId: string,
+    radiusKm: number = DEFAULT_RADIUS_KM,
+    startDate?: string,
+    endDate?: string
+  ): Promise<Nearby<Event>[] | undefined> {
+    const index = await this.getIndex();
+    const hotel = index.hotelsById.get(hotelId);
+    const center = hotel && pointOf(hotel);
+    if (!center) return undefined;
+
+    return index.events.within(center, radiusKm).filter(({ item }) =>
+      (!endDate || item.startDate <= endDate) && (!startDate || item.endDate >= startDate)
+    );
+  }
+
+  /**
+   * Hotels within `radiusKm` of an event
+   */
+  async hotelsNearEvent(eventId: string, radiusKm: number = DEFAULT_RADIUS_KM): Promise<Nearby<Hotel>[] | undefined> {
+    const index = await this.getIndex();
+    const event = index.eventsById.get(eventId);
+    const center = event && pointOf(event);
+    if (!center) return undefined;
+    return index.hotels.within(center, radiusKm);
+  }
+
+  /**
+   * Assign events to hotels by distance. Hotels or events without
+   * coordinates fall back to matching on the city name.
+   */
+  matchEventsToHotels(hotelList: Hotel[], eventList: Event[], radiusKm: number): Map<string, Event[]> {
+    const grid = new GridIndex<Event>();
+    const byCity = new Map<string, Event[]>();
+    const unplacedByCity = new Map<string, Event[]>();
+    const add = (map: Map<string, Event[]>, city: string, event: Event) => {
+      const list = map.get(city) || [];
+      list.push(event);
+      map.set(city, list);
+    };
+
+    for (const event of eventList) {
+      const point = pointOf(event);
+      if (point) grid.insert(point, event);
+      if (!event.city) continue;
+      add(byCity, event.city, event);
+      if (!point) add(unplacedByCity, event.city, event);
+    }
+
+    const matches = new Map<string, Event[]>();
+    for (const hotel of hotelList) {
+      const point = pointOf(hotel);
+      const city = hotel.city || '';
+      matches.set(hotel.id, point
+        ? [...grid.within(point, radiusKm).map(({ item }) => item), ...(unplacedByCity.get(city) || [])]
+        : byCity.get(city) || []);
+    }
+    return matches;
+  }
+
+  /**
+   * Current index, reloaded first if hotels, events or search results changed
+   */
+  async getIndex(): Promise<LoadedIndex> {
+    const current = this.loaded;
+    if (current && Date.now() - current.checkedAt < VERSION_CHECK_MS) return current;
+
+    const version = await changeTracker.getVersion({ tables: ['hotels', 'events', 'externalEvents'] });
+    if (current && current.version === version) {
+      current.checkedAt = Date.now();
+      return current;
+    }
+
+    if (!this.loading) {
+      this.loading = this.build(version).finally(() => {
+        this.loading = null;
+      });
+    }
+    this.loaded = await this.loading;
+    return this.loaded;
+  }
+
+  private async build(version: string): Promise<LoadedIndex> {
+    const [hotelList, eventList, externalList] = await Promise.all([
+      storage.getAllHotels(),
+      storage.getEvents(),
+      storage.getUpcomingExternalEventPoints(),
+    ]);
+    const index: LoadedIndex = {
+      version,
+      checkedAt: Date.now(),
+      hotels: new GridIndex<Hotel>(),
+      events: new GridIndex<Event>(),
+      externalEvents: new GridIndex<MapExternalEvent>(),
+      hotelsById: new Map(hotelList.map(hotel => [hotel.id, hotel])),
+      eventsById: new Map(eventList.map(event => [event.id, event])),
+    };
+
+    for (const hotel of hotelList) {
+      const point = pointOf(hotel);
+      if (point) index.hotels.insert(point, hotel);
+    }
+    for (const event of eventList) {
+      const point = pointOf(event);
+      if (point) index.events.insert(point, event);
+    }
+    for (const event of externalList) {
+      const point = pointOf(event);
+      if (point) index.externalEvents.insert(point, event);
+    }
+    return index;
+  }
+}
+
+// Export singleton instance
+export const spatialIndex = new SpatialIndexService();
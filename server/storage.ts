@@ -8,6 +8,20 @@ import {
   comments,
   hotelAssignments,
   activityLog,
+  forecastVersions,
+  forecastVersionEntries,
+  forecastTombstones,
+  systemForecasts,
+  eventUpliftFactors,
+  eventForecastSuggestions,
+  jobWatermarks,
+  backtestRuns,
+  backtestResults,
+  eventSearches,
+  externalEvents,
+  eventSearchExports,
+  geocodeCache,
+  chatMessages,
   type User,
 
   type InsertUser,
@@ -27,9 +41,146 @@ import {
   type InsertHotelAssignment,
   type ActivityLog,
   type InsertActivityLog,
+  type ForecastVersion,
+  type InsertForecastVersion,
+  type ForecastVersionEntry,
+  type InsertForecastVersionEntry,
+  type SystemForecast,
+  type InsertSystemForecast,
+  type EventUpliftFactor,
+  type EventForecastSuggestion,
+  type InsertEventForecastSuggestion,
+  type BacktestRun,
+  type InsertBacktestRun,
+  type BacktestResult,
+  type InsertBacktestResult,
+  type PortfolioExport,
+  type EventSearch,
+  type InsertEventSearch,
+  type ExternalEventRecord,
+  type InsertExternalEvent,
+  type EventSearchExport,
+  type InsertEventSearchExport,
+  type GeocodeCacheEntry,
+  type InsertGeocodeCacheEntry,
+  type StoredChatMessage,
+  type InsertChatMessage,
+  type InsertForecastTombstone,
 } from "@shared/schema";
 import { db } from "./db";
-import { eq, desc, and, or, like, gte, lte, sql } from "drizzle-orm";
+import { changeTracker } from "./change-tracker";
+import { streamQuery } from "./query-stream";
+import { eq, desc, and, or, like, gte, lte, lt, sql, inArray, isNull, getTableColumns } from "drizzle-orm";
+
+const TOMBSTONE_COLUMNS = {
+  id: forecasts.id,
+  hotelId: forecasts.hotelId,
+  forecastType: forecasts.forecastType,
+  forecastDate: forecasts.forecastDate,
+};
+
+/**
+ * Record deleted forecasts so incremental exports can pass the deletes on
+ */
+async function recordForecastTombstones(tx: Pick<typeof db, 'insert'>, deleted: InsertForecastTombstone[]): Promise<void> {
+  const BATCH_SIZE = 1000;
+  for (let i = 0; i < deleted.length; i += BATCH_SIZE) {
+    await tx
+      .insert(forecastTombstones)
+      .values(deleted.slice(i, i + BATCH_SIZE))
+      .onConflictDoUpdate({ target: forecastTombstones.id, set: { deletedAt: sql`now()` } });
+  }
+}
+
+// One hotel's actuals and user forecast revenue for one month
+export interface HotelMonthSummary {
+  hotelId: string;
+  month: string; // YYYY-MM
+  revenue: number | null;
+  roomNights: number | null;
+  occupancyRate: number | null;
+  averageDailyRate: number | null;
+  forecastRevenue: number | null;
+}
+
+// One hotel's actuals over a date range
+export interface HotelPeriodTotals {
+  hotelId: string;
+  days: number;
+  revenue: number;
+  roomNights: number;
+  occupancyRate: number | null;
+  averageDailyRate: number | null;
+}
+
+// An event's days in its city's hotels compared with the same weekday last year
+export interface EventImpactSummary {
+  eventId: string;
+  days: number;
+  hotels: number;
+  revenue: number;
+  stlyRevenue: number;
+  occupancyRate: number | null;
+  stlyOccupancyRate: number | null;
+  averageDailyRate: number | null;
+  stlyAverageDailyRate: number | null;
+}
+
+// Revenue forecast error sums for one hotel, see accuracyFromSums
+export interface ForecastErrorSums {
+  hotelId: string;
+  count: number;
+  apeSum: number;
+  apeCount: number;
+  absErrorSum: number;
+  errorSum: number;
+  actualSum: number;
+}
+
+// Outcome of importing saved search results into the events table
+export interface EventImportResult {
+  total: number;
+  imported: number; // new events created
+  skipped: number; // already imported earlier, or canceled at the source
+  duplicates: number; // matched an existing event or another row of the same import
+}
+
+// Difference between a saved search's stored results and a fresh run
+export interface EventSearchChanges {
+  inserts: Omit<InsertExternalEvent, 'searchId'>[];
+  updates: Array<{ id: string; values: Partial<InsertExternalEvent> }>;
+  cancelIds: string[];
+}
+
+// Saved search result reduced to what the map needs
+export interface MapExternalEvent {
+  id: string;
+  searchId: string;
+  eventName: string;
+  eventType: string | null;
+  eventDate: string;
+  city: string | null;
+  latitude: string | null;
+  longitude: string | null;
+}
+
+// One row per event day for a hotel, with the hotel's event forecast if any
+export interface EventForecastExportRow {
+  eventId: string;
+  eventName: string;
+  category: string | null;
+  city: string | null;
+  startDate: string;
+  endDate: string;
+  forecastDate: string;
+  eventDay: number;
+  occupancyRate: string | null;
+  averageDailyRate: string | null;
+  revenue: string | null;
+  roomNights: number | null;
+  confidence: string | null;
+  notes: string | null;
+}
 
 export interface IStorage {
   // User operations - email/password auth only
@@ -45,6 +196,8 @@ export interface IStorage {
   updateHotel(id: string, hotel: Partial<InsertHotel>): Promise<Hotel>;
   deleteHotel(id: string): Promise<void>;
   getHotelsByCity(city: string): Promise<Hotel[]>;
+  getHotelsByIds(ids: string[]): Promise<Hotel[]>;
+  getHotelsByCities(cities: string[]): Promise<Hotel[]>;
   getTopPerformingHotels(limit: number): Promise<Array<Hotel & { revenue: number; occupancyRate: number }>>;
 
   // Event operations
@@ -54,9 +207,13 @@ export interface IStorage {
   createEvent(event: InsertEvent): Promise<Event>;
   updateEvent(id: string, event: Partial<InsertEvent>): Promise<Event | undefined>;
   deleteEvent(id: string): Promise<void>;
+  deactivateDuplicateEvents(): Promise<number>;
+  deleteDuplicateExternalEvents(): Promise<number>;
   getEventsByLocation(city: string, startDate?: Date, endDate?: Date): Promise<Event[]>;
   getUpcomingEvents(limit: number): Promise<Event[]>;
   getEventByNameAndDate(name: string, startDate: string): Promise<Event | undefined>;
+  getEventsByCitiesInRange(cities: string[], startDate: string, endDate: string): Promise<Event[]>;
+  getEventsInRange(startDate: string, endDate: string): Promise<Event[]>;
 
   // Forecast operations
   getForecasts(hotelId?: string): Promise<Forecast[]>;
@@ -65,11 +222,75 @@ export interface IStorage {
   updateForecast(id: string, forecast: Partial<InsertForecast>): Promise<Forecast>;
   deleteForecast(id: string): Promise<void>;
   getForecastsByDateRange(hotelId: string, startDate: Date, endDate: Date): Promise<Forecast[]>;
+  getForecastsForHotelsInRange(hotelIds: string[], startDate: string, endDate: string): Promise<Forecast[]>;
+  // Replaces only rows of the given type written by `methodology`, never hand-entered ones
+  replaceForecastsInRanges(
+    forecastType: string,
+    methodology: string,
+    ranges: Array<{ hotelId: string; startDate: string; endDate: string }>,
+    rows: InsertForecast[]
+  ): Promise<number>;
+
+  // Forecast version operations
+  getForecastVersions(hotelId?: string): Promise<ForecastVersion[]>;
+  getForecastVersionsForScope(hotelId: string | null): Promise<ForecastVersion[]>;
+  getForecastVersion(id: string): Promise<ForecastVersion | undefined>;
+  getForecastVersionEntries(versionIds: string[]): Promise<ForecastVersionEntry[]>;
+  createForecastVersion(version: InsertForecastVersion, entries: Omit<InsertForecastVersionEntry, 'versionId'>[]): Promise<ForecastVersion>;
+  replaceForecastsForScope(hotelId: string | null, rows: InsertForecast[]): Promise<number>;
+
+  // System forecast operations
+  getSystemForecasts(hotelId: string, startDate: string, endDate: string, method?: string): Promise<SystemForecast[]>;
+  replaceSystemForecasts(method: string, fromDate: string, rows: InsertSystemForecast[]): Promise<number>;
+  insertSystemForecastsIfAbsent(rows: InsertSystemForecast[]): Promise<number>;
+  getSystemForecastsForHotels(hotelIds: string[], startDate: string, endDate: string, method?: string): Promise<SystemForecast[]>;
+
+  // Event uplift model operations
+  recordEventUpliftObservations(since?: Date): Promise<number>;
+  rebuildEventUpliftFactors(): Promise<number>;
+  getEventUpliftFactors(): Promise<EventUpliftFactor[]>;
+  getEventForecastSuggestions(eventId: string, hotelId?: string): Promise<EventForecastSuggestion[]>;
+  replaceEventForecastSuggestions(rows: InsertEventForecastSuggestion[]): Promise<number>;
+
+  // Backtest operations
+  createBacktestRun(run: InsertBacktestRun): Promise<BacktestRun>;
+  completeBacktestRun(id: string, update: Partial<InsertBacktestRun>, results: InsertBacktestResult[]): Promise<void>;
+  getBacktestRun(id: string): Promise<BacktestRun | undefined>;
+  getBacktestResults(runId: string): Promise<BacktestResult[]>;
+
+  // Event finder search operations
+  createEventSearch(search: InsertEventSearch, results: Omit<InsertExternalEvent, 'searchId'>[]): Promise<EventSearch>;
+  getEventSearch(id: string): Promise<EventSearch | undefined>;
+  createEventSearchExport(record: InsertEventSearchExport): Promise<EventSearchExport>;
+  claimEventSearchesDueForRefresh(lastRunBefore: Date, today: string, limit: number): Promise<EventSearch[]>;
+  getExternalEvents(searchId: string, fromDate?: string): Promise<ExternalEventRecord[]>;
+  getUpcomingExternalEventPoints(): Promise<MapExternalEvent[]>;
+  applyEventSearchChanges(searchId: string, changes: EventSearchChanges): Promise<EventSearch>;
+  importExternalEvents(searchId: string, userId: string, externalEventIds?: string[]): Promise<EventImportResult>;
+
+  // Export operations (streamed in batches from a server-side cursor)
+  streamEventForecastExport(hotelId: string, startDate?: string, endDate?: string): AsyncGenerator<EventForecastExportRow[]>;
+  streamPortfolioExport(filters: PortfolioExport): AsyncGenerator<Record<string, unknown>[]>;
+  streamExternalEvents(searchId: string): AsyncGenerator<ExternalEventRecord[]>;
+
+  // Geocoding cache operations
+  getGeocodes(addressKeys: string[]): Promise<GeocodeCacheEntry[]>;
+  saveGeocodes(entries: InsertGeocodeCacheEntry[]): Promise<void>;
+
+  // AI chat history
+  createChatMessage(entry: InsertChatMessage): Promise<StoredChatMessage>;
+  getChatMessages(conversationId: string, userId: string, limit?: number): Promise<StoredChatMessage[]>;
+
+  // Background job watermarks
+  getJobWatermark(name: string): Promise<Date | undefined>;
+  setJobWatermark(name: string, watermark: Date): Promise<void>;
+  getDatabaseTime(): Promise<Date>;
 
   // Hotel actuals operations
   getHotelActuals(hotelId: string, startDate?: Date, endDate?: Date): Promise<HotelActual[]>;
   createHotelActual(actual: InsertHotelActual): Promise<HotelActual>;
   createHotelActuals(actuals: InsertHotelActual[]): Promise<HotelActual[]>;
+  getHotelActualsForHotels(hotelIds: string[], startDate: string, endDate: string): Promise<HotelActual[]>;
   getHotelPerformanceKPIs(hotelId?: string): Promise<{
     totalRevenue: number;
     avgOccupancyRate: number;
@@ -109,6 +330,10 @@ export interface IStorage {
     upcomingEvents: number;
   }>;
   getRevenueAnalytics(hotelId?: string): Promise<Array<{ month: string; revenue: number }>>;
+  getHotelMonthSummaries(): Promise<HotelMonthSummary[]>;
+  getHotelPeriodTotals(startDate: string, endDate: string, hotelIds?: string[]): Promise<HotelPeriodTotals[]>;
+  getEventImpactSummaries(eventIds: string[]): Promise<EventImpactSummary[]>;
+  getForecastErrorSums(startDate: string, endDate: string, hotelIds?: string[]): Promise<ForecastErrorSums[]>;
 
   // AI Chat support methods
   getAllHotels(): Promise<Hotel[]>;
@@ -158,6 +383,7 @@ export class DatabaseStorage implements IStorage {
 
   async createHotel(hotel: InsertHotel): Promise<Hotel> {
     const [newHotel] = await db.insert(hotels).values(hotel).returning();
+    await changeTracker.bump('hotels', [newHotel.id]);
     return newHotel;
   }
 
@@ -167,17 +393,29 @@ export class DatabaseStorage implements IStorage {
       .set({ ...hotel, updatedAt: new Date() })
       .where(eq(hotels.id, id))
       .returning();
+    await changeTracker.bump('hotels', [id]);
     return updatedHotel;
   }
 
   async deleteHotel(id: string): Promise<void> {
     await db.delete(hotels).where(eq(hotels.id, id));
+    await changeTracker.bump('hotels', [id]);
   }
 
   async getHotelsByCity(city: string): Promise<Hotel[]> {
     return await db.select().from(hotels).where(eq(hotels.city, city));
   }
 
+  async getHotelsByIds(ids: string[]): Promise<Hotel[]> {
+    if (ids.length === 0) return [];
+    return await db.select().from(hotels).where(inArray(hotels.id, ids));
+  }
+
+  async getHotelsByCities(cities: string[]): Promise<Hotel[]> {
+    if (cities.length === 0) return [];
+    return await db.select().from(hotels).where(inArray(hotels.city, cities));
+  }
+
   async getTopPerformingHotels(limit: number): Promise<Array<Hotel & { revenue: number; occupancyRate: number }>> {
     const results = await db
       .select({
@@ -242,6 +480,7 @@ export class DatabaseStorage implements IStorage {
 
   async createEvent(event: InsertEvent): Promise<Event> {
     const [newEvent] = await db.insert(events).values(event).returning();
+    await changeTracker.bump('events');
     return newEvent;
   }
 
@@ -255,6 +494,7 @@ export class DatabaseStorage implements IStorage {
       .set({ ...event, updatedAt: new Date() })
       .where(eq(events.id, id))
       .returning();
+    await changeTracker.bump('events');
     return updatedEvent;
   }
 
@@ -269,7 +509,69 @@ export class DatabaseStorage implements IStorage {
   }
 
   async deleteEvent(id: string): Promise<void> {
-    await db.update(events).set({ isActive: false }).where(eq(events.id, id));
+    await db.update(events).set({ isActive: false, updatedAt: new Date() }).where(eq(events.id, id));
+    await changeTracker.bump('events');
+  }
+
+  /**
+   * Keep the oldest active event per (name, city, start date), deactivate the
+   * rest and point their imported external events at the one kept
+   */
+  async deactivateDuplicateEvents(): Promise<number> {
+    const duplicates = sql`
+      SELECT id, keep_id FROM (
+        SELECT id, first_value(id) OVER (
+          PARTITION BY lower(trim(name)), lower(trim(coalesce(city, ''))), start_date
+          ORDER BY created_at, id
+        ) AS keep_id
+        FROM events
+        WHERE is_active
+      ) ranked
+      WHERE id <> keep_id
+    `;
+    const deactivated = await db.transaction(async (tx) => {
+      await tx.execute(sql`
+        UPDATE external_events x SET imported_event_id = d.keep_id
+        FROM (${duplicates}) d
+        WHERE x.imported_event_id = d.id
+      `);
+      const result = await tx.execute(sql`
+        UPDATE events e SET is_active = false, updated_at = now()
+        FROM (${duplicates}) d
+        WHERE e.id = d.id
+      `);
+      return result.rowCount || 0;
+    });
+
+    if (deactivated > 0) {
+      await changeTracker.bump('events');
+    }
+    return deactivated;
+  }
+
+  /**
+   * Remove repeated (search, dedup key) rows left by overlapping refreshes,
+   * keeping the imported or favorited one where there is one, else the oldest
+   */
+  async deleteDuplicateExternalEvents(): Promise<number> {
+    const result = await db.execute(sql`
+      DELETE FROM external_events x
+      USING (
+        SELECT id, row_number() OVER (
+          PARTITION BY search_id, dedup_key
+          ORDER BY is_imported DESC NULLS LAST, is_favorited DESC NULLS LAST, created_at, id
+        ) AS rank
+        FROM external_events
+        WHERE dedup_key IS NOT NULL
+      ) ranked
+      WHERE x.id = ranked.id AND ranked.rank > 1
+    `);
+    const deleted = result.rowCount || 0;
+
+    if (deleted > 0) {
+      await changeTracker.bump('externalEvents');
+    }
+    return deleted;
   }
 
   async getEventsByLocation(city: string, startDate?: Date, endDate?: Date): Promise<Event[]> {
@@ -299,6 +601,38 @@ export class DatabaseStorage implements IStorage {
     ).orderBy(events.startDate);
   }
 
+  async getEventsByCitiesInRange(cities: string[], startDate: string, endDate: string): Promise<Event[]> {
+    if (cities.length === 0) return [];
+
+    // Events overlapping the window, not only those starting inside it
+    return await db
+      .select()
+      .from(events)
+      .where(
+        and(
+          inArray(events.city, cities),
+          eq(events.isActive, true),
+          lte(events.startDate, endDate),
+          gte(events.endDate, startDate)
+        )
+      )
+      .orderBy(events.startDate);
+  }
+
+  async getEventsInRange(startDate: string, endDate: string): Promise<Event[]> {
+    return await db
+      .select()
+      .from(events)
+      .where(
+        and(
+          eq(events.isActive, true),
+          lte(events.startDate, endDate),
+          gte(events.endDate, startDate)
+        )
+      )
+      .orderBy(events.startDate);
+  }
+
   async getUpcomingEvents(limit: number): Promise<Event[]> {
     return await db
       .select()
@@ -334,6 +668,7 @@ export class DatabaseStorage implements IStorage {
 
   async createForecast(forecast: InsertForecast): Promise<Forecast> {
     const [newForecast] = await db.insert(forecasts).values(forecast).returning();
+    await changeTracker.bump('forecasts', [newForecast.hotelId]);
     return newForecast;
   }
 
@@ -343,11 +678,17 @@ export class DatabaseStorage implements IStorage {
       .set({ ...forecast, updatedAt: new Date() })
       .where(eq(forecasts.id, id))
       .returning();
+    await changeTracker.bump('forecasts', [updatedForecast?.hotelId]);
     return updatedForecast;
   }
 
   async deleteForecast(id: string): Promise<void> {
-    await db.delete(forecasts).where(eq(forecasts.id, id));
+    const deleted = await db.transaction(async (tx) => {
+      const rows = await tx.delete(forecasts).where(eq(forecasts.id, id)).returning(TOMBSTONE_COLUMNS);
+      await recordForecastTombstones(tx, rows);
+      return rows;
+    });
+    await changeTracker.bump('forecasts', deleted.map(row => row.hotelId));
   }
 
   async getForecastsByDateRange(hotelId: string, startDate: Date, endDate: Date): Promise<Forecast[]> {
@@ -364,6 +705,812 @@ export class DatabaseStorage implements IStorage {
       .orderBy(forecasts.forecastDate);
   }
 
+  async getForecastsForHotelsInRange(hotelIds: string[], startDate: string, endDate: string): Promise<Forecast[]> {
+    if (hotelIds.length === 0) return [];
+
+    return await db
+      .select()
+      .from(forecasts)
+      .where(
+        and(
+          inArray(forecasts.hotelId, hotelIds),
+          gte(forecasts.forecastDate, startDate),
+          lte(forecasts.forecastDate, endDate)
+        )
+      );
+  }
+
+  async replaceForecastsInRanges(
+    forecastType: string,
+    methodology: string,
+    ranges: Array<{ hotelId: string; startDate: string; endDate: string }>,
+    rows: InsertForecast[]
+  ): Promise<number> {
+    const BATCH_SIZE = 1000;
+
+    await db.transaction(async (tx) => {
+      for (const range of ranges) {
+        const deleted = await tx.delete(forecasts).where(
+          and(
+            eq(forecasts.hotelId, range.hotelId),
+            eq(forecasts.forecastType, forecastType),
+            eq(forecasts.methodology, methodology),
+            gte(forecasts.forecastDate, range.startDate),
+            lte(forecasts.forecastDate, range.endDate)
+          )
+        ).returning(TOMBSTONE_COLUMNS);
+        await recordForecastTombstones(tx, deleted);
+      }
+
+      for (let i = 0; i < rows.length; i += BATCH_SIZE) {
+        await tx.insert(forecasts).values(rows.slice(i, i + BATCH_SIZE));
+      }
+    });
+
+    await changeTracker.bump('forecasts', Array.from(new Set(ranges.map(range => range.hotelId))));
+    return rows.length;
+  }
+
+  // Forecast version operations
+  async getForecastVersions(hotelId?: string): Promise<ForecastVersion[]> {
+    if (hotelId) {
+      return await db.select()
+        .from(forecastVersions)
+        .where(eq(forecastVersions.hotelId, hotelId))
+        .orderBy(desc(forecastVersions.createdAt));
+    }
+
+    return await db.select()
+      .from(forecastVersions)
+      .orderBy(desc(forecastVersions.createdAt));
+  }
+
+  async getForecastVersionsForScope(hotelId: string | null): Promise<ForecastVersion[]> {
+    return await db.select()
+      .from(forecastVersions)
+      .where(hotelId ? eq(forecastVersions.hotelId, hotelId) : isNull(forecastVersions.hotelId))
+      .orderBy(desc(forecastVersions.createdAt));
+  }
+
+  async getForecastVersion(id: string): Promise<ForecastVersion | undefined> {
+    const [version] = await db.select().from(forecastVersions).where(eq(forecastVersions.id, id));
+    return version;
+  }
+
+  async getForecastVersionEntries(versionIds: string[]): Promise<ForecastVersionEntry[]> {
+    if (versionIds.length === 0) return [];
+    return await db.select()
+      .from(forecastVersionEntries)
+      .where(inArray(forecastVersionEntries.versionId, versionIds));
+  }
+
+  async createForecastVersion(
+    version: InsertForecastVersion,
+    entries: Omit<InsertForecastVersionEntry, 'versionId'>[]
+  ): Promise<ForecastVersion> {
+    const BATCH_SIZE = 2000;
+
+    return await db.transaction(async (tx) => {
+      const [newVersion] = await tx.insert(forecastVersions).values(version).returning();
+
+      for (let i = 0; i < entries.length; i += BATCH_SIZE) {
+        await tx.insert(forecastVersionEntries).values(
+          entries.slice(i, i + BATCH_SIZE).map(entry => ({ ...entry, versionId: newVersion.id }))
+        );
+      }
+
+      return newVersion;
+    });
+  }
+
+  async replaceForecastsForScope(hotelId: string | null, rows: InsertForecast[]): Promise<number> {
+    const BATCH_SIZE = 1000;
+
+    const removed = await db.transaction(async (tx) => {
+      const deleted = hotelId
+        ? await tx.delete(forecasts).where(eq(forecasts.hotelId, hotelId)).returning(TOMBSTONE_COLUMNS)
+        : await tx.delete(forecasts).returning(TOMBSTONE_COLUMNS);
+
+      for (let i = 0; i < rows.length; i += BATCH_SIZE) {
+        await tx.insert(forecasts).values(rows.slice(i, i + BATCH_SIZE));
+      }
+
+      // Rows written back under their old ids (restores) are not deletions
+      const keptIds = new Set(rows.map(row => row.id).filter((id): id is string => !!id));
+      await recordForecastTombstones(tx, deleted.filter(row => !keptIds.has(row.id)));
+      const revivedIds = Array.from(keptIds);
+      for (let i = 0; i < revivedIds.length; i += BATCH_SIZE) {
+        await tx.delete(forecastTombstones).where(inArray(forecastTombstones.id, revivedIds.slice(i, i + BATCH_SIZE)));
+      }
+
+      return deleted;
+    });
+
+    const touched = new Set([...removed.map(row => row.hotelId), ...rows.map(row => row.hotelId)]);
+    await changeTracker.bump('forecasts', Array.from(touched));
+    return rows.length;
+  }
+
+  // System forecast operations
+  async getSystemForecasts(hotelId: string, startDate: string, endDate: string, method: string = 'baseline'): Promise<SystemForecast[]> {
+    return await db
+      .select()
+      .from(systemForecasts)
+      .where(
+        and(
+          eq(systemForecasts.hotelId, hotelId),
+          eq(systemForecasts.method, method),
+          gte(systemForecasts.forecastDate, startDate),
+          lte(systemForecasts.forecastDate, endDate)
+        )
+      )
+      .orderBy(systemForecasts.forecastDate);
+  }
+
+  async replaceSystemForecasts(method: string, fromDate: string, rows: InsertSystemForecast[]): Promise<number> {
+    const BATCH_SIZE = 5000;
+
+    // Rows before fromDate are kept; each date's row is therefore the last one
+    // issued, so accuracy is measured on insertSystemForecastsIfAbsent copies
+    await db.transaction(async (tx) => {
+      await tx.delete(systemForecasts).where(
+        and(
+          eq(systemForecasts.method, method),
+          gte(systemForecasts.forecastDate, fromDate)
+        )
+      );
+
+      for (let i = 0; i < rows.length; i += BATCH_SIZE) {
+        await tx.insert(systemForecasts).values(rows.slice(i, i + BATCH_SIZE));
+      }
+    });
+
+    await changeTracker.bump('systemForecasts', Array.from(new Set(rows.map(row => row.hotelId))));
+    return rows.length;
+  }
+
+  async insertSystemForecastsIfAbsent(rows: InsertSystemForecast[]): Promise<number> {
+    const BATCH_SIZE = 5000;
+    let inserted = 0;
+
+    for (let i = 0; i < rows.length; i += BATCH_SIZE) {
+      const written = await db
+        .insert(systemForecasts)
+        .values(rows.slice(i, i + BATCH_SIZE))
+        .onConflictDoNothing()
+        .returning({ hotelId: systemForecasts.hotelId });
+      inserted += written.length;
+    }
+
+    if (inserted > 0) {
+      await changeTracker.bump('systemForecasts', Array.from(new Set(rows.map(row => row.hotelId))));
+    }
+    return inserted;
+  }
+
+  async getSystemForecastsForHotels(hotelIds: string[], startDate: string, endDate: string, method: string = 'baseline'): Promise<SystemForecast[]> {
+    if (hotelIds.length === 0) return [];
+
+    return await db
+      .select()
+      .from(systemForecasts)
+      .where(
+        and(
+          inArray(systemForecasts.hotelId, hotelIds),
+          eq(systemForecasts.method, method),
+          gte(systemForecasts.forecastDate, startDate),
+          lte(systemForecasts.forecastDate, endDate)
+        )
+      );
+  }
+
+  // Event uplift model operations
+  async recordEventUpliftObservations(since?: Date): Promise<number> {
+    // Only pairs where an actual arrived, or the event or hotel changed, after
+    // the watermark need (re)computing
+    const watermark = since?.toISOString();
+    const sinceFilter = since
+      ? sql`AND (a.uploaded_at > ${watermark} OR s.uploaded_at > ${watermark}
+             OR e.updated_at > ${watermark} OR h.updated_at > ${watermark})`
+      : sql``;
+
+    return await db.transaction(async (tx) => {
+      // Observations of changed (or deactivated) events and moved hotels are
+      // dropped and re-derived below; a full run starts from scratch
+      const removed = since
+        ? await tx.execute(sql`
+            DELETE FROM event_uplift_observations o
+            WHERE o.event_id IN (SELECT id FROM events WHERE updated_at > ${watermark})
+               OR o.hotel_id IN (SELECT id FROM hotels WHERE updated_at > ${watermark})
+          `)
+        : await tx.execute(sql`DELETE FROM event_uplift_observations`);
+
+      const inserted = await tx.execute(sql`
+        INSERT INTO event_uplift_observations (
+          event_id, hotel_id, observed_date, city, category, duration_bucket,
+          revenue, stly_revenue, occupancy_rate, stly_occupancy_rate,
+          average_daily_rate, stly_average_daily_rate
+        )
+        SELECT DISTINCT ON (e.id, a.hotel_id, a.actual_date)
+          e.id, a.hotel_id, a.actual_date, e.city, COALESCE(e.category, 'other'),
+          CASE
+            WHEN e.end_date - e.start_date + 1 <= 1 THEN '1'
+            WHEN e.end_date - e.start_date + 1 <= 3 THEN '2-3'
+            WHEN e.end_date - e.start_date + 1 <= 7 THEN '4-7'
+            ELSE '8+'
+          END,
+          a.revenue, s.revenue, a.occupancy_rate, s.occupancy_rate,
+          a.average_daily_rate, s.average_daily_rate
+        FROM hotel_actuals a
+        JOIN hotels h ON h.id = a.hotel_id
+        JOIN events e ON e.city = h.city
+          AND e.is_active = true
+          AND a.actual_date BETWEEN e.start_date AND e.end_date
+        JOIN hotel_actuals s ON s.hotel_id = a.hotel_id
+          AND s.actual_date = a.actual_date - 364
+        WHERE true ${sinceFilter}
+        ORDER BY e.id, a.hotel_id, a.actual_date, a.uploaded_at DESC, s.uploaded_at DESC
+        ON CONFLICT (event_id, hotel_id, observed_date) DO UPDATE SET
+          revenue = EXCLUDED.revenue,
+          stly_revenue = EXCLUDED.stly_revenue,
+          occupancy_rate = EXCLUDED.occupancy_rate,
+          stly_occupancy_rate = EXCLUDED.stly_occupancy_rate,
+          average_daily_rate = EXCLUDED.average_daily_rate,
+          stly_average_daily_rate = EXCLUDED.stly_average_daily_rate
+      `);
+
+      return (removed.rowCount || 0) + (inserted.rowCount || 0);
+    });
+  }
+
+  async rebuildEventUpliftFactors(): Promise<number> {
+    // Rebuilt from scratch, so a level whose observations are gone loses its
+    // multiplier; rolled-up levels are written with '*' as fallbacks. Ratio
+    // of sums per level.
+    return await db.transaction(async (tx) => {
+      await tx.execute(sql`DELETE FROM event_uplift_factors`);
+      const result = await tx.execute(sql`
+        INSERT INTO event_uplift_factors (
+          city, category, duration_bucket, revenue_multiplier, occupancy_multiplier,
+          adr_multiplier, sample_days, sample_events, updated_at
+        )
+        SELECT
+          CASE WHEN GROUPING(city) = 1 THEN '*' ELSE city END,
+          CASE WHEN GROUPING(category) = 1 THEN '*' ELSE category END,
+          CASE WHEN GROUPING(duration_bucket) = 1 THEN '*' ELSE duration_bucket END,
+          LEAST(GREATEST(SUM(revenue) / NULLIF(SUM(stly_revenue), 0), 0), 10),
+          LEAST(GREATEST(SUM(occupancy_rate) / NULLIF(SUM(stly_occupancy_rate), 0), 0), 10),
+          LEAST(GREATEST(SUM(average_daily_rate) / NULLIF(SUM(stly_average_daily_rate), 0), 0), 10),
+          COUNT(*),
+          COUNT(DISTINCT event_id),
+          NOW()
+        FROM event_uplift_observations
+        WHERE stly_revenue > 0
+        GROUP BY GROUPING SETS ((city, category, duration_bucket), (category, duration_bucket), (category), ())
+      `);
+      return result.rowCount || 0;
+    });
+  }
+
+  async getEventUpliftFactors(): Promise<EventUpliftFactor[]> {
+    return await db.select().from(eventUpliftFactors);
+  }
+
+  async getEventForecastSuggestions(eventId: string, hotelId?: string): Promise<EventForecastSuggestion[]> {
+    return await db
+      .select()
+      .from(eventForecastSuggestions)
+      .where(
+        hotelId
+          ? and(eq(eventForecastSuggestions.eventId, eventId), eq(eventForecastSuggestions.hotelId, hotelId))
+          : eq(eventForecastSuggestions.eventId, eventId)
+      )
+      .orderBy(eventForecastSuggestions.hotelId, eventForecastSuggestions.forecastDate);
+  }
+
+  async replaceEventForecastSuggestions(rows: InsertEventForecastSuggestion[]): Promise<number> {
+    const BATCH_SIZE = 5000;
+
+    await db.transaction(async (tx) => {
+      // Full replacement: suggestions for past days, and for events that are
+      // no longer upcoming (deactivated, moved or deleted), go with the rest
+      await tx.delete(eventForecastSuggestions);
+
+      for (let i = 0; i < rows.length; i += BATCH_SIZE) {
+        await tx.insert(eventForecastSuggestions).values(rows.slice(i, i + BATCH_SIZE));
+      }
+    });
+
+    return rows.length;
+  }
+
+  // Backtest operations
+  async createBacktestRun(run: InsertBacktestRun): Promise<BacktestRun> {
+    const [newRun] = await db.insert(backtestRuns).values(run).returning();
+    return newRun;
+  }
+
+  async completeBacktestRun(id: string, update: Partial<InsertBacktestRun>, results: InsertBacktestResult[]): Promise<void> {
+    await db.transaction(async (tx) => {
+      if (results.length > 0) {
+        await tx.insert(backtestResults).values(results);
+      }
+      await tx
+        .update(backtestRuns)
+        .set({ ...update, completedAt: new Date() })
+        .where(eq(backtestRuns.id, id));
+    });
+  }
+
+  async getBacktestRun(id: string): Promise<BacktestRun | undefined> {
+    const [run] = await db.select().from(backtestRuns).where(eq(backtestRuns.id, id));
+    return run;
+  }
+
+  async getBacktestResults(runId: string): Promise<BacktestResult[]> {
+    return await db
+      .select()
+      .from(backtestResults)
+      .where(eq(backtestResults.runId, runId))
+      .orderBy(backtestResults.method, backtestResults.metric, backtestResults.horizon);
+  }
+  // Event finder search operations
+  async createEventSearch(search: InsertEventSearch, results: Omit<InsertExternalEvent, 'searchId'>[]): Promise<EventSearch> {
+    const BATCH_SIZE = 1000;
+
+    const created = await db.transaction(async (tx) => {
+      const [newSearch] = await tx
+        .insert(eventSearches)
+        .values({ ...search, resultsCount: results.length })
+        .returning();
+
+      for (let i = 0; i < results.length; i += BATCH_SIZE) {
+        await tx.insert(externalEvents).values(
+          results.slice(i, i + BATCH_SIZE).map(result => ({ ...result, searchId: newSearch.id }))
+        ).onConflictDoNothing();
+      }
+
+      return newSearch;
+    });
+
+    await changeTracker.bump('externalEvents');
+    return created;
+  }
+
+  async getEventSearch(id: string): Promise<EventSearch | undefined> {
+    const [search] = await db.select().from(eventSearches).where(eq(eventSearches.id, id));
+    return search;
+  }
+
+  async createEventSearchExport(record: InsertEventSearchExport): Promise<EventSearchExport> {
+    const [newExport] = await db.insert(eventSearchExports).values(record).returning();
+    return newExport;
+  }
+
+  /**
+   * Pick up to `limit` due searches and stamp them as run in the same
+   * statement, so a second scheduler process or the CLI skips the ones this
+   * caller took. A refresh that then fails waits for the next interval.
+   */
+  async claimEventSearchesDueForRefresh(lastRunBefore: Date, today: string, limit: number): Promise<EventSearch[]> {
+    // Searches whose window is already over cannot change any more
+    const due = db
+      .select({ id: eventSearches.id })
+      .from(eventSearches)
+      .where(
+        and(
+          or(lt(eventSearches.lastRunAt, lastRunBefore), isNull(eventSearches.lastRunAt)),
+          gte(eventSearches.endDate, today)
+        )
+      )
+      .orderBy(eventSearches.lastRunAt)
+      .limit(limit)
+      .for('update', { skipLocked: true });
+
+    return await db
+      .update(eventSearches)
+      .set({ lastRunAt: sql`now()` })
+      .where(inArray(eventSearches.id, due))
+      .returning();
+  }
+
+  async getExternalEvents(searchId: string, fromDate?: string): Promise<ExternalEventRecord[]> {
+    return await db.select().from(externalEvents).where(
+      and(
+        eq(externalEvents.searchId, searchId),
+        fromDate ? gte(externalEvents.eventDate, fromDate) : undefined
+      )
+    );
+  }
+
+  async getUpcomingExternalEventPoints(): Promise<MapExternalEvent[]> {
+    // The same listing is stored once per saved search that found it; map it once
+    const listing = sql`coalesce(${externalEvents.dedupKey}, ${externalEvents.source} || ':' || ${externalEvents.externalId}, ${externalEvents.id})`;
+    return await db
+      .selectDistinctOn([listing], {
+        id: externalEvents.id,
+        searchId: externalEvents.searchId,
+        eventName: externalEvents.eventName,
+        eventType: externalEvents.eventType,
+        eventDate: externalEvents.eventDate,
+        city: externalEvents.city,
+        latitude: externalEvents.latitude,
+        longitude: externalEvents.longitude,
+      })
+      .from(externalEvents)
+      .where(
+        and(
+          sql`${externalEvents.latitude} IS NOT NULL`,
+          eq(externalEvents.isCanceled, false),
+          gte(externalEvents.eventDate, sql`CURRENT_DATE`)
+        )
+      )
+      .orderBy(listing, desc(externalEvents.createdAt));
+  }
+
+  async applyEventSearchChanges(searchId: string, changes: EventSearchChanges): Promise<EventSearch> {
+    const BATCH_SIZE = 1000;
+
+    const search = await db.transaction(async (tx) => {
+      // A manual refresh can overlap a scheduled one of the same search; the
+      // unique (search, dedup key) index drops the rows the other already added
+      for (let i = 0; i < changes.inserts.length; i += BATCH_SIZE) {
+        await tx.insert(externalEvents).values(
+          changes.inserts.slice(i, i + BATCH_SIZE).map(row => ({ ...row, searchId }))
+        ).onConflictDoNothing();
+      }
+
+      // Rows changing the same columns share one UPDATE ... FROM (VALUES ...) per batch
+      const columns = getTableColumns(externalEvents);
+      const updateGroups = new Map<string, EventSearchChanges['updates']>();
+      for (const update of changes.updates) {
+        const fields = Object.keys(update.values).sort().join(',');
+        if (!updateGroups.has(fields)) updateGroups.set(fields, []);
+        updateGroups.get(fields)!.push(update);
+      }
+      for (const [key, updates] of Array.from(updateGroups.entries())) {
+        const fields = key.split(',') as Array<keyof typeof columns>;
+        const names = fields.map(field => sql.identifier(columns[field].name));
+        for (let i = 0; i < updates.length; i += BATCH_SIZE) {
+          const values = updates.slice(i, i + BATCH_SIZE).map(update => {
+            const cells = fields.map(field => {
+              const value = (update.values as Record<string, unknown>)[field];
+              const column = columns[field];
+              return sql`${value == null ? null : column.mapToDriverValue(value)}::${sql.raw(column.getSQLType())}`;
+            });
+            return sql`(${update.id}, ${sql.join(cells, sql`, `)})`;
+          });
+          await tx.execute(sql`
+            UPDATE external_events x
+            SET ${sql.join(names.map(name => sql`${name} = v.${name}`), sql`, `)}
+            FROM (VALUES ${sql.join(values, sql`, `)}) AS v(id, ${sql.join(names, sql`, `)})
+            WHERE x.id = v.id
+          `);
+        }
+      }
+
+      for (let i = 0; i < changes.cancelIds.length; i += BATCH_SIZE) {
+        await tx
+          .update(externalEvents)
+          .set({ isCanceled: true })
+          .where(inArray(externalEvents.id, changes.cancelIds.slice(i, i + BATCH_SIZE)));
+      }
+
+      const [{ count }] = await tx
+        .select({ count: sql<number>`count(*)::int` })
+        .from(externalEvents)
+        .where(eq(externalEvents.searchId, searchId));
+
+      const [updated] = await tx
+        .update(eventSearches)
+        .set({ resultsCount: count, lastRunAt: new Date() })
+        .where(eq(eventSearches.id, searchId))
+        .returning();
+      return updated;
+    });
+
+    if (changes.inserts.length + changes.updates.length + changes.cancelIds.length > 0) {
+      await changeTracker.bump('externalEvents');
+    }
+    return search;
+  }
+
+  async importExternalEvents(searchId: string, userId: string, externalEventIds?: string[]): Promise<EventImportResult> {
+    const BATCH_SIZE = 1000;
+    const matchKey = (name: string, city: string | null, startDate: string) =>
+      `${name.trim().toLowerCase()}|${(city || '').trim().toLowerCase()}|${startDate}`;
+
+    const result = await db.transaction(async (tx) => {
+      const candidates = await tx.select().from(externalEvents).where(
+        and(
+          eq(externalEvents.searchId, searchId),
+          externalEventIds?.length ? inArray(externalEvents.id, externalEventIds) : undefined
+        )
+      );
+      // Canceled listings are kept for the search results but never become events
+      const pending = candidates.filter(row => !row.isImported && !row.isCanceled);
+
+      // One set-based existence check on (name, city, start date) per batch
+      const existing = new Map<string, string>();
+      const findExisting = async (keys: Array<{ name: string; city: string | null; startDate: string }>) => {
+        for (let i = 0; i < keys.length; i += BATCH_SIZE) {
+          const values = keys.slice(i, i + BATCH_SIZE).map(key =>
+            sql`(${key.name.trim().toLowerCase()}, ${(key.city || '').trim().toLowerCase()}, ${key.startDate}::date)`
+          );
+          const matches = await tx
+            .select({ id: events.id, name: events.name, city: events.city, startDate: events.startDate })
+            .from(events)
+            .where(and(
+              eq(events.isActive, true),
+              sql`(lower(trim(${events.name})), lower(trim(coalesce(${events.city}, ''))), ${events.startDate}) IN (${sql.join(values, sql`, `)})`
+            ));
+          for (const match of matches) {
+            existing.set(matchKey(match.name, match.city, match.startDate), match.id);
+          }
+        }
+      };
+      await findExisting(pending.map(row => ({ name: row.eventName, city: row.city, startDate: row.eventDate })));
+
+      // Rows that already exist, or repeat an earlier row of this import, are linked rather than inserted
+      const links: Array<{ externalId: string; eventId: string }> = [];
+      const toInsert = new Map<string, { rows: ExternalEventRecord[]; event: InsertEvent }>();
+      let duplicates = 0;
+      for (const row of pending) {
+        const key = matchKey(row.eventName, row.city, row.eventDate);
+        const eventId = existing.get(key);
+        if (eventId) {
+          links.push({ externalId: row.id, eventId });
+          duplicates++;
+        } else if (toInsert.has(key)) {
+          toInsert.get(key)!.rows.push(row);
+          duplicates++;
+        } else {
+          toInsert.set(key, {
+            rows: [row],
+            event: {
+              name: row.eventName,
+              description: row.description,
+              category: row.eventType,
+              startDate: row.eventDate,
+              endDate: row.endDate || row.eventDate,
+              location: [row.venueName, row.venueAddress].filter(Boolean).join(', ') || null,
+              city: row.city,
+              country: row.country,
+              latitude: row.latitude,
+              longitude: row.longitude,
+              sourceUrl: row.sourceUrl,
+              scrapedAt: new Date(),
+              createdBy: userId,
+            },
+          });
+        }
+      }
+
+      // The unique (name, city, start date) index settles races with a
+      // concurrent import: rows it already inserted are linked instead
+      const groups = Array.from(toInsert.values());
+      const conflicted: typeof groups = [];
+      let imported = 0;
+      for (let i = 0; i < groups.length; i += BATCH_SIZE) {
+        const batch = groups.slice(i, i + BATCH_SIZE);
+        const inserted = await tx
+          .insert(events)
+          .values(batch.map(group => group.event))
+          .onConflictDoNothing()
+          .returning({ id: events.id, name: events.name, city: events.city, startDate: events.startDate });
+        imported += inserted.length;
+        const ids = new Map(inserted.map(event => [matchKey(event.name, event.city, event.startDate), event.id]));
+        for (const group of batch) {
+          const eventId = ids.get(matchKey(group.event.name, group.event.city ?? null, group.event.startDate));
+          if (!eventId) {
+            conflicted.push(group);
+            continue;
+          }
+          for (const row of group.rows) links.push({ externalId: row.id, eventId });
+        }
+      }
+
+      if (conflicted.length > 0) {
+        await findExisting(conflicted.map(group => ({
+          name: group.event.name,
+          city: group.event.city ?? null,
+          startDate: group.event.startDate,
+        })));
+        for (const group of conflicted) {
+          const eventId = existing.get(matchKey(group.event.name, group.event.city ?? null, group.event.startDate));
+          if (!eventId) continue;
+          for (const row of group.rows) links.push({ externalId: row.id, eventId });
+          duplicates++;
+        }
+      }
+
+      for (let i = 0; i < links.length; i += BATCH_SIZE) {
+        const values = links.slice(i, i + BATCH_SIZE).map(link => sql`(${link.externalId}, ${link.eventId})`);
+        await tx.execute(sql`
+          UPDATE external_events x
+          SET is_imported = true, imported_event_id = v.event_id
+          FROM (VALUES ${sql.join(values, sql`, `)}) AS v(id, event_id)
+          WHERE x.id = v.id
+        `);
+      }
+
+      return {
+        total: candidates.length,
+        imported,
+        skipped: candidates.length - pending.length,
+        duplicates,
+      };
+    });
+
+    if (result.imported > 0) {
+      await changeTracker.bump('events');
+    }
+    return result;
+  }
+
+  // Export operations
+  streamEventForecastExport(hotelId: string, startDate?: string, endDate?: string): AsyncGenerator<EventForecastExportRow[]> {
+    // Events in the hotel's city or already forecast by it, expanded to every
+    // event day however long the event runs
+    return streamQuery<EventForecastExportRow>(`
+      SELECT e.id AS "eventId", e.name AS "eventName", e.category, e.city,
+             e.start_date::text AS "startDate", e.end_date::text AS "endDate",
+             d.day::date::text AS "forecastDate", (d.day::date - e.start_date) + 1 AS "eventDay",
+             f.occupancy_rate AS "occupancyRate", f.average_daily_rate AS "averageDailyRate",
+             f.revenue, f.room_nights AS "roomNights", f.confidence, f.notes
+      FROM events e
+      CROSS JOIN LATERAL generate_series(e.start_date, e.end_date, interval '1 day') AS d(day)
+      LEFT JOIN LATERAL (
+        SELECT * FROM forecasts
+        WHERE event_id = e.id AND hotel_id = $1 AND forecast_date = d.day::date
+        ORDER BY updated_at DESC NULLS LAST
+        LIMIT 1
+      ) f ON true
+      WHERE e.is_active = true
+        AND (e.city = (SELECT city FROM hotels WHERE id = $1)
+             OR EXISTS (SELECT 1 FROM forecasts x WHERE x.event_id = e.id AND x.hotel_id = $1))
+        AND ($2::date IS NULL OR e.end_date >= $2::date)
+        AND ($3::date IS NULL OR e.start_date <= $3::date)
+      ORDER BY e.start_date, e.id, d.day
+    `, [hotelId, startDate || null, endDate || null]);
+  }
+
+  streamPortfolioExport(filters: PortfolioExport): AsyncGenerator<Record<string, unknown>[]> {
+    const actuals = filters.dataset === 'actuals';
+    const dateColumn = actuals ? 'r.actual_date' : 'r.forecast_date';
+    const changedColumn = actuals ? 'r.uploaded_at' : 'COALESCE(r.updated_at, r.created_at)';
+
+    const values: unknown[] = [];
+    const where: string[] = [];
+    const param = (value: unknown) => {
+      values.push(value);
+      return `$${values.length}`;
+    };
+
+    if (!actuals) {
+      where.push(`r.forecast_type = ${param(filters.dataset === 'monthly-forecasts' ? 'monthly' : 'event-based')}`);
+    }
+    if (filters.startDate) where.push(`${dateColumn} >= ${param(filters.startDate)}::date`);
+    if (filters.endDate) where.push(`${dateColumn} <= ${param(filters.endDate)}::date`);
+    if (filters.hotelIds?.length) where.push(`r.hotel_id = ANY(${param(filters.hotelIds)})`);
+    if (filters.cities?.length) where.push(`h.city = ANY(${param(filters.cities)})`);
+    const since = filters.updatedSince ? param(filters.updatedSince.toISOString()) : null;
+
+    const select = actuals
+      ? `r.id, r.hotel_id AS "hotelId", h.name AS "hotelName", h.city, r.actual_date::text AS "date",
+         r.occupancy_rate AS "occupancyRate", r.average_daily_rate AS "averageDailyRate", r.revenue,
+         r.room_nights AS "roomNights", r.guest_count AS "guestCount", r.uploaded_at AS "updatedAt"`
+      : `r.id, r.hotel_id AS "hotelId", h.name AS "hotelName", h.city, r.forecast_date::text AS "date",
+         r.event_id AS "eventId", e.name AS "eventName",
+         r.occupancy_rate AS "occupancyRate", r.average_daily_rate AS "averageDailyRate", r.revenue,
+         r.room_nights AS "roomNights", r.confidence, r.methodology, ${changedColumn} AS "updatedAt"`;
+
+    // Incremental forecast exports also carry the rows deleted since the
+    // watermark, as tombstones (deleted = true); actuals are never deleted
+    const changed = since ? [...where, `${changedColumn} > ${since}`] : where;
+    let tombstones = '';
+    if (!actuals && since) {
+      const deletedWhere = [...where, `r.deleted_at > ${since}`];
+      tombstones = `
+        UNION ALL
+        SELECT r.id, r.hotel_id, h.name, h.city, r.forecast_date::text, NULL, NULL,
+               NULL, NULL, NULL, NULL, NULL, NULL, r.deleted_at, true
+        FROM forecast_tombstones r
+        LEFT JOIN hotels h ON h.id = r.hotel_id
+        WHERE ${deletedWhere.join(' AND ')}`;
+    }
+
+    return streamQuery(`
+      SELECT ${select}${actuals ? '' : ', false AS deleted'}
+      FROM ${actuals ? 'hotel_actuals' : 'forecasts'} r
+      JOIN hotels h ON h.id = r.hotel_id
+      ${actuals ? '' : 'LEFT JOIN events e ON e.id = r.event_id'}
+      ${changed.length ? `WHERE ${changed.join(' AND ')}` : ''}
+      ${tombstones}
+      ORDER BY "hotelId", "date"
+    `, values);
+  }
+
+  streamExternalEvents(searchId: string): AsyncGenerator<ExternalEventRecord[]> {
+    return streamQuery<ExternalEventRecord>(`
+      SELECT id, search_id AS "searchId", event_name AS "eventName", event_type AS "eventType", description,
+             event_date::text AS "eventDate", event_time AS "eventTime", end_date::text AS "endDate",
+             end_time AS "endTime", venue_name AS "venueName", venue_address AS "venueAddress", city, country,
+             latitude, longitude, source, source_url AS "sourceUrl", external_id AS "externalId",
+             price_range AS "priceRange", is_free AS "isFree", is_canceled AS "isCanceled",
+             is_favorited AS "isFavorited", user_notes AS "userNotes", dedup_key AS "dedupKey", provenance,
+             is_imported AS "isImported", imported_event_id AS "importedEventId", created_at AS "createdAt"
+      FROM external_events
+      WHERE search_id = $1
+      ORDER BY event_date, event_name
+    `, [searchId]);
+  }
+
+
+  // Geocoding cache operations
+  async getGeocodes(addressKeys: string[]): Promise<GeocodeCacheEntry[]> {
+    if (addressKeys.length === 0) return [];
+    return await db.select().from(geocodeCache).where(inArray(geocodeCache.addressKey, addressKeys));
+  }
+
+  async saveGeocodes(entries: InsertGeocodeCacheEntry[]): Promise<void> {
+    const BATCH_SIZE = 1000;
+    for (let i = 0; i < entries.length; i += BATCH_SIZE) {
+      await db
+        .insert(geocodeCache)
+        .values(entries.slice(i, i + BATCH_SIZE))
+        .onConflictDoUpdate({
+          target: geocodeCache.addressKey,
+          set: {
+            latitude: sql`excluded.latitude`,
+            longitude: sql`excluded.longitude`,
+            precision: sql`excluded.precision`,
+            provider: sql`excluded.provider`,
+            createdAt: new Date(),
+          },
+        });
+    }
+  }
+
+  // AI chat history
+  async createChatMessage(entry: InsertChatMessage): Promise<StoredChatMessage> {
+    const [created] = await db.insert(chatMessages).values(entry).returning();
+    return created;
+  }
+
+  async getChatMessages(conversationId: string, userId: string, limit: number = 50): Promise<StoredChatMessage[]> {
+    const recent = await db
+      .select()
+      .from(chatMessages)
+      .where(and(eq(chatMessages.conversationId, conversationId), eq(chatMessages.userId, userId)))
+      .orderBy(desc(chatMessages.createdAt))
+      .limit(limit);
+    return recent.reverse();
+  }
+
+  // Background job watermarks
+  async getJobWatermark(name: string): Promise<Date | undefined> {
+    const [row] = await db.select().from(jobWatermarks).where(eq(jobWatermarks.name, name));
+    return row?.watermark;
+  }
+
+  async setJobWatermark(name: string, watermark: Date): Promise<void> {
+    await db
+      .insert(jobWatermarks)
+      .values({ name, watermark, updatedAt: new Date() })
+      .onConflictDoUpdate({
+        target: jobWatermarks.name,
+        set: { watermark, updatedAt: new Date() },
+      });
+  }
+
+  async getDatabaseTime(): Promise<Date> {
+    // Row timestamps default to the database clock, so watermarks compared
+    // against them are taken from it too
+    const result = await db.execute(sql`SELECT now() AS now`);
+    return new Date((result.rows[0] as { now: string | Date }).now);
+  }
+
   // Hotel actuals operations
   async getHotelActuals(hotelId: string, startDate?: Date, endDate?: Date): Promise<HotelActual[]> {
     let query = db.select().from(hotelActuals).where(eq(hotelActuals.hotelId, hotelId));
@@ -381,11 +1528,31 @@ export class DatabaseStorage implements IStorage {
 
   async createHotelActual(actual: InsertHotelActual): Promise<HotelActual> {
     const [newActual] = await db.insert(hotelActuals).values(actual).returning();
+    await changeTracker.bump('hotelActuals', [newActual.hotelId]);
     return newActual;
   }
 
   async createHotelActuals(actuals: InsertHotelActual[]): Promise<HotelActual[]> {
-    return await db.insert(hotelActuals).values(actuals).returning();
+    const created = await db.insert(hotelActuals).values(actuals).returning();
+    await changeTracker.bump('hotelActuals', Array.from(new Set(created.map(actual => actual.hotelId))));
+    return created;
+  }
+
+  async getHotelActualsForHotels(hotelIds: string[], startDate: string, endDate: string): Promise<HotelActual[]> {
+    if (hotelIds.length === 0) return [];
+
+    // One row per hotel and day: re-uploads of a day replace earlier uploads
+    return await db
+      .selectDistinctOn([hotelActuals.hotelId, hotelActuals.actualDate])
+      .from(hotelActuals)
+      .where(
+        and(
+          inArray(hotelActuals.hotelId, hotelIds),
+          gte(hotelActuals.actualDate, startDate),
+          lte(hotelActuals.actualDate, endDate)
+        )
+      )
+      .orderBy(hotelActuals.hotelId, hotelActuals.actualDate, desc(hotelActuals.uploadedAt));
   }
 
   async getHotelPerformanceKPIs(hotelId?: string): Promise<{
@@ -627,6 +1794,117 @@ export class DatabaseStorage implements IStorage {
     return results;
   }
 
+  async getHotelMonthSummaries(): Promise<HotelMonthSummary[]> {
+    // Latest upload per actual date; one forecast per date, monthly rows first
+    const result = await db.execute(sql`
+      WITH actual_months AS (
+        SELECT hotel_id, TO_CHAR(actual_date, 'YYYY-MM') AS month,
+               SUM(revenue) AS revenue, SUM(room_nights) AS room_nights,
+               AVG(occupancy_rate) AS occupancy_rate, AVG(average_daily_rate) AS average_daily_rate
+        FROM (
+          SELECT DISTINCT ON (hotel_id, actual_date) *
+          FROM hotel_actuals
+          ORDER BY hotel_id, actual_date, uploaded_at DESC
+        ) latest_actuals
+        GROUP BY 1, 2
+      ),
+      forecast_months AS (
+        SELECT hotel_id, TO_CHAR(forecast_date, 'YYYY-MM') AS month, SUM(revenue) AS revenue
+        FROM (
+          SELECT DISTINCT ON (hotel_id, forecast_date) *
+          FROM forecasts
+          ORDER BY hotel_id, forecast_date, COALESCE(forecast_type = 'monthly', false) DESC, updated_at DESC NULLS LAST
+        ) latest_forecasts
+        GROUP BY 1, 2
+      )
+      SELECT COALESCE(a.hotel_id, f.hotel_id) AS "hotelId",
+             COALESCE(a.month, f.month) AS month,
+             a.revenue::float8 AS revenue,
+             a.room_nights::int AS "roomNights",
+             a.occupancy_rate::float8 AS "occupancyRate",
+             a.average_daily_rate::float8 AS "averageDailyRate",
+             f.revenue::float8 AS "forecastRevenue"
+      FROM actual_months a
+      FULL OUTER JOIN forecast_months f ON f.hotel_id = a.hotel_id AND f.month = a.month
+      ORDER BY 2, 1
+    `);
+    return result.rows as unknown as HotelMonthSummary[];
+  }
+
+  async getHotelPeriodTotals(startDate: string, endDate: string, hotelIds?: string[]): Promise<HotelPeriodTotals[]> {
+    if (hotelIds && hotelIds.length === 0) return [];
+    const hotelFilter = hotelIds ? sql`AND hotel_id IN (${sql.join(hotelIds.map(id => sql`${id}`), sql`, `)})` : sql``;
+    const result = await db.execute(sql`
+      SELECT hotel_id AS "hotelId",
+             COUNT(*)::int AS days,
+             COALESCE(SUM(revenue), 0)::float8 AS revenue,
+             COALESCE(SUM(room_nights), 0)::int AS "roomNights",
+             AVG(occupancy_rate)::float8 AS "occupancyRate",
+             AVG(average_daily_rate)::float8 AS "averageDailyRate"
+      FROM (
+        SELECT DISTINCT ON (hotel_id, actual_date) *
+        FROM hotel_actuals
+        WHERE actual_date BETWEEN ${startDate} AND ${endDate} ${hotelFilter}
+        ORDER BY hotel_id, actual_date, uploaded_at DESC
+      ) latest_actuals
+      GROUP BY hotel_id
+    `);
+    return result.rows as unknown as HotelPeriodTotals[];
+  }
+
+  async getEventImpactSummaries(eventIds: string[]): Promise<EventImpactSummary[]> {
+    if (eventIds.length === 0) return [];
+    const result = await db.execute(sql`
+      SELECT event_id AS "eventId",
+             COUNT(DISTINCT observed_date)::int AS days,
+             COUNT(DISTINCT hotel_id)::int AS hotels,
+             SUM(revenue)::float8 AS revenue,
+             SUM(stly_revenue)::float8 AS "stlyRevenue",
+             AVG(occupancy_rate)::float8 AS "occupancyRate",
+             AVG(stly_occupancy_rate)::float8 AS "stlyOccupancyRate",
+             AVG(average_daily_rate)::float8 AS "averageDailyRate",
+             AVG(stly_average_daily_rate)::float8 AS "stlyAverageDailyRate"
+      FROM event_uplift_observations
+      WHERE event_id IN (${sql.join(eventIds.map(id => sql`${id}`), sql`, `)})
+        AND stly_revenue > 0
+      GROUP BY event_id
+    `);
+    return result.rows as unknown as EventImpactSummary[];
+  }
+
+  async getForecastErrorSums(startDate: string, endDate: string, hotelIds?: string[]): Promise<ForecastErrorSums[]> {
+    if (hotelIds && hotelIds.length === 0) return [];
+    const hotelFilter = hotelIds ? sql`AND hotel_id IN (${sql.join(hotelIds.map(id => sql`${id}`), sql`, `)})` : sql``;
+    // Same pairing as forecast-accuracy.ts: latest upload per actual date
+    // against one user forecast per date, monthly rows first
+    const result = await db.execute(sql`
+      WITH actual AS (
+        SELECT DISTINCT ON (hotel_id, actual_date) hotel_id, actual_date, revenue
+        FROM hotel_actuals
+        WHERE actual_date BETWEEN ${startDate} AND ${endDate} ${hotelFilter}
+        ORDER BY hotel_id, actual_date, uploaded_at DESC
+      ),
+      forecast AS (
+        SELECT DISTINCT ON (hotel_id, forecast_date) hotel_id, forecast_date, revenue
+        FROM forecasts
+        WHERE forecast_date BETWEEN ${startDate} AND ${endDate} ${hotelFilter}
+        ORDER BY hotel_id, forecast_date, COALESCE(forecast_type = 'monthly', false) DESC, updated_at DESC NULLS LAST
+      )
+      SELECT a.hotel_id AS "hotelId",
+             COUNT(*)::int AS count,
+             COALESCE(SUM(ABS((f.revenue - a.revenue) / NULLIF(a.revenue, 0))), 0)::float8 AS "apeSum",
+             COUNT(NULLIF(a.revenue, 0))::int AS "apeCount",
+             SUM(ABS(f.revenue - a.revenue))::float8 AS "absErrorSum",
+             SUM(f.revenue - a.revenue)::float8 AS "errorSum",
+             SUM(ABS(a.revenue))::float8 AS "actualSum"
+      FROM actual a
+      JOIN forecast f ON f.hotel_id = a.hotel_id AND f.forecast_date = a.actual_date
+      WHERE a.revenue IS NOT NULL AND f.revenue IS NOT NULL
+      GROUP BY a.hotel_id
+    `);
+    return result.rows as unknown as ForecastErrorSums[];
+  }
+
   // AI Chat support methods
   async getAllHotels(): Promise<Hotel[]> {
     return await db.select().from(hotels);
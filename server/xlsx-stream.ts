@@ -0,0 +1,98 @@
+/**
+ * XLSX Stream - constant-memory single-sheet workbook writer
+ * SheetJS builds the whole workbook in memory before writing it, so large
+ * exports are written here instead: the worksheet XML is generated row by row
+ * and deflated straight into a streaming zip. The only style is a shared bold
+ * header style defined once in styles.xml.
+ */
+
+import type { Writable } from 'stream';
+import { ZipStream } from './zip-stream';
+
+const CONTENT_TYPES = `<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"><Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/><Default Extension="xml" ContentType="application/xml"/><Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/><Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/><Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/></Types>`;
+
+const ROOT_RELS = `<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships"><Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/></Relationships>`;
+
+const WORKBOOK_RELS = `<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships"><Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/><Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/></Relationships>`;
+
+// Style 0 is the default, style 1 the bold header
+const STYLES = `<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts><fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills><borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders><cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs><cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/><xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs></styleSheet>`;
+
+function workbookXml(sheetName: string): string {
+  return `<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets><sheet name="${escapeXml(sheetName.substring(0, 31))}" sheetId="1" r:id="rId1"/></sheets></workbook>`;
+}
+
+function escapeXml(value: string): string {
+  return value
+    .replace(/&/g, '&amp;')
+    .replace(/</g, '&lt;')
+    .replace(/>/g, '&gt;')
+    .replace(/"/g, '&quot;')
+    // Control characters are not allowed in XML 1.0
+    .replace(/[\u0000-\u0008\u000B\u000C\u000E-\u001F]/g, '');
+}
+
+function columnName(index: number): string {
+  let name = '';
+  for (let n = index + 1; n > 0; n = Math.floor((n - 1) / 26)) {
+    name = String.fromCharCode(65 + ((n - 1) % 26)) + name;
+  }
+  return name;
+}
+
+function cellXml(value: unknown, ref: string, style: number): string {
+  const s = style ? ` s="${style}"` : '';
+  if (value === null || value === undefined || value === '') return '';
+  if (typeof value === 'number' && Number.isFinite(value)) return `<c r="${ref}"${s}><v>${value}</v></c>`;
+  if (typeof value === 'boolean') return `<c r="${ref}"${s} t="b"><v>${value ? 1 : 0}</v></c>`;
+  const text = value instanceof Date ? value.toISOString() : String(value);
+  return `<c r="${ref}"${s} t="inlineStr"><is><t xml:space="preserve">${escapeXml(text)}</t></is></c>`;
+}
+
+/**
+ * Write a one-sheet workbook to `out`. Returns rows written and the file size.
+ */
+export async function writeXlsx(
+  out: Writable,
+  sheetName: string,
+  header: string[],
+  batches: AsyncIterable<unknown[][]>
+): Promise<{ rows: number; bytes: number }> {
+  const zip = new ZipStream(out);
+  const columns = header.map((_, i) => columnName(i));
+  let rows = 0;
+
+  await zip.addFile('[Content_Types].xml', Buffer.from(CONTENT_TYPES));
+  await zip.addFile('_rels/.rels', Buffer.from(ROOT_RELS));
+  await zip.addFile('xl/workbook.xml', Buffer.from(workbookXml(sheetName)));
+  await zip.addFile('xl/_rels/workbook.xml.rels', Buffer.from(WORKBOOK_RELS));
+  await zip.addFile('xl/styles.xml', Buffer.from(STYLES));
+
+  async function* sheet(): AsyncGenerator<string> {
+    yield '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' +
+      '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>' +
+      `<row r="1">${header.map((h, i) => cellXml(h, `${columns[i]}1`, 1)).join('')}</row>`;
+
+    for await (const batch of batches) {
+      let chunk = '';
+      for (const values of batch) {
+        const r = rows + 2;
+        chunk += `<row r="${r}">${values.map((v, i) => cellXml(v, `${columns[i] || columnName(i)}${r}`, 0)).join('')}</row>`;
+        rows++;
+      }
+      yield chunk;
+    }
+
+    yield '</sheetData></worksheet>';
+  }
+
+  await zip.addStream('xl/worksheets/sheet1.xml', sheet());
+  await zip.finish();
+
+  return { rows, bytes: zip.bytesWritten };
+}
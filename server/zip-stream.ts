@@ -0,0 +1,217 @@
+/**
+ * Zip Stream - minimal streaming ZIP writer
+ * Entries are written as soon as they are added, so an archive of hundreds of
+ * files never has to be held in memory; only the central directory is kept
+ * until the end. Whole buffers are stored as-is (xlsx files are already
+ * deflated), while streamed entries are deflated on the fly and closed with a
+ * data descriptor because their size is not known up front.
+ */
+
+import { createDeflateRaw } from 'zlib';
+import { once } from 'events';
+import type { Writable } from 'stream';
+import { writeChunk } from './csv-stream';
+
+const CRC_TABLE = (() => {
+  const table = new Uint32Array(256);
+  for (let n = 0; n < 256; n++) {
+    let c = n;
+    for (let k = 0; k < 8; k++) c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1;
+    table[n] = c >>> 0;
+  }
+  return table;
+})();
+
+/**
+ * CRC-32 of `data`, continuing from a previous value when streaming
+ */
+function crc32(data: Buffer, previous: number = 0): number {
+  let crc = previous ^ 0xffffffff;
+  for (let i = 0; i < data.length; i++) crc = CRC_TABLE[(crc ^ data[i]) & 0xff] ^ (crc >>> 8);
+  return (crc ^ 0xffffffff) >>> 0;
+}
+
+function dosDateTime(date: Date): { time: number; date: number } {
+  return {
+    time: (date.getHours() << 11) | (date.getMinutes() << 5) | Math.floor(date.getSeconds() / 2),
+    date: ((date.getFullYear() - 1980) << 9) | ((date.getMonth() + 1) << 5) | date.getDate(),
+  };
+}
+
+/**
+ * Wait until a stream wants more data, or has been destroyed and never will
+ */
+async function drainedOrClosed(stream: NodeJS.EventEmitter): Promise<void> {
+  const controller = new AbortController();
+  try {
+    await Promise.race([
+      once(stream, 'drain', { signal: controller.signal }),
+      once(stream, 'close', { signal: controller.signal }),
+    ]);
+  } finally {
+    controller.abort();
+  }
+}
+
+interface EntryInfo {
+  name: Buffer;
+  flags: number;
+  method: number; // 0 stored, 8 deflated
+  modified: Date;
+  crc: number;
+  compressedSize: number;
+  size: number;
+}
+
+const UTF8_NAMES = 0x0800;
+const DATA_DESCRIPTOR = 0x0008;
+
+export class ZipStream {
+  private offset = 0;
+  private central: Buffer[] = [];
+  private entries = 0;
+
+  constructor(private out: Writable) {}
+
+  /** Bytes written to the destination so far */
+  get bytesWritten(): number {
+    return this.offset;
+  }
+
+  /**
+   * Append one file; resolves once it has been handed to the destination
+   */
+  async addFile(name: string, data: Buffer, modified: Date = new Date()): Promise<void> {
+    const entry: EntryInfo = {
+      name: Buffer.from(name, 'utf8'),
+      flags: UTF8_NAMES,
+      method: 0,
+      modified,
+      crc: crc32(data),
+      compressedSize: data.length,
+      size: data.length,
+    };
+
+    const headerOffset = this.offset;
+    await this.write(Buffer.concat([this.localHeader(entry), entry.name, data]));
+    this.addCentral(entry, headerOffset);
+  }
+
+  /**
+   * Append a file whose content is produced incrementally; it is deflated as
+   * it arrives, so memory use is independent of the entry's size
+   */
+  async addStream(name: string, chunks: AsyncIterable<string | Buffer>, modified: Date = new Date()): Promise<void> {
+    const entry: EntryInfo = {
+      name: Buffer.from(name, 'utf8'),
+      flags: UTF8_NAMES | DATA_DESCRIPTOR,
+      method: 8,
+      modified,
+      crc: 0,
+      compressedSize: 0,
+      size: 0,
+    };
+
+    const headerOffset = this.offset;
+    await this.write(Buffer.concat([this.localHeader(entry), entry.name]));
+
+    const deflate = createDeflateRaw();
+    // Errors surface through the read loop and the feed below, never as an unhandled event
+    deflate.on('error', () => undefined);
+    const feed = (async () => {
+      for await (const chunk of chunks) {
+        // Leaving the loop closes the source once the entry has been abandoned
+        if (deflate.destroyed) break;
+        const data = typeof chunk === 'string' ? Buffer.from(chunk, 'utf8') : chunk;
+        entry.crc = crc32(data, entry.crc);
+        entry.size += data.length;
+        if (!deflate.write(data) && !deflate.destroyed) await drainedOrClosed(deflate);
+      }
+      if (!deflate.destroyed) deflate.end();
+    })().catch((error) => {
+      deflate.destroy(error);
+    });
+
+    try {
+      for await (const compressed of deflate) {
+        entry.compressedSize += compressed.length;
+        await this.write(compressed);
+      }
+    } catch (error) {
+      // Unblock the feed so the source (e.g. a database cursor) is closed
+      deflate.destroy(error as Error);
+      await feed;
+      throw error;
+    }
+    await feed;
+
+    const descriptor = Buffer.alloc(16);
+    descriptor.writeUInt32LE(0x08074b50, 0);
+    descriptor.writeUInt32LE(entry.crc, 4);
+    descriptor.writeUInt32LE(entry.compressedSize, 8);
+    descriptor.writeUInt32LE(entry.size, 12);
+    await this.write(descriptor);
+
+    this.addCentral(entry, headerOffset);
+  }
+
+  /**
+   * Write the central directory; the destination is left open for the caller to end
+   */
+  async finish(): Promise<void> {
+    const directory = Buffer.concat(this.central);
+    const end = Buffer.alloc(22);
+    end.writeUInt32LE(0x06054b50, 0);
+    end.writeUInt16LE(this.entries, 8);
+    end.writeUInt16LE(this.entries, 10);
+    end.writeUInt32LE(directory.length, 12);
+    end.writeUInt32LE(this.offset, 16);
+
+    await this.write(Buffer.concat([directory, end]));
+  }
+
+  private localHeader(entry: EntryInfo): Buffer {
+    const stamp = dosDateTime(entry.modified);
+    const deferred = (entry.flags & DATA_DESCRIPTOR) !== 0;
+
+    const local = Buffer.alloc(30);
+    local.writeUInt32LE(0x04034b50, 0);
+    local.writeUInt16LE(20, 4); // version needed
+    local.writeUInt16LE(entry.flags, 6);
+    local.writeUInt16LE(entry.method, 8);
+    local.writeUInt16LE(stamp.time, 10);
+    local.writeUInt16LE(stamp.date, 12);
+    local.writeUInt32LE(deferred ? 0 : entry.crc, 14);
+    local.writeUInt32LE(deferred ? 0 : entry.compressedSize, 18);
+    local.writeUInt32LE(deferred ? 0 : entry.size, 22);
+    local.writeUInt16LE(entry.name.length, 26);
+    local.writeUInt16LE(0, 28);
+    return local;
+  }
+
+  private addCentral(entry: EntryInfo, headerOffset: number): void {
+    const stamp = dosDateTime(entry.modified);
+
+    const header = Buffer.alloc(46);
+    header.writeUInt32LE(0x02014b50, 0);
+    header.writeUInt16LE(20, 4); // version made by
+    header.writeUInt16LE(20, 6);
+    header.writeUInt16LE(entry.flags, 8);
+    header.writeUInt16LE(entry.method, 10);
+    header.writeUInt16LE(stamp.time, 12);
+    header.writeUInt16LE(stamp.date, 14);
+    header.writeUInt32LE(entry.crc, 16);
+    header.writeUInt32LE(entry.compressedSize, 20);
+    header.writeUInt32LE(entry.size, 24);
+    header.writeUInt16LE(entry.name.length, 28);
+    header.writeUInt32LE(headerOffset, 42);
+
+    this.central.push(header, entry.name);
+    this.entries++;
+  }
+
+  private async write(chunk: Buffer): Promise<void> {
+    this.offset += chunk.length;
+    await writeChunk(this.out, chunk);
+  }
+}
@@ -1,6 +1,7 @@
 import { sql, relations } from 'drizzle-orm';
 import {
   index,
+  uniqueIndex,
   jsonb,
   pgTable,
   timestamp,
@@ -10,6 +11,7 @@ import {
   decimal,
   boolean,
   date,
+  primaryKey,
 } from "drizzle-orm/pg-core";
 import { createInsertSchema } from "drizzle-zod";
 import { z } from "zod";
@@ -94,7 +96,16 @@ export const events = pgTable("events", {
   createdBy: varchar("created_by").references(() => users.id),
   createdAt: timestamp("created_at").defaultNow(),
   updatedAt: timestamp("updated_at").defaultNow(),
-});
+}, (table) => [
+  // Same key the external event import matches on; deleted (inactive) events
+  // don't block re-creating one. Run `npm run db:dedupe-events` before pushing
+  // this index to a database that already holds duplicates.
+  uniqueIndex("UQ_events_name_city_start").on(
+    sql`lower(trim(${table.name}))`,
+    sql`lower(trim(coalesce(${table.city}, '')))`,
+    table.startDate
+  ).where(sql`${table.isActive}`),
+]);
 
 // Forecasts table
 export const forecasts = pgTable("forecasts", {
@@ -108,13 +119,201 @@ export const forecasts = pgTable("forecasts", {
   roomNights: integer("room_nights"),
   eventId: varchar("event_id").references(() => events.id), // if event-based forecast
   confidence: varchar("confidence"), // high, medium, low
-  methodology: varchar("methodology"), // manual, ai-generated, historical
+  methodology: varchar("methodology"), // manual, ai-generated, historical, spread
   notes: text("notes"),
   createdBy: varchar("created_by").references(() => users.id),
   createdAt: timestamp("created_at").defaultNow(),
   updatedAt: timestamp("updated_at").defaultNow(),
 });
 
+// Forecast versions - named snapshots of forecasts for a hotel or the portfolio
+export const forecastVersions = pgTable("forecast_versions", {
+  id: varchar("id").primaryKey().default(sql`gen_random_uuid()`),
+  name: varchar("name", { length: 255 }).notNull(),
+  hotelId: varchar("hotel_id").references(() => hotels.id), // null = whole portfolio
+  parentId: varchar("parent_id"), // previous version of the same scope; entries are deltas against it
+  isFull: boolean("is_full").default(false), // full snapshot that ends the delta chain
+  rowCount: integer("row_count").default(0), // forecasts covered by the version
+  entryCount: integer("entry_count").default(0), // delta entries actually stored
+  createdBy: varchar("created_by").references(() => users.id),
+  createdAt: timestamp("created_at").defaultNow(),
+}, (table) => [index("IDX_forecast_versions_scope").on(table.hotelId, table.createdAt)]);
+
+// Per-version forecast deltas keyed by forecast id
+export const forecastVersionEntries = pgTable("forecast_version_entries", {
+  versionId: varchar("version_id").references(() => forecastVersions.id, { onDelete: "cascade" }).notNull(),
+  entryKey: varchar("entry_key").notNull(), // hotel, type, date, event and methodology of the forecast
+  forecastId: varchar("forecast_id"), // id it had when captured, reused on restore
+  hotelId: varchar("hotel_id").notNull(),
+  forecastType: varchar("forecast_type"),
+  forecastDate: date("forecast_date").notNull(),
+  eventId: varchar("event_id"),
+  occupancyRate: decimal("occupancy_rate", { precision: 5, scale: 2 }),
+  averageDailyRate: decimal("average_daily_rate", { precision: 10, scale: 2 }),
+  revenue: decimal("revenue", { precision: 15, scale: 2 }),
+  roomNights: integer("room_nights"),
+  confidence: varchar("confidence"),
+  methodology: varchar("methodology"),
+  notes: text("notes"),
+  createdBy: varchar("created_by"),
+  isDeleted: boolean("is_deleted").default(false), // tombstone for rows removed since the parent
+}, (table) => [primaryKey({ columns: [table.versionId, table.entryKey] })]);
+
+// System-generated forecasts (automatic baselines), kept apart from user forecasts
+export const systemForecasts = pgTable("system_forecasts", {
+  hotelId: varchar("hotel_id").references(() => hotels.id, { onDelete: "cascade" }).notNull(),
+  forecastDate: date("forecast_date").notNull(),
+  method: varchar("method", { length: 50 }).notNull().default("baseline"), // baseline
+  occupancyRate: decimal("occupancy_rate", { precision: 5, scale: 2 }),
+  averageDailyRate: decimal("average_daily_rate", { precision: 10, scale: 2 }),
+  revenue: decimal("revenue", { precision: 15, scale: 2 }),
+  roomNights: integer("room_nights"),
+  generatedAt: timestamp("generated_at").defaultNow(),
+}, (table) => [primaryKey({ columns: [table.hotelId, table.forecastDate, table.method] })]);
+
+// Event uplift model: one observation per event day per hotel with its STLY counterpart
+export const eventUpliftObservations = pgTable("event_uplift_observations", {
+  eventId: varchar("event_id").references(() => events.id, { onDelete: "cascade" }).notNull(),
+  hotelId: varchar("hotel_id").references(() => hotels.id, { onDelete: "cascade" }).notNull(),
+  observedDate: date("observed_date").notNull(),
+  city: varchar("city", { length: 100 }).notNull(),
+  category: varchar("category").notNull(),
+  durationBucket: varchar("duration_bucket", { length: 10 }).notNull(), // 1, 2-3, 4-7, 8+
+  revenue: decimal("revenue", { precision: 15, scale: 2 }),
+  stlyRevenue: decimal("stly_revenue", { precision: 15, scale: 2 }),
+  occupancyRate: decimal("occupancy_rate", { precision: 5, scale: 2 }),
+  stlyOccupancyRate: decimal("stly_occupancy_rate", { precision: 5, scale: 2 }),
+  averageDailyRate: decimal("average_daily_rate", { precision: 10, scale: 2 }),
+  stlyAverageDailyRate: decimal("stly_average_daily_rate", { precision: 10, scale: 2 }),
+}, (table) => [primaryKey({ columns: [table.eventId, table.hotelId, table.observedDate] })]);
+
+// Learned multipliers; '*' marks a rolled-up level used as fallback
+export const eventUpliftFactors = pgTable("event_uplift_factors", {
+  city: varchar("city", { length: 100 }).notNull(),
+  category: varchar("category").notNull(),
+  durationBucket: varchar("duration_bucket", { length: 10 }).notNull(),
+  revenueMultiplier: decimal("revenue_multiplier", { precision: 8, scale: 4 }),
+  occupancyMultiplier: decimal("occupancy_multiplier", { precision: 8, scale: 4 }),
+  adrMultiplier: decimal("adr_multiplier", { precision: 8, scale: 4 }),
+  sampleDays: integer("sample_days").default(0),
+  sampleEvents: integer("sample_events").default(0),
+  updatedAt: timestamp("updated_at").defaultNow(),
+}, (table) => [primaryKey({ columns: [table.city, table.category, table.durationBucket] })]);
+
+// Precomputed event forecast suggestions for upcoming events
+export const eventForecastSuggestions = pgTable("event_forecast_suggestions", {
+  eventId: varchar("event_id").references(() => events.id, { onDelete: "cascade" }).notNull(),
+  hotelId: varchar("hotel_id").references(() => hotels.id, { onDelete: "cascade" }).notNull(),
+  forecastDate: date("forecast_date").notNull(),
+  occupancyRate: decimal("occupancy_rate", { precision: 5, scale: 2 }),
+  averageDailyRate: decimal("average_daily_rate", { precision: 10, scale: 2 }),
+  revenue: decimal("revenue", { precision: 15, scale: 2 }),
+  roomNights: integer("room_nights"),
+  multiplier: decimal("multiplier", { precision: 8, scale: 4 }),
+  basis: varchar("basis", { length: 20 }), // baseline, stly
+  factorLevel: varchar("factor_level", { length: 50 }), // which factor row was used
+  generatedAt: timestamp("generated_at").defaultNow(),
+}, (table) => [primaryKey({ columns: [table.eventId, table.hotelId, table.forecastDate] })]);
+
+// Deleted forecasts, so incremental exports can tell a warehouse to drop them
+export const forecastTombstones = pgTable("forecast_tombstones", {
+  id: varchar("id").primaryKey(), // id of the deleted forecast
+  hotelId: varchar("hotel_id").notNull(),
+  forecastType: varchar("forecast_type"),
+  forecastDate: date("forecast_date").notNull(),
+  deletedAt: timestamp("deleted_at").defaultNow(),
+}, (table) => [index("IDX_forecast_tombstones_deleted").on(table.deletedAt)]);
+
+// Watermarks for incremental background jobs
+export const jobWatermarks = pgTable("job_watermarks", {
+  name: varchar("name", { length: 100 }).primaryKey(),
+  watermark: timestamp("watermark").notNull(),
+  updatedAt: timestamp("updated_at").defaultNow(),
+});
+
+// Backtest runs and their per-horizon error metrics
+export const backtestRuns = pgTable("backtest_runs", {
+  id: varchar("id").primaryKey().default(sql`gen_random_uuid()`),
+  status: varchar("status").default("running"), // running, completed, failed
+  params: jsonb("params"),
+  folds: integer("folds"),
+  error: text("error"),
+  durationMs: integer("duration_ms"),
+  createdBy: varchar("created_by").references(() => users.id),
+  startedAt: timestamp("started_at").defaultNow(),
+  completedAt: timestamp("completed_at"),
+});
+
+export const backtestResults = pgTable("backtest_results", {
+  runId: varchar("run_id").references(() => backtestRuns.id, { onDelete: "cascade" }).notNull(),
+  method: varchar("method", { length: 50 }).notNull(), // baseline, user
+  metric: varchar("metric", { length: 50 }).notNull(), // revenue, occupancyRate, averageDailyRate
+  horizon: varchar("horizon", { length: 20 }).notNull(), // days-ahead bucket, e.g. 1-7
+  count: integer("count").notNull(),
+  mape: decimal("mape", { precision: 10, scale: 4 }),
+  wape: decimal("wape", { precision: 10, scale: 4 }),
+  bias: decimal("bias", { precision: 10, scale: 4 }),
+}, (table) => [primaryKey({ columns: [table.runId, table.method, table.metric, table.horizon] })]);
+
+// Event finder searches and the external events they returned
+export const eventSearches = pgTable("event_searches", {
+  id: varchar("id").primaryKey().default(sql`gen_random_uuid()`),
+  name: varchar("name", { length: 255 }),
+  location: varchar("location", { length: 255 }).notNull(),
+  eventTypes: jsonb("event_types").$type<string[]>(),
+  startDate: date("start_date").notNull(),
+  endDate: date("end_date").notNull(),
+  resultsCount: integer("results_count").default(0),
+  createdBy: varchar("created_by").references(() => users.id),
+  createdAt: timestamp("created_at").defaultNow(),
+  lastRunAt: timestamp("last_run_at").defaultNow(),
+}, (table) => [index("IDX_event_searches_last_run").on(table.lastRunAt)]);
+
+export const externalEvents = pgTable("external_events", {
+  id: varchar("id").primaryKey().default(sql`gen_random_uuid()`),
+  searchId: varchar("search_id").references(() => eventSearches.id, { onDelete: "cascade" }).notNull(),
+  eventName: varchar("event_name", { length: 255 }).notNull(),
+  eventType: varchar("event_type", { length: 50 }),
+  description: text("description"),
+  eventDate: date("event_date").notNull(),
+  eventTime: varchar("event_time", { length: 10 }),
+  endDate: date("end_date"),
+  endTime: varchar("end_time", { length: 10 }),
+  venueName: varchar("venue_name", { length: 255 }),
+  venueAddress: text("venue_address"),
+  city: varchar("city", { length: 100 }),
+  country: varchar("country", { length: 100 }),
+  latitude: decimal("latitude", { precision: 10, scale: 8 }),
+  longitude: decimal("longitude", { precision: 11, scale: 8 }),
+  source: varchar("source", { length: 100 }),
+  sourceUrl: varchar("source_url"),
+  externalId: varchar("external_id"),
+  priceRange: varchar("price_range", { length: 100 }),
+  isFree: boolean("is_free").default(false),
+  isCanceled: boolean("is_canceled").default(false),
+  isFavorited: boolean("is_favorited").default(false),
+  userNotes: text("user_notes"),
+  dedupKey: varchar("dedup_key"), // normalized name|city|date, see event-dedup.ts
+  provenance: jsonb("provenance").$type<Array<{ source: string; externalId?: string; sourceUrl?: string }>>(),
+  isImported: boolean("is_imported").default(false),
+  importedEventId: varchar("imported_event_id").references(() => events.id),
+  createdAt: timestamp("created_at").defaultNow(),
+}, (table) => [
+  index("IDX_external_events_search").on(table.searchId, table.eventDate),
+  // One row per listing and search, even when two refreshes overlap
+  uniqueIndex("UQ_external_events_dedup").on(table.searchId, table.dedupKey),
+]);
+
+export const eventSearchExports = pgTable("event_search_exports", {
+  id: varchar("id").primaryKey().default(sql`gen_random_uuid()`),
+  searchId: varchar("search_id").references(() => eventSearches.id, { onDelete: "cascade" }).notNull(),
+  format: varchar("format", { length: 10 }).notNull(), // xlsx, csv
+  rowCount: integer("row_count"),
+  fileSize: integer("file_size"), // bytes actually sent
+  createdBy: varchar("created_by").references(() => users.id),
+  createdAt: timestamp("created_at").defaultNow(),
+});
+
 // Hotel actuals (real performance data)
 export const hotelActuals = pgTable("hotel_actuals", {
   id: varchar("id").primaryKey().default(sql`gen_random_uuid()`),
@@ -172,6 +371,35 @@ export const activityLog = pgTable("activity_log", {
   createdAt: timestamp("created_at").defaultNow(),
 });
 
+// Persistent geocoding cache keyed by normalized address; misses are cached too
+export const geocodeCache = pgTable("geocode_cache", {
+  addressKey: varchar("address_key", { length: 500 }).primaryKey(),
+  latitude: decimal("latitude", { precision: 10, scale: 8 }),
+  longitude: decimal("longitude", { precision: 11, scale: 8 }),
+  precision: varchar("precision", { length: 20 }), // address or city; null when not found
+  provider: varchar("provider", { length: 50 }).notNull(),
+  createdAt: timestamp("created_at").defaultNow(),
+});
+
+// AI chat exchanges: one row per question and its final answer
+export const chatMessages = pgTable("chat_messages", {
+  id: varchar("id").primaryKey().default(sql`gen_random_uuid()`),
+  conversationId: varchar("conversation_id").notNull(),
+  userId: varchar("user_id").references(() => users.id),
+  message: text("message").notNull(),
+  response: text("response").notNull(),
+  answeredBy: varchar("answered_by", { length: 100 }), // model name, or "direct" for database-only answers
+  processingTime: integer("processing_time"), // milliseconds
+  createdAt: timestamp("created_at").defaultNow(),
+}, (table) => [index("IDX_chat_messages_conversation").on(table.conversationId, table.createdAt)]);
+
+// Change counters backing ETag generation for cached read endpoints
+export const changeCounters = pgTable("change_counters", {
+  scope: varchar("scope", { length: 255 }).primaryKey(), // table name or table:hotelId
+  version: integer("version").notNull().default(0),
+  updatedAt: timestamp("updated_at").defaultNow(),
+});
+
 // Relations
 export const usersRelations = relations(users, ({ many }) => ({
   ownedHotels: many(hotels),
@@ -341,6 +569,48 @@ export const insertForecastSchema = createInsertSchema(forecasts).omit({
   updatedAt: true,
 });
 
+export type ForecastVersion = typeof forecastVersions.$inferSelect;
+export type InsertForecastVersion = typeof forecastVersions.$inferInsert;
+export type ForecastVersionEntry = typeof forecastVersionEntries.$inferSelect;
+export type InsertForecastVersionEntry = typeof forecastVersionEntries.$inferInsert;
+export const createForecastVersionSchema = z.object({
+  name: z.string().min(1).max(255),
+  hotelId: z.string().optional(),
+});
+
+export type SystemForecast = typeof systemForecasts.$inferSelect;
+export type InsertSystemForecast = typeof systemForecasts.$inferInsert;
+export type InsertForecastTombstone = typeof forecastTombstones.$inferInsert;
+
+export type EventUpliftFactor = typeof eventUpliftFactors.$inferSelect;
+export type EventForecastSuggestion = typeof eventForecastSuggestions.$inferSelect;
+export type InsertEventForecastSuggestion = typeof eventForecastSuggestions.$inferInsert;
+
+export type BacktestRun = typeof backtestRuns.$inferSelect;
+export type InsertBacktestRun = typeof backtestRuns.$inferInsert;
+export type BacktestResult = typeof backtestResults.$inferSelect;
+export type InsertBacktestResult = typeof backtestResults.$inferInsert;
+export const backtestParamsSchema = z.object({
+  startDate: z.string().refine((date) => !isNaN(Date.parse(date)), { message: "Please enter a valid start date" }),
+  endDate: z.string().refine((date) => !isNaN(Date.parse(date)), { message: "Please enter a valid end date" }),
+  stepDays: z.coerce.number().int().min(1).max(365).default(7),
+  horizonDays: z.coerce.number().int().min(1).max(365).default(90),
+  hotelIds: z.array(z.string()).optional(),
+  workers: z.coerce.number().int().min(1).max(64).optional(),
+});
+export type BacktestParams = z.infer<typeof backtestParamsSchema>;
+
+export type EventSearch = typeof eventSearches.$inferSelect;
+export type InsertEventSearch = typeof eventSearches.$inferInsert;
+export type ExternalEventRecord = typeof externalEvents.$inferSelect;
+export type InsertExternalEvent = typeof externalEvents.$inferInsert;
+export type GeocodeCacheEntry = typeof geocodeCache.$inferSelect;
+export type InsertGeocodeCacheEntry = typeof geocodeCache.$inferInsert;
+export type StoredChatMessage = typeof chatMessages.$inferSelect;
+export type InsertChatMessage = typeof chatMessages.$inferInsert;
+export type EventSearchExport = typeof eventSearchExports.$inferSelect;
+export type InsertEventSearchExport = typeof eventSearchExports.$inferInsert;
+
 export type HotelActual = typeof hotelActuals.$inferSelect;
 export type InsertHotelActual = typeof hotelActuals.$inferInsert;
 export const insertHotelActualSchema = createInsertSchema(hotelActuals).omit({
@@ -370,3 +640,79 @@ export type InsertHotelAssignment = typeof hotelAssignments.$inferInsert;
 
 export type ActivityLog = typeof activityLog.$inferSelect;
 export type InsertActivityLog = typeof activityLog.$inferInsert;
+
+// Monthly-to-daily forecast spreading
+export const forecastSpreadTargetSchema = z.object({
+  hotelId: z.string().min(1),
+  month: z.string().regex(/^\d{4}-(0[1-9]|1[0-2])$/, "Month must be formatted as YYYY-MM"),
+  revenue: z.coerce.number().nonnegative().optional(),
+  averageDailyRate: z.coerce.number().positive().optional(),
+  occupancyRate: z.coerce.number().min(0).max(100).optional(),
+}).refine((target) => target.revenue !== undefined || target.averageDailyRate !== undefined || target.occupancyRate !== undefined, {
+  message: "Provide at least one of revenue, averageDailyRate or occupancyRate",
+});
+
+export const forecastSpreadSchema = z.object({
+  targets: z.array(forecastSpreadTargetSchema).min(1).max(10000),
+  dryRun: z.boolean().optional(),
+});
+
+export type ForecastSpreadTarget = z.infer<typeof forecastSpreadTargetSchema>;
+export type ForecastSpreadRequest = z.infer<typeof forecastSpreadSchema>;
+
+// What-if scenario: shocks applied on top of the forecast before simulation
+export const scenarioShockSchema = z.object({
+  city: z.string().optional(),
+  hotelId: z.string().optional(),
+  eventId: z.string().optional(), // limits the shock to the event's city and dates
+  startDate: z.string().regex(/^\d{4}-\d{2}-\d{2}$/, "Date must be formatted as YYYY-MM-DD").optional(),
+  endDate: z.string().regex(/^\d{4}-\d{2}-\d{2}$/, "Date must be formatted as YYYY-MM-DD").optional(),
+  occupancyChangePct: z.coerce.number().min(-100).max(500).default(0),
+  adrChangePct: z.coerce.number().min(-100).max(500).default(0),
+});
+
+export const scenarioSimulationSchema = z.object({
+  startDate: z.string().regex(/^\d{4}-\d{2}-\d{2}$/, "Date must be formatted as YYYY-MM-DD"),
+  endDate: z.string().regex(/^\d{4}-\d{2}-\d{2}$/, "Date must be formatted as YYYY-MM-DD"),
+  hotelIds: z.array(z.string()).optional(),
+  cities: z.array(z.string()).optional(),
+  shocks: z.array(scenarioShockSchema).max(100).default([]),
+  draws: z.coerce.number().int().min(100).max(50000).default(10000),
+  seed: z.coerce.number().int().optional(),
+}).refine((scenario) => scenario.startDate <= scenario.endDate, {
+  message: "startDate must not be after endDate",
+});
+
+export type ScenarioShock = z.infer<typeof scenarioShockSchema>;
+export type ScenarioSimulation = z.infer<typeof scenarioSimulationSchema>;
+
+// Portfolio-wide bulk export; list filters also accept comma-separated strings
+const commaList = z.preprocess(
+  (value) => typeof value === 'string' ? value.split(',').map(v => v.trim()).filter(Boolean) : value,
+  z.array(z.string()).optional()
+);
+
+export const portfolioExportSchema = z.object({
+  dataset: z.enum(['event-forecasts', 'monthly-forecasts', 'actuals']),
+  format: z.enum(['csv', 'jsonl']).default('csv'),
+  startDate: z.string().regex(/^\d{4}-\d{2}-\d{2}$/, "Date must be formatted as YYYY-MM-DD").optional(),
+  endDate: z.string().regex(/^\d{4}-\d{2}-\d{2}$/, "Date must be formatted as YYYY-MM-DD").optional(),
+  cities: commaList,
+  hotelIds: commaList,
+  updatedSince: z.coerce.date().optional(),
+});
+
+export type PortfolioExport = z.infer<typeof portfolioExportSchema>;
+
+// Map viewport: bbox=west,south,east,north in degrees
+export const mapClustersQuerySchema = z.object({
+  bbox: z.string()
+    .transform(value => value.split(',').map(Number))
+    .refine(parts => parts.length === 4 && parts.every(Number.isFinite), "bbox must be west,south,east,north")
+    .transform(([west, south, east, north]) => ({ west, south, east, north })),
+  zoom: z.coerce.number().min(0).max(22),
+  layers: z.preprocess(
+    (value) => typeof value === 'string' ? value.split(',').map(v => v.trim()).filter(Boolean) : value,
+    z.array(z.enum(['hotels', 'events', 'externalEvents'])).optional()
+  ),
+});